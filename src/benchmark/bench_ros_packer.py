@@ -0,0 +1,158 @@
+import argparse
+import json
+import multiprocessing
+import os
+import pathlib
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+from typing import Dict
+
+from benchmark.synthetic import DISTRIBUTIONS, make_payload_directory, make_reference_container
+from ros_lib import ros_stats
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_pack import check_ros, pack_ros, write_ros
+from ros_lib.ros_stream import stream_ros
+from ros_lib.ros_writer import parallel_ros
+
+SCENARIOS = ('pack', 'stream', 'parallel', 'mirror', 'check')
+
+
+class PhaseTimer:
+    """
+    Collects the wall time of named phases.
+    """
+
+    def __init__(self):
+        self.phases = {}  # type: Dict[str, float]
+
+    def __call__(self, name: str, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+        return result
+
+
+def run_scenario(scenario: str, work: pathlib.Path, version: int, result_queue: multiprocessing.Queue) -> None:
+    """
+    Runs one scenario in a fresh process, so the peak RSS belongs to this scenario alone.
+    """
+    os.chdir(work)
+    payloads = work / 'payloads'
+    reference = work / 'reference.ros'
+    output = pathlib.Path('{}.ros'.format(scenario))
+    timer = PhaseTimer()
+    stats = ros_stats.enable()
+
+    start = time.perf_counter()
+    if scenario == 'pack':
+        stack = timer('pack_ros', pack_ros, payloads, None, False, version)
+        timer('write_ros', write_ros, output, False, stack)
+    elif scenario == 'stream':
+        timer('stream_ros', stream_ros, payloads, None, False, version, output)
+    elif scenario == 'parallel':
+        timer('parallel_ros', parallel_ros, payloads, None, False, version, output)
+    elif scenario == 'mirror':
+        timer('check_ros', check_ros, reference)
+        mirror = timer('mirror_parse', RosContainer, reference)
+        stack = timer('pack_ros', pack_ros, payloads, mirror, False, None)
+        timer('write_ros', write_ros, output, False, stack)
+        mirror.close()
+    elif scenario == 'check':
+        timer('check_ros', check_ros, reference)
+    wall = time.perf_counter() - start
+
+    if output.exists():
+        output.unlink()
+
+    result_queue.put({'wall_s': wall, 'phases': timer.phases, 'stats': stats.as_dict(),
+                      'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss})
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=str(pathlib.Path(__file__).parent),
+                                       stderr=subprocess.DEVNULL).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def compare(old: Dict, new: Dict) -> None:
+    """
+    Prints the wall time of every scenario of NEW relative to OLD.
+    """
+    old_results = {result['scenario']: result for result in old['results']}
+    for result in new['results']:
+        if result['scenario'] in old_results:
+            before = old_results[result['scenario']]['wall_s']
+            print('{:8} {:10.4f}s -> {:10.4f}s  x{:.2f}'.format(result['scenario'], before, result['wall_s'],
+                                                                  result['wall_s'] / before if before else 0.0))
+
+
+def setup_arguments() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description='Benchmarks the ros packer on synthetic payloads.')
+    parser.add_argument('-n', '--entries', type=int, default=100, help='number of payloads')
+    parser.add_argument('-s', '--size', type=int, default=1 << 20, help='mean payload size in bytes')
+    parser.add_argument('-d', '--distribution', choices=DISTRIBUTIONS, default='fixed',
+                        help='distribution of the payload sizes')
+    parser.add_argument('-l', '--lzma-ratio', type=float, default=0.0, help='share of LZMA payloads (0 to 1)')
+    parser.add_argument('-V', '--version', type=int, choices=[1, 2], default=2, help='header version')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='runs per scenario, the fastest one is reported')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the payload generator')
+    parser.add_argument('--scenario', choices=SCENARIOS, action='append', help='scenarios to run, default all')
+    parser.add_argument('-o', '--output', type=pathlib.Path, help='write the JSON results to a file')
+    parser.add_argument('--compare', type=pathlib.Path, help='JSON results of an earlier run to compare with')
+    return parser.parse_args()
+
+
+def main():
+    arguments = setup_arguments()
+    context = multiprocessing.get_context('spawn')
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix='ros_bench_') as temp_dir:
+        work = pathlib.Path(temp_dir)
+        total = make_payload_directory(work / 'payloads', arguments.entries, arguments.size, arguments.distribution,
+                                       arguments.lzma_ratio, arguments.seed)
+        make_reference_container(work / 'payloads', arguments.version, work / 'reference.ros')
+
+        for scenario in arguments.scenario or SCENARIOS:
+            runs = []
+            for _ in range(arguments.repeat):
+                queue = context.Queue()
+                process = context.Process(target=run_scenario, args=(scenario, work, arguments.version, queue))
+                process.start()
+                runs.append(queue.get())
+                process.join()
+
+            best = min(runs, key=lambda run: run['wall_s'])
+            size = (work / 'reference.ros').stat().st_size if scenario == 'check' else total
+            results.append({'scenario': scenario, 'bytes': size, 'wall_s': best['wall_s'],
+                            'mb_s': size / best['wall_s'] / 1e6 if best['wall_s'] else 0.0,
+                            'peak_rss_kb': max(run['peak_rss_kb'] for run in runs), 'phases': best['phases'],
+                            'stats': best['stats']})
+
+    report = {'meta': {'commit': git_commit(), 'python': platform.python_version(), 'platform': platform.platform(),
+                       'cpus': os.cpu_count(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+              'config': {'entries': arguments.entries, 'size': arguments.size,
+                         'distribution': arguments.distribution, 'lzma_ratio': arguments.lzma_ratio,
+                         'version': arguments.version, 'repeat': arguments.repeat, 'seed': arguments.seed},
+              'results': results}
+
+    text = json.dumps(report, indent=2)
+    if arguments.output is not None:
+        arguments.output.write_text(text)
+    else:
+        print(text)
+
+    if arguments.compare is not None:
+        compare(json.loads(arguments.compare.read_text()), report)
+
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
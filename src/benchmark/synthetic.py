@@ -0,0 +1,62 @@
+import math
+import pathlib
+import random
+import struct
+from typing import List
+
+from ros_lib.ros_stream import stream_ros
+
+DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+
+
+def payload_sizes(entries: int, size: int, distribution: str, rng: random.Random) -> List[int]:
+    """
+    Returns ENTRIES payload sizes with SIZE as mean. 'fixed' uses SIZE for every payload, 'uniform' draws from
+    [1, 2 * SIZE] and 'lognormal' gives few large and many small payloads like real firmware.
+    """
+    if distribution == 'fixed':
+        return [size] * entries
+    if distribution == 'uniform':
+        return [rng.randint(1, 2 * size) for _ in range(entries)]
+    if distribution == 'lognormal':
+        sigma = 1.5
+        mu = max(0.0, math.log(size) - sigma ** 2 / 2)
+        return [max(1, int(rng.lognormvariate(mu, sigma))) for _ in range(entries)]
+    raise ValueError('unknown size distribution {}'.format(distribution))
+
+
+def make_payload_directory(directory: pathlib.Path, entries: int, size: int, distribution: str = 'fixed',
+                           lzma_ratio: float = 0.0, seed: int = 0) -> int:
+    """
+    Fills a directory with synthetic payloads and returns their total size. A share of LZMA_RATIO of the payloads start
+    with a LZMA header, so the packer creates LZMA-subheaders for them. The data is random and not compressible, but
+    drawn from SEED like the sizes, so the same SEED gives the same payloads.
+    """
+    rng = random.Random(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    total = 0
+
+    for i, payload_size in enumerate(payload_sizes(entries, size, distribution, rng)):
+        with open(directory / 'P{:05}'.format(i), 'wb') as file:
+            if rng.random() < lzma_ratio:
+                # properties, dictionary size and uncompressed size of a LZMA archive
+                header = bytes([0x5d]) + struct.pack('<IQ', 1 << 23, payload_size * 3)
+                file.write(header)
+                payload_size = max(0, payload_size - len(header))
+                total = total + len(header)
+
+            remaining = payload_size
+            while remaining > 0:
+                chunk = min(remaining, 1 << 20)
+                file.write(rng.getrandbits(chunk * 8).to_bytes(chunk, 'little'))
+                remaining = remaining - chunk
+            total = total + payload_size
+
+    return total
+
+
+def make_reference_container(directory: pathlib.Path, version: int, output_path: pathlib.Path) -> None:
+    """
+    Packs a payload directory into a container which can be used as reference for mirroring.
+    """
+    stream_ros(directory, None, False, version, output_path)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+import pathlib
+import argparse
+
+from ros_lib.ros_catalog import RosCatalog
+
+
+def check_arguments(arguments: argparse.Namespace) -> bool:
+    """
+    Checking arguments and returns False if: DIRECTORY to scan does not exist or is no directory; the DATABASE to query
+    does not exist.
+    """
+
+    if arguments.verbosity:
+        print('\nChecking Arguments:\ngiven database: {}\ngiven command: {}'.format(arguments.database,
+                                                                                 arguments.command))
+
+    if arguments.command == 'scan':
+        if not arguments.DIRECTORY.is_dir():
+            print('Error: {} is not a directory!'.format(arguments.DIRECTORY))
+            return False
+
+    elif not arguments.database.is_file():
+        print('Error: {} does not exist, scan a directory first!'.format(arguments.database))
+        return False
+
+    return True
+
+
+def setup_arguments() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description='Indexes ros containers in a SQLite catalog and queries it.')
+    parser.add_argument('-v', '--verbosity', help='increase output verbosity', action='store_true')
+    parser.add_argument('-d', '--database', type=pathlib.Path, default=pathlib.Path('ros_catalog.sqlite'),
+                        help='catalog database, defaults to ros_catalog.sqlite')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scan = commands.add_parser('scan', help='index new and changed containers of a directory tree')
+    scan.add_argument('-j', '--jobs', type=int, help='number of containers parsed in parallel')
+    scan.add_argument('-p', '--pattern', default='*.ros', help='file names of containers, defaults to *.ros')
+    scan.add_argument('DIRECTORY', type=pathlib.Path, help='directory tree to scan.')
+
+    commands.add_parser('list', help='list all indexed containers')
+
+    entry = commands.add_parser('entry', help='find containers holding an entry of a name')
+    entry.add_argument('NAME', help='name of the entry, may be a glob pattern.')
+
+    payload = commands.add_parser('payload', help='find entries by the SHA-256 of their payload')
+    payload.add_argument('SHA256', help='hex digest of the payload including its LZMA-subheader.')
+
+    shared = commands.add_parser('shared', help='find payloads a container shares with other containers')
+    shared.add_argument('CONTAINER', type=pathlib.Path, help='indexed ros-file.')
+    args = parser.parse_args()
+    if args.command == 'scan' and args.jobs is not None and args.jobs < 1:
+        scan.error('-j/--jobs needs at least 1')
+
+    return args
+
+
+def main():
+    arguments = setup_arguments()
+
+    if not check_arguments(arguments):
+        return 1
+
+    with RosCatalog(arguments.database) as catalog:
+        if arguments.command == 'scan':
+            catalog.scan(arguments.DIRECTORY, arguments.pattern, arguments.jobs, arguments.verbosity)
+            return 0
+
+        if arguments.command == 'list':
+            rows = catalog.containers()
+        elif arguments.command == 'entry':
+            rows = catalog.find_entry(arguments.NAME)
+        elif arguments.command == 'payload':
+            rows = catalog.find_payload(arguments.SHA256)
+        else:
+            rows = catalog.shared_payloads(arguments.CONTAINER)
+
+    for row in rows:
+        print('\t'.join('' if value is None else str(value) for value in row))
+
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import pathlib
+import argparse
+
+from ros_lib.ros_client import send_request
+
+
+def setup_arguments() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description='Sends jobs to a daemon started with ros_packer.py --serve SOCKET.')
+    parser.add_argument('SOCKET', type=pathlib.Path, help='Unix socket of the daemon.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    pack = commands.add_parser('pack', help='pack a directory or a manifest')
+    pack.add_argument('-o', '--output', type=pathlib.Path, default=pathlib.Path('container.ros'),
+                      help='name your output')
+    pack.add_argument('--manifest', type=pathlib.Path, help='JSON or TOML manifest instead of DIR_TO_PACK')
+    group = pack.add_mutually_exclusive_group(required=True)
+    group.add_argument('-m', '--mirror', type=pathlib.Path, help='ros-file to mirror')
+    group.add_argument('-V', '--version', type=int, choices=[1, 2], help='select header version 1 or 2')
+    pack.add_argument('DIR_TO_PACK', type=pathlib.Path, nargs='?', help='location of the unpacked ros structure.')
+
+    verify = commands.add_parser('verify', help='verify containers')
+    verify.add_argument('CONTAINER', type=pathlib.Path, nargs='+', help='ros-files to verify.')
+
+    unpack = commands.add_parser('unpack', help='unpack a container')
+    unpack.add_argument('-o', '--output', type=pathlib.Path,
+                        help='directory to unpack into, defaults to the container name without suffix')
+    unpack.add_argument('-j', '--jobs', type=int, help='number of payloads written in parallel')
+    unpack.add_argument('CONTAINER', type=pathlib.Path, help='ros-file to unpack.')
+
+    commands.add_parser('stats', help='show jobs run and cache hits of the daemon')
+    commands.add_parser('shutdown', help='stop the daemon')
+    args = parser.parse_args()
+
+    return args
+
+
+def build_request(arguments: argparse.Namespace) -> dict:
+    """
+    Turns the arguments into a request. Paths are made absolute, the daemon does not share the working directory.
+    """
+    def absolute(path):
+        return str(path.absolute()) if path is not None else None
+
+    request = {'command': arguments.command}
+    if arguments.command == 'pack':
+        request.update(source=absolute(arguments.DIR_TO_PACK), manifest=absolute(arguments.manifest),
+                       mirror=absolute(arguments.mirror), version=arguments.version,
+                       output=absolute(arguments.output))
+    elif arguments.command == 'verify':
+        request.update(containers=[absolute(path) for path in arguments.CONTAINER])
+    elif arguments.command == 'unpack':
+        output = arguments.output if arguments.output is not None else pathlib.Path(arguments.CONTAINER.stem)
+        request.update(container=absolute(arguments.CONTAINER), output=absolute(output), jobs=arguments.jobs)
+    return request
+
+
+def main():
+    arguments = setup_arguments()
+
+    try:
+        response = send_request(arguments.SOCKET, build_request(arguments))
+    except (OSError, ValueError) as error:
+        print('Error: no daemon answers on {}: {}'.format(arguments.SOCKET, error))
+        return 1
+
+    for line in response.get('output', []):
+        print(line)
+    if 'error' in response:
+        print('Error: {}'.format(response['error']))
+    return response['status']
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import pathlib
+import argparse
+
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_delta import diff_ros, patch_ros
+from ros_lib.ros_pack import check_ros
+
+
+def check_arguments(arguments: argparse.Namespace) -> bool:
+    """
+    Checking arguments and returns False if: BASE or the second input (TARGET or DELTA) does not exist or is no file,
+    OUTPUT already exists.
+    """
+    second = arguments.TARGET if arguments.command == 'diff' else arguments.DELTA
+
+    if arguments.verbosity:
+        print('\nChecking Arguments:\ngiven base: {}\ngiven {}: {}\ngiven output {}'.format(
+            arguments.BASE, 'target' if arguments.command == 'diff' else 'delta', second, arguments.output))
+
+    for path in (arguments.BASE, second):
+        if not path.exists():
+            print('Error: {} does not exist!'.format(path.name))
+            return False
+
+        if not path.is_file():
+            print('Error: {} is not a file!'.format(path.name))
+            return False
+
+    if arguments.output.exists():
+        print('Error: {} already exists!'.format(arguments.output.name))
+        return False
+
+    return True
+
+
+def setup_arguments() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description='Creates and applies deltas between ros containers.')
+    parser.add_argument('-v', '--verbosity', help='increase output verbosity', action='store_true')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    diff = commands.add_parser('diff', help='write a delta which turns BASE into TARGET')
+    diff.add_argument('-o', '--output', type=pathlib.Path, default=pathlib.Path('container.delta'),
+                      help='name of the delta')
+    diff.add_argument('BASE', type=pathlib.Path, help='ros-file the delta is applied to.')
+    diff.add_argument('TARGET', type=pathlib.Path, help='ros-file the delta rebuilds.')
+
+    patch = commands.add_parser('patch', help='rebuild the target container of DELTA from BASE')
+    patch.add_argument('-o', '--output', type=pathlib.Path, default=pathlib.Path('container.ros'),
+                       help='name of the rebuilt container')
+    patch.add_argument('BASE', type=pathlib.Path, help='ros-file the delta was created for.')
+    patch.add_argument('DELTA', type=pathlib.Path, help='delta created by diff.')
+    args = parser.parse_args()
+
+    return args
+
+
+def main():
+    arguments = setup_arguments()
+
+    if not check_arguments(arguments):
+        return 1
+
+    if not check_ros(arguments.BASE) or (arguments.command == 'diff' and not check_ros(arguments.TARGET)):
+        return 3
+
+    try:
+        with RosContainer(arguments.BASE) as base:
+            if arguments.command == 'diff':
+                with RosContainer(arguments.TARGET) as target:
+                    diff_ros(base, target, arguments.output, arguments.verbosity)
+            else:
+                patch_ros(base, arguments.DELTA, arguments.output, arguments.verbosity)
+    except ValueError as error:
+        print('Error: {}'.format(error))
+        return 3
+    except OSError as error:
+        print('Error: {}'.format(error))
+        return 4
+
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,86 @@
+import asyncio
+import io
+import os
+import pathlib
+from concurrent.futures import Executor
+from typing import BinaryIO, List, Optional, Union
+
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_manifest import RosSourceEntry
+from ros_lib.ros_stream import plan_ros, stream_ros, write_planned_to
+
+Mirror = Union[None, RosContainer, str, os.PathLike]
+Output = Union[None, str, os.PathLike, BinaryIO]
+
+
+def _open_mirror(mirror: Mirror, version: Optional[int]) -> Optional[RosContainer]:
+    if (mirror is None) == (version is None):
+        raise ValueError('either a mirror file or a header version has to be given')
+    if mirror is None or isinstance(mirror, RosContainer):
+        return mirror
+    return RosContainer(pathlib.Path(mirror))
+
+
+def pack_to_file(source_directory: pathlib.Path, output: BinaryIO, mirror: Mirror = None,
+                 version: Optional[int] = None, verbose: bool = False,
+                 sources: Optional[List[RosSourceEntry]] = None) -> int:
+    """
+    Packs a directory, or the files given by SOURCES, into any writable binary file object, e.g. an open file, a pipe
+    or sys.stdout.buffer. The output does not have to be seekable. Returns the number of bytes written.
+    """
+    container = _open_mirror(mirror, version)
+    try:
+        plan, end_offset = plan_ros(source_directory, container, verbose, version, sources)
+        return write_planned_to(plan, end_offset, source_directory, container, verbose, version, output)
+    finally:
+        if container is not None and container is not mirror:
+            container.close()
+
+
+def pack_to_bytes(source_directory: pathlib.Path, mirror: Mirror = None, version: Optional[int] = None,
+                  verbose: bool = False) -> bytes:
+    """
+    Packs a directory and returns the container.
+    """
+    output = io.BytesIO()
+    pack_to_file(source_directory, output, mirror, version, verbose)
+    return output.getvalue()
+
+
+def pack_to_path(source_directory: pathlib.Path, output_path: pathlib.Path, mirror: Mirror = None,
+                 version: Optional[int] = None, verbose: bool = False) -> int:
+    """
+    Packs a directory into a new file and returns its size.
+    """
+    container = _open_mirror(mirror, version)
+    try:
+        stream_ros(source_directory, container, verbose, version, pathlib.Path(output_path))
+    finally:
+        if container is not None and container is not mirror:
+            container.close()
+    return pathlib.Path(output_path).stat().st_size
+
+
+def pack(source_directory: pathlib.Path, output: Output = None, mirror: Mirror = None, version: Optional[int] = None,
+         verbose: bool = False) -> Union[bytes, int]:
+    """
+    Packs a directory either into bytes (OUTPUT is None), a new file (OUTPUT is a path) or a writable binary file object.
+    Returns the container for bytes, otherwise the number of bytes written.
+    """
+    source_directory = pathlib.Path(source_directory)
+    if output is None:
+        return pack_to_bytes(source_directory, mirror, version, verbose)
+    if isinstance(output, (str, os.PathLike)):
+        return pack_to_path(source_directory, pathlib.Path(output), mirror, version, verbose)
+    return pack_to_file(source_directory, output, mirror, version, verbose)
+
+
+async def pack_ros_async(source_directory: pathlib.Path, output: Output = None, mirror: Mirror = None,
+                         version: Optional[int] = None, verbose: bool = False,
+                         executor: Optional[Executor] = None) -> Union[bytes, int]:
+    """
+    Like pack(), but file reads, checksums and writes run in EXECUTOR (the default executor of the loop if None), so the
+    event loop is not blocked and several containers can be packed concurrently.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, pack, source_directory, output, mirror, version, verbose)
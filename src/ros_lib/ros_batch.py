@@ -0,0 +1,158 @@
+import json
+import multiprocessing
+import os
+import pathlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_pack import check_ros
+from ros_lib.ros_stream import stream_ros
+
+
+class RosBatchJob(NamedTuple):
+    """One container of a batch: the directory to pack, the reference container or header version and the output."""
+    source: pathlib.Path
+    output: pathlib.Path
+    mirror: Optional[pathlib.Path] = None
+    version: Optional[int] = None
+
+
+class RosBatchResult(NamedTuple):
+    """Outcome of one job. STATUS is the exit code ros_packer.py would have returned, SECONDS the time packing took."""
+    job: RosBatchJob
+    status: int
+    seconds: float
+    error: Optional[str] = None
+
+
+# reference containers parsed by the batch, inherited by forked workers, opened on first use by others
+_mirrors = {}  # type: Dict[pathlib.Path, RosContainer]
+
+
+def parse_jobs(data, base_directory: pathlib.Path) -> List[RosBatchJob]:
+    """
+    Turns a parsed job list into jobs. The job list is a list of jobs or an object with the list in 'jobs'. Every job
+    has a 'source' directory, an 'output' and either a 'mirror' container or a header 'version'. Relative paths are
+    taken from BASE_DIRECTORY.
+    """
+    if isinstance(data, dict):
+        data = data.get('jobs')
+    if not isinstance(data, list) or not data:
+        raise ValueError('job list has no jobs')
+
+    jobs = []
+    outputs = set()
+    for i, item in enumerate(data):
+        if not isinstance(item, dict) or not isinstance(item.get('source'), str) or \
+                not isinstance(item.get('output'), str):
+            raise ValueError('job {} has no source or no output'.format(i))
+        if ('mirror' in item) == ('version' in item):
+            raise ValueError('job {} needs either a mirror or a version'.format(i))
+        if 'version' in item and item['version'] not in (1, 2):
+            raise ValueError('version of job {} is neither 1 nor 2'.format(i))
+        if 'mirror' in item and not isinstance(item['mirror'], str):
+            raise ValueError('mirror of job {} is no path'.format(i))
+
+        output = base_directory / os.path.expanduser(item['output'])
+        if output in outputs:
+            raise ValueError('output {} is written by two jobs'.format(output))
+        outputs.add(output)
+        mirror = base_directory / os.path.expanduser(item['mirror']) if 'mirror' in item else None
+        jobs.append(RosBatchJob(base_directory / os.path.expanduser(item['source']), output, mirror,
+                                item.get('version')))
+    return jobs
+
+
+def read_jobs(job_list: pathlib.Path) -> List[RosBatchJob]:
+    """
+    Reads a JSON job list. Relative paths are taken from the directory of the job list.
+    """
+    try:
+        data = json.loads(job_list.read_text())
+    except ValueError as error:
+        raise ValueError('{}: {}'.format(job_list.name, error))
+    return parse_jobs(data, job_list.absolute().parent)
+
+
+def open_mirrors(jobs: List[RosBatchJob]) -> Dict[pathlib.Path, str]:
+    """
+    Checks and parses every distinct reference container of the jobs once. Returns the error of every reference that
+    can not be used.
+    """
+    errors = {}
+    for mirror in sorted({job.mirror for job in jobs if job.mirror is not None}):
+        if mirror in _mirrors:
+            continue
+        if not mirror.is_file():
+            errors[mirror] = '{} is no file'.format(mirror)
+        elif not check_ros(mirror):
+            errors[mirror] = '{} is no ros container'.format(mirror)
+        else:
+            try:
+                _mirrors[mirror] = RosContainer(mirror)
+            except ValueError as error:
+                errors[mirror] = str(error)
+    return errors
+
+
+def close_mirrors() -> None:
+    for mirror in _mirrors.values():
+        mirror.close()
+    _mirrors.clear()
+
+
+def run_job(job: RosBatchJob) -> RosBatchResult:
+    """
+    Packs one job with the streaming packer. Errors are returned with the exit codes of ros_packer.py: 1 for a job that
+    can not be started, 3 for broken input and 4 for a failed write.
+    """
+    start = time.perf_counter()
+    if not job.source.is_dir() or not any(job.source.iterdir()):
+        return RosBatchResult(job, 1, 0.0, '{} is no directory or empty'.format(job.source))
+    if job.output.exists():
+        return RosBatchResult(job, 1, 0.0, '{} already exists'.format(job.output))
+
+    try:
+        mirror = None
+        if job.mirror is not None:
+            if job.mirror not in _mirrors:
+                _mirrors[job.mirror] = RosContainer(job.mirror)
+            mirror = _mirrors[job.mirror]
+        stream_ros(job.source, mirror, False, job.version, job.output)
+    except ValueError as error:
+        return RosBatchResult(job, 3, time.perf_counter() - start, str(error))
+    except OSError as error:
+        return RosBatchResult(job, 4, time.perf_counter() - start, str(error))
+    return RosBatchResult(job, 0, time.perf_counter() - start)
+
+
+def run_batch(jobs: List[RosBatchJob], workers: Optional[int] = None) -> Iterator[RosBatchResult]:
+    """
+    Packs many containers across a process pool, one process per CPU unless WORKERS is given, and yields the results in
+    the order of JOBS. Every reference container is parsed once up front; where processes are forked the workers share
+    the parsed references, elsewhere every worker parses a reference on its first job. Jobs of a reference that can not
+    be used fail with status 3 without being started.
+    """
+    errors = open_mirrors(jobs)
+    try:
+        runnable = [job for job in jobs if job.mirror not in errors]
+        if len(runnable) <= 1 or workers == 1:
+            yield from merge_results(jobs, errors, map(run_job, runnable))
+            return
+
+        context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            yield from merge_results(jobs, errors, pool.map(run_job, runnable))
+    finally:
+        close_mirrors()
+
+
+def merge_results(jobs: List[RosBatchJob], errors: Dict[pathlib.Path, str],
+                  results: Iterator[RosBatchResult]) -> Iterator[RosBatchResult]:
+    for job in jobs:
+        if job.mirror in errors:
+            yield RosBatchResult(job, 3, 0.0, errors[job.mirror])
+        else:
+            yield next(results)
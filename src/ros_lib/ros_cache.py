@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import pathlib
+from typing import Dict, List, Optional, Tuple
+
+from ros_lib.ros_checksum import byte_sum
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_stream import CHUNK_SIZE, RosPayloadSource, copy_range, plan_ros, write_planned_ros
+
+DEFAULT_MAX_SIZE = 1 << 30  # 1 GiB
+MEMO_LIMIT = 100000  # number of files whose hash and byte sum are remembered
+
+
+class RosCache:
+    """
+    Content-addressed on-disk cache of packed containers.
+
+    Every build is described by a manifest of its inputs: name, size and SHA-256 of every payload in packing order, the
+    header version and the SHA-256 of the reference container. The hash of those inputs is the key of the cached image
+    in OBJECTS. Next to the image the full manifest is stored, including the byte sum and LZMA-subheader of every
+    payload. Hashes and byte sums of input files are remembered by path, size, mtime, ctime and inode, so unchanged
+    files are neither hashed nor summed again. Images are evicted least recently used first once the cache exceeds
+    MAX_SIZE.
+    """
+
+    def __init__(self, directory: pathlib.Path, max_size: int = DEFAULT_MAX_SIZE, hardlink: bool = False):
+        self.directory = directory
+        self.objects = directory / 'objects'
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.hardlink = hardlink
+        self._memo_path = directory / 'files.json'
+        try:
+            self._files = json.loads(self._memo_path.read_text())  # type: Dict[str, List]
+        except (FileNotFoundError, ValueError):
+            self._files = {}
+
+    @staticmethod
+    def _stat_key(path: pathlib.Path) -> str:
+        stat = path.stat()
+        # ctime can not be set back by touch or os.utime, an edit keeping size and mtime still changes it
+        return '{}:{}:{}:{}:{}'.format(path.resolve(), stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns, stat.st_ino)
+
+    def digest_file(self, path: pathlib.Path) -> Tuple[str, int]:
+        """
+        Returns SHA-256 and byte sum of a file. Both are computed in one pass and remembered until the file changes.
+        """
+        key = self._stat_key(path)
+        if key in self._files:
+            self._files[key] = self._files.pop(key)  # most recently used last
+            return self._files[key][0], self._files[key][1]
+
+        digest = hashlib.sha256()
+        checksum = 0
+        buffer = bytearray(CHUNK_SIZE)
+        with open(path, 'rb') as file, memoryview(buffer) as view:
+            for count in iter(lambda: file.readinto(buffer), 0):
+                digest.update(view[:count])
+                checksum = checksum + byte_sum(view[:count])
+
+        self._files[key] = [digest.hexdigest(), checksum]
+        return self._files[key][0], self._files[key][1]
+
+    def manifest(self, plan: List[RosPayloadSource], mirror: Optional[RosContainer], version: int) -> Dict:
+        """
+        Describes a planned build. The byte sums of the payloads are filled into the plan on the way.
+        """
+        entries = []
+        for entry in plan:
+            sha256, entry.checksum = self.digest_file(entry.path)
+            entries.append({'name': entry.name, 'size': entry.size, 'sha256': sha256, 'checksum': entry.checksum,
+                            'subheader': entry.subheader.hex()})
+
+        return {'version': version if mirror is None else mirror.version,
+                'reference': self.digest_file(mirror.path)[0] if mirror is not None else None,
+                'entries': entries}
+
+    @staticmethod
+    def key(manifest: Dict) -> str:
+        inputs = [manifest['version'], manifest['reference'],
+                  [(entry['name'], entry['size'], entry['sha256']) for entry in manifest['entries']]]
+        return hashlib.sha256(json.dumps(inputs).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _copy(source_path: pathlib.Path, output_path: pathlib.Path) -> None:
+        with open(source_path, 'rb') as source, open(output_path, 'xb') as output:
+            copy_range(source.fileno(), output.fileno(), os.fstat(source.fileno()).st_size, 0)
+
+    def _store(self, output_path: pathlib.Path, key: str, manifest: Dict) -> None:
+        temporary = self.objects / '.{}.{}.tmp'.format(key, os.getpid())
+        self._copy(output_path, temporary)
+        os.replace(temporary, self.objects / (key + '.ros'))
+        temporary.write_text(json.dumps(manifest, indent=1))
+        os.replace(temporary, self.objects / (key + '.json'))
+
+    def save(self) -> None:
+        """
+        Writes the remembered hashes and byte sums of input files to the cache directory.
+        """
+        for key in list(self._files)[:max(0, len(self._files) - MEMO_LIMIT)]:
+            del self._files[key]
+        temporary = self.directory / '.files.{}.tmp'.format(os.getpid())
+        temporary.write_text(json.dumps(self._files))
+        os.replace(temporary, self._memo_path)
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used images until the cache fits into MAX_SIZE.
+        """
+        images = []
+        for image in self.objects.glob('*.ros'):
+            try:
+                images.append((image.stat(), image))
+            except FileNotFoundError:  # evicted by another process
+                pass
+
+        total = sum(stat.st_size for stat, _ in images)
+        for stat, image in sorted(images, key=lambda item: item[0].st_mtime_ns):
+            if total <= self.max_size:
+                break
+            for path in (image, image.with_suffix('.json')):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            total = total - stat.st_size
+
+    def pack(self, source_directory: pathlib.Path, mirror: Optional[RosContainer], verbose: bool, version: int,
+             output_path: pathlib.Path) -> bool:
+        """
+        Packs a directory like stream_ros, but publishes the cached image if the same inputs were packed before.
+        """
+        plan, end_offset = plan_ros(source_directory, mirror, verbose, version)
+        manifest = self.manifest(plan, mirror, version)
+        key = self.key(manifest)
+        image = self.objects / (key + '.ros')
+
+        try:
+            os.utime(image)  # least recently used is judged by mtime
+            if self.hardlink:
+                os.link(image, output_path)
+            else:
+                self._copy(image, output_path)
+            if verbose:
+                print('\ncache hit {}'.format(key))
+        except FileNotFoundError:
+            if verbose:
+                print('\ncache miss {}'.format(key))
+            write_planned_ros(plan, end_offset, source_directory, mirror, verbose, version, output_path)
+            self._store(output_path, key, manifest)
+            self.evict()
+
+        self.save()
+        return True
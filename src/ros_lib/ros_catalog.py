@@ -0,0 +1,204 @@
+import fnmatch
+import os
+import pathlib
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_delta import entry_digest
+from ros_lib.ros_struct import HEADER_V1, HEADER_V2, TIME_STAMP, RosHeaderV1Struct, RosHeaderV2Struct
+from ros_lib.ros_unpack import has_lzma_subheader
+
+CONTAINERS_PER_TASK = 8  # containers handed to a worker process at once
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS containers (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    version INTEGER,
+    time_stamp TEXT,
+    firmware_version TEXT,
+    unknown1 BLOB,
+    unknown2 BLOB,
+    unknown3 BLOB,
+    dir_entries INTEGER,
+    payload_checksum INTEGER,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    container_id INTEGER NOT NULL REFERENCES containers (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    unknown BLOB NOT NULL,
+    lzma INTEGER NOT NULL,
+    sha256 TEXT,
+    PRIMARY KEY (container_id, position)
+);
+CREATE INDEX IF NOT EXISTS entries_name ON entries (name);
+CREATE INDEX IF NOT EXISTS entries_sha256 ON entries (sha256);
+'''
+
+
+def format_time_stamp(time_stamp: bytes) -> str:
+    second, minute, hour, _, day, month, year = TIME_STAMP.unpack(time_stamp)
+    return '{:04}-{:02}-{:02}T{:02}:{:02}:{:02}'.format(year, month, day, hour, minute, second)
+
+
+def describe_container(path: pathlib.Path, size: int, mtime_ns: int) -> Tuple[Dict, List[Tuple]]:
+    """
+    Parses header and directory table of a container and hashes every payload that lies inside the container. Returns
+    the row of the container and the rows of its entries. Containers which can not be parsed get an error instead.
+    """
+    row = {'path': str(path), 'size': size, 'mtime_ns': mtime_ns, 'version': None, 'time_stamp': None,
+           'firmware_version': None, 'unknown1': None, 'unknown2': None, 'unknown3': None, 'dir_entries': None,
+           'payload_checksum': None, 'error': None}
+    try:
+        with RosContainer(path) as container:
+            if container.is_version1:
+                header = RosHeaderV1Struct(*HEADER_V1.unpack(container.header))
+                row.update(unknown1=header.unknown1, unknown2=header.unknown2, payload_checksum=header.checksum)
+            else:
+                header = RosHeaderV2Struct(*HEADER_V2.unpack(container.header))
+                row.update(unknown1=header.unknown1, unknown2=header.unknown2, unknown3=header.unknown3,
+                           firmware_version=header.version.rstrip(b'\x00').decode('ascii', 'replace'),
+                           payload_checksum=header.payload_checksum2)
+            row.update(version=container.version, time_stamp=format_time_stamp(header.time_stamp),
+                       dir_entries=header.dir_entries)
+
+            entries = []
+            for entry in container.entries:
+                inside = entry.offset + entry.length <= len(container)
+                entries.append((entry.index, entry.name.rstrip(b'\x00').decode('ascii', 'replace'), entry.offset,
+                                entry.length, entry.unknown, int(inside and has_lzma_subheader(container, entry)),
+                                entry_digest(container, entry).hex() if inside else None))
+    except (OSError, ValueError) as error:
+        row['error'] = str(error)
+        entries = []
+    return row, entries
+
+
+def _describe(job: Tuple[pathlib.Path, int, int]) -> Tuple[Dict, List[Tuple]]:
+    return describe_container(*job)
+
+
+class RosCatalog:
+    """
+    SQLite index of the headers and directory tables of many containers. Every container is stored with its size and
+    mtime, so a re-scan only parses containers that were added or changed. Queries are answered from the index alone.
+    """
+
+    def __init__(self, database: pathlib.Path):
+        self.database = database
+        self._connection = sqlite3.connect(str(database))
+        self._connection.execute('PRAGMA foreign_keys = ON')
+        self._connection.executescript(SCHEMA)
+
+    def __enter__(self) -> 'RosCatalog':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    @staticmethod
+    def find_containers(directory: pathlib.Path, pattern: str = '*.ros') -> Iterator[Tuple[pathlib.Path, int, int]]:
+        """
+        Walks a directory tree with scandir and yields path, size and mtime of every file matching PATTERN.
+        """
+        pending = [str(directory)]
+        while pending:
+            with os.scandir(pending.pop()) as scan:
+                for entry in scan:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file() and fnmatch.fnmatchcase(entry.name, pattern):
+                        stat = entry.stat()
+                        yield pathlib.Path(entry.path).absolute(), stat.st_size, stat.st_mtime_ns
+
+    def scan(self, directory: pathlib.Path, pattern: str = '*.ros', workers: Optional[int] = None,
+             verbose: bool = False) -> Tuple[int, int, int]:
+        """
+        Brings the index of a directory tree up to date. Containers of unchanged size and mtime are skipped, new and
+        changed ones are parsed across a process pool and containers which disappeared are dropped. Returns the number
+        of parsed, unchanged and dropped containers.
+        """
+        directory = directory.absolute()
+        prefix = os.path.join(str(directory), '')
+        known = {path: (size, mtime_ns) for path, size, mtime_ns in self._connection.execute(
+            'SELECT path, size, mtime_ns FROM containers WHERE substr(path, 1, ?) = ?', (len(prefix), prefix))}
+
+        jobs = []
+        unchanged = 0
+        for path, size, mtime_ns in self.find_containers(directory, pattern):
+            if known.pop(str(path), None) == (size, mtime_ns):
+                unchanged = unchanged + 1
+            else:
+                jobs.append((path, size, mtime_ns))
+
+        with self._connection:
+            for path in known:
+                self._connection.execute('DELETE FROM containers WHERE path = ?', (path,))
+
+            if jobs:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    for row, entries in pool.map(_describe, jobs, chunksize=CONTAINERS_PER_TASK):
+                        self._store(row, entries)
+                        if verbose:
+                            print('{} {}'.format(row['path'], row['error'] or 'indexed'))
+
+        if verbose:
+            print('{} parsed, {} unchanged, {} dropped'.format(len(jobs), unchanged, len(known)))
+        return len(jobs), unchanged, len(known)
+
+    def _store(self, row: Dict, entries: List[Tuple]) -> None:
+        self._connection.execute('DELETE FROM containers WHERE path = ?', (row['path'],))
+        cursor = self._connection.execute(
+            'INSERT INTO containers ({}) VALUES ({})'.format(', '.join(row), ', '.join('?' * len(row))),
+            tuple(row.values()))
+        self._connection.executemany(
+            'INSERT INTO entries (container_id, position, name, offset, length, unknown, lzma, sha256) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', [(cursor.lastrowid,) + entry for entry in entries])
+
+    def containers(self) -> List[Tuple]:
+        """
+        Returns path, version, time stamp, firmware version, number of entries and parse error of every container.
+        """
+        return self._connection.execute('SELECT path, version, time_stamp, firmware_version, dir_entries, error '
+                                        'FROM containers ORDER BY path').fetchall()
+
+    def find_entry(self, name: str) -> List[Tuple]:
+        """
+        Returns container path, position, offset, length and SHA-256 of every entry called NAME. NAME may be a glob
+        pattern.
+        """
+        return self._connection.execute(
+            'SELECT containers.path, position, offset, length, sha256 FROM entries JOIN containers '
+            'ON containers.id = container_id WHERE name GLOB ? ORDER BY containers.path, position', (name,)).fetchall()
+
+    def find_payload(self, sha256: str) -> List[Tuple]:
+        """
+        Returns container path, position and name of every entry with the given content hash.
+        """
+        return self._connection.execute(
+            'SELECT containers.path, position, name FROM entries JOIN containers ON containers.id = container_id '
+            'WHERE sha256 = ? ORDER BY containers.path, position', (sha256.lower(),)).fetchall()
+
+    def shared_payloads(self, path: pathlib.Path) -> List[Tuple]:
+        """
+        Returns name of the entry, path of the other container and name of its entry for every payload a container
+        shares with other containers of the index.
+        """
+        return self._connection.execute(
+            'SELECT mine.name, containers.path, theirs.name FROM containers AS own '
+            'JOIN entries AS mine ON mine.container_id = own.id '
+            'JOIN entries AS theirs ON theirs.sha256 = mine.sha256 AND theirs.container_id != own.id '
+            'JOIN containers ON containers.id = theirs.container_id '
+            'WHERE own.path = ? AND mine.length > 0 ORDER BY mine.position, containers.path',
+            (str(path.absolute()),)).fetchall()
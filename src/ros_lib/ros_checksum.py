@@ -0,0 +1,114 @@
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Union
+
+from ros_lib.ros_stats import timer
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, the pure Python backend is used without it
+    numpy = None
+
+CHECKSUM_MASK = 0xFFFFFFFF  # checksums are stored as 4 Byte little endian and wrap around
+CHUNK_SIZE = 1 << 20  # 1 MiB
+PARALLEL_THRESHOLD = 32 << 20  # buffers above 32 MiB are split across the thread pool
+
+
+def checksum32(value: int) -> int:
+    """
+    Reduces a byte sum to the 32 bit stored in the checksum fields of the headers.
+    """
+    return value & CHECKSUM_MASK
+
+
+class PythonChecksum:
+    """
+    Byte sum in pure Python. Large buffers are summed chunk by chunk, so memory maps are never copied as a whole.
+    """
+    name = 'python'
+
+    def sum(self, data) -> int:
+        if isinstance(data, bytes):
+            return sum(data)
+
+        checksum = 0
+        with memoryview(data) as view:
+            view = view.cast('B') if view.format != 'B' else view
+            for position in range(0, len(view), CHUNK_SIZE):
+                checksum = checksum + sum(view[position:position + CHUNK_SIZE].tobytes())
+        return checksum
+
+
+class NumpyChecksum:
+    """
+    Vectorized byte sum with NumPy. NumPy releases the GIL while summing, so large buffers are split into parts which
+    are summed concurrently by a thread pool.
+    """
+    name = 'numpy'
+
+    def __init__(self, workers: Optional[int] = None, parallel_threshold: int = PARALLEL_THRESHOLD):
+        if numpy is None:
+            raise ImportError('the numpy checksum backend needs NumPy')
+        self.workers = workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+        self._pool = None  # type: Optional[ThreadPoolExecutor]
+
+    @staticmethod
+    def _sum_part(view: memoryview) -> int:
+        return int(numpy.frombuffer(view, dtype=numpy.uint8).sum(dtype=numpy.uint64))
+
+    def sum(self, data) -> int:
+        with memoryview(data) as view:
+            view = view.cast('B') if view.format != 'B' else view
+            if len(view) < self.parallel_threshold or self.workers == 1:
+                return self._sum_part(view)
+
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ros_checksum')
+            part_size = -(-len(view) // self.workers)
+            parts = [view[position:position + part_size] for position in range(0, len(view), part_size)]
+            checksum = sum(self._pool.map(self._sum_part, parts))
+            for part in parts:
+                part.release()
+            return checksum
+
+
+_backend = NumpyChecksum() if numpy is not None else PythonChecksum()
+
+
+def get_backend() -> Union[PythonChecksum, NumpyChecksum]:
+    return _backend
+
+
+def set_backend(backend: Union[str, PythonChecksum, NumpyChecksum]) -> None:
+    """
+    Selects the backend used for all checksums, either by name ('python' or 'numpy') or as an instance providing sum().
+    """
+    global _backend
+    if backend == PythonChecksum.name:
+        backend = PythonChecksum()
+    elif backend == NumpyChecksum.name:
+        backend = NumpyChecksum()
+    elif isinstance(backend, str):
+        raise ValueError('unknown checksum backend {}'.format(backend))
+    _backend = backend
+
+
+def byte_sum(data) -> int:
+    """
+    Returns the byte sum of DATA (bytes, bytearray, memoryview or mmap) without reducing it to 32 bit.
+    """
+    with timer('checksum'):
+        return _backend.sum(data)
+
+
+def sum_file(file_no: int, size: int) -> int:
+    """
+    Returns the byte sum of the first SIZE bytes of an open file, read from a memory map.
+    """
+    if size == 0:
+        return 0
+
+    with mmap.mmap(file_no, size, access=mmap.ACCESS_READ) as view:
+        return byte_sum(view)
@@ -0,0 +1,20 @@
+import json
+import pathlib
+import socket
+from typing import Dict
+
+# kept free of the packer modules, so a client starts without loading them
+
+
+def send_request(socket_path: pathlib.Path, request: Dict) -> Dict:
+    """
+    Sends one request to a pack daemon and returns its response.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(str(socket_path))
+        connection.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with connection.makefile('rb') as response:
+            line = response.readline()
+    if not line:
+        raise ConnectionError('{} closed the connection'.format(socket_path))
+    return json.loads(line)
@@ -0,0 +1,138 @@
+import fnmatch
+import json
+import lzma
+import pathlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_manifest import scan_directory
+from ros_lib.ros_stats import count, timer
+from ros_lib.ros_stream import CHUNK_SIZE, plan_ros, write_planned_ros
+
+DEFAULT_PRESET = 6
+DICT_SIZE_MIN = 4096  # smallest and largest dictionary liblzma accepts for LZMA1
+DICT_SIZE_MAX = (1 << 30) + (1 << 29)
+LZMA_MAGIC = (93).to_bytes(2, byteorder='little')
+
+
+def lzma_filters(preset: int, dict_size: Optional[int]) -> List[Dict]:
+    """
+    Returns the LZMA1 filter chain of a preset. DICT_SIZE overrides the dictionary size of the preset.
+    """
+    options = {'id': lzma.FILTER_LZMA1, 'preset': preset}
+    if dict_size is not None:
+        options['dict_size'] = dict_size
+    return [options]
+
+
+def compress_file(source: pathlib.Path, destination: pathlib.Path, preset: int = DEFAULT_PRESET,
+                  dict_size: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Compresses a file in chunks to a .lzma (FORMAT_ALONE) file and returns the uncompressed and compressed size. The
+    LZMA header does not carry the uncompressed size, it ends with an end marker instead.
+    """
+    compressor = lzma.LZMACompressor(format=lzma.FORMAT_ALONE, filters=lzma_filters(preset, dict_size))
+    size = 0
+    with open(source, 'rb') as raw, open(destination, 'xb') as compressed:
+        for chunk in iter(lambda: raw.read(CHUNK_SIZE), b''):
+            size = size + len(chunk)
+            compressed.write(compressor.compress(chunk))
+        compressed.write(compressor.flush())
+        return size, compressed.tell()
+
+
+def check_options(name: str, options: Dict) -> Dict:
+    """
+    Returns the compression OPTIONS of a payload if liblzma accepts them, raises ValueError otherwise.
+    """
+    preset = options.get('preset', DEFAULT_PRESET)
+    if type(preset) is not int or not 0 <= preset <= 9:
+        raise ValueError('preset {!r} of {} is not between 0 and 9'.format(preset, name))
+    dict_size = options.get('dict_size', DICT_SIZE_MIN)
+    if type(dict_size) is not int or not DICT_SIZE_MIN <= dict_size <= DICT_SIZE_MAX:
+        raise ValueError('dict_size {!r} of {} is not between {} and {}'.format(dict_size, name, DICT_SIZE_MIN,
+                                                                                 DICT_SIZE_MAX))
+    return options
+
+
+def read_compress_manifest(manifest: pathlib.Path) -> Dict[str, Dict]:
+    """
+    Reads a JSON manifest of payloads to compress. It is either a list of names or an object mapping names to options
+    ('preset', 'dict_size') for that payload. Options liblzma would refuse raise ValueError.
+    """
+    data = json.loads(manifest.read_text())
+    if isinstance(data, list):
+        return {name: {} for name in data}
+    if isinstance(data, dict):
+        return {name: check_options(name, options) if isinstance(options, dict) else {}
+                for name, options in data.items()}
+    raise ValueError('{} is neither a list nor an object'.format(manifest.name))
+
+
+def select_payloads(paths: List[pathlib.Path], patterns: List[str],
+                    manifest: Optional[Dict[str, Dict]] = None) -> Dict[pathlib.Path, Dict]:
+    """
+    Returns the payloads whose name matches one of the glob PATTERNS or is listed in MANIFEST, with their options.
+    Payloads which already look like a LZMA archive are left out.
+    """
+    selected = {}
+    for path in paths:
+        options = None
+        if manifest is not None and path.name in manifest:
+            options = manifest[path.name]
+        elif any(fnmatch.fnmatchcase(path.name, pattern) for pattern in patterns):
+            options = {}
+        if options is None:
+            continue
+
+        with open(path, 'rb') as file:
+            if file.read(2) == LZMA_MAGIC:
+                continue
+        selected[path] = options
+    return selected
+
+
+def compress_payloads(selected: Dict[pathlib.Path, Dict], work_directory: pathlib.Path, preset: int = DEFAULT_PRESET,
+                      dict_size: Optional[int] = None, workers: Optional[int] = None,
+                      verbose: bool = False) -> Dict[str, int]:
+    """
+    Compresses the selected payloads into the work directory across a process pool, keeping their names. Returns the
+    uncompressed size of every compressed payload by name.
+    """
+    sizes = {}
+    with timer('compress'), ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = {path: pool.submit(compress_file, path, work_directory / path.name, options.get('preset', preset),
+                                  options.get('dict_size', dict_size))
+                for path, options in selected.items()}
+        for path, job in jobs.items():
+            sizes[path.name], compressed_size = job.result()
+            count('bytes_compressed', sizes[path.name])
+            if verbose:
+                print('compressed {} from {} to {} bytes'.format(path.name, sizes[path.name], compressed_size))
+    return sizes
+
+
+def compress_ros(source_directory: pathlib.Path, mirror: Optional[RosContainer], verbose: bool, version: int,
+                 output_path: pathlib.Path, patterns: List[str], manifest: Optional[Dict[str, Dict]] = None,
+                 preset: int = DEFAULT_PRESET, dict_size: Optional[int] = None,
+                 workers: Optional[int] = None) -> bool:
+    """
+    Packs a directory like stream_ros, but compresses the selected raw payloads with LZMA first. The uncompressed sizes
+    are filled into the LZMA-subheaders. The compressed payloads are kept in a temporary directory next to the output.
+    """
+    with timer('directory_scan'):
+        sources = scan_directory(source_directory)
+    selected = select_payloads([source.path for source in sources], patterns, manifest)
+
+    with tempfile.TemporaryDirectory(prefix='.ros_lzma_', dir=str(output_path.absolute().parent)) as temp_dir:
+        work_directory = pathlib.Path(temp_dir)
+        lzma_sizes = compress_payloads(selected, work_directory, preset, dict_size, workers, verbose)
+        for i, source in enumerate(sources):
+            if source.path in selected:
+                path = work_directory / source.path.name
+                sources[i] = source._replace(path=path, size=path.stat().st_size)
+
+        plan, end_offset = plan_ros(source_directory, mirror, verbose, version, sources, lzma_sizes)
+        return write_planned_ros(plan, end_offset, source_directory, mirror, verbose, version, output_path)
@@ -0,0 +1,124 @@
+import mmap
+import os
+import pathlib
+import struct
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from ros_lib.ros_header_v1 import RosHeaderV1
+from ros_lib.ros_header_v2 import RosHeaderV2
+from ros_lib.ros_payload_header import RosPayloadHeader
+
+
+def analyze_ros(ros_binary: bytes) -> Tuple[bool, Dict[str, bytes]]:
+    """
+    Determines the header version of a ROS-file and returns unknowns and timestamps.
+    """
+    if ros_binary[4:8] == RosHeaderV1.ARC_INDEX:
+        is_version1 = True
+
+    elif ros_binary[4:8] == RosHeaderV2.ARC_INDEX:
+        is_version1 = False
+    else:
+        raise ValueError('Container does not have a valid version index')
+
+    if is_version1:
+        data = {'time': ros_binary[8:16], 'unknown1': ros_binary[28:32], 'unknown2': ros_binary[36:48]}
+
+    else:
+        data = {'unknown1': ros_binary[28:32], 'unknown2': ros_binary[36:40], 'time': ros_binary[40:48],
+                'unknown3': ros_binary[56:64], 'version': ros_binary[64:80]}
+
+    return is_version1, data
+
+
+class RosDirectoryEntry(NamedTuple):
+    """One payload header of the directory table. NAME keeps the 16 zero padded bytes as stored in the container."""
+    index: int
+    name: bytes
+    offset: int
+    length: int
+    unknown: bytes
+
+
+class RosContainer:
+    """
+    Read-only view on a ros container. The file is mapped once, the header and the whole directory table are parsed
+    when opening and the payload headers are indexed by name, so lookups do not touch the file again.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self.stat = os.fstat(self._file.fileno())
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError('{} is empty'.format(path.name))
+
+        try:
+            self._parse()
+        except ValueError:
+            self.close()
+            raise
+
+    def _parse(self) -> None:
+        if len(self._map) < RosHeaderV1.HEADER_SIZE:
+            raise ValueError('{} is too small for a ros header'.format(self.path.name))
+
+        self.is_version1, self.data = analyze_ros(self._map[:RosHeaderV2.HEADER_SIZE])
+        self.version = 1 if self.is_version1 else 2
+        self.header_size = RosHeaderV1.HEADER_SIZE if self.is_version1 else RosHeaderV2.HEADER_SIZE
+        self.header = self._map[:self.header_size]
+        self.dir_entries = struct.unpack_from('<I', self._map, 32)[0]
+        # byte sum over payload headers and payloads, CHECKSUM in version 1 and PAYLOAD CHECKSUM in version 2
+        self.payload_checksum = struct.unpack_from('<I', self._map, 20 if self.is_version1 else 52)[0]
+
+        if self.header_size + self.dir_entries * RosPayloadHeader.HEADER_SIZE > len(self._map):
+            raise ValueError('directory table of {} exceeds the container'.format(self.path.name))
+
+        self.entries = []  # type: List[RosDirectoryEntry]
+        self._index = {}  # type: Dict[bytes, RosDirectoryEntry]
+        for i in range(self.dir_entries):
+            position = self.header_size + i * RosPayloadHeader.HEADER_SIZE
+            name, offset, length, unknown = struct.unpack_from('<16sLL8s', self._map, position)
+            entry = RosDirectoryEntry(i, name, offset, length, unknown)
+            self.entries.append(entry)
+            self._index[name] = entry
+
+    def __enter__(self) -> 'RosContainer':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def get_entry(self, name: Union[str, bytes]) -> Optional[RosDirectoryEntry]:
+        """
+        Returns the payload header of a given name or None. Names are compared the way they are stored, as 16 zero
+        padded ascii bytes.
+        """
+        if isinstance(name, str):
+            name = name.encode('ascii')
+        return self._index.get(struct.pack('16s', name))
+
+    def read(self, offset: int, length: int) -> bytes:
+        """
+        Returns LENGTH bytes of the container starting at OFFSET.
+        """
+        return self._map[offset:offset + length]
+
+    def get_view(self, offset: int, length: int) -> memoryview:
+        """
+        Returns a zero-copy view on the container. The view has to be released before the container is closed.
+        """
+        return memoryview(self._map)[offset:offset + length]
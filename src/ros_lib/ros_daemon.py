@@ -0,0 +1,229 @@
+import contextlib
+import json
+import os
+import pathlib
+import socket
+import socketserver
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_manifest import read_manifest
+from ros_lib.ros_stream import plan_ros, write_planned_ros
+from ros_lib.ros_unpack import unpack_ros
+from ros_lib.ros_verify import verify_file
+
+DEFAULT_MIRRORS = 8  # parsed reference containers kept open
+DEFAULT_FILES = 100000  # payload files whose byte sum is remembered
+MESSAGE_LIMIT = 1 << 20  # longest request line accepted
+
+StatKey = Tuple[int, int, int]  # size, mtime and inode of a file
+
+
+def stat_key(path: pathlib.Path) -> StatKey:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+class LruCache:
+    """
+    Thread safe map of at most MAX_ITEMS values, each stored with the stat key of the file it was computed from. A value
+    is only returned while the file has the same size, mtime and inode. The least recently used value is dropped first.
+    """
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()  # type: OrderedDict
+        self._lock = threading.Lock()
+
+    def get(self, path: str, key: StatKey):
+        with self._lock:
+            item = self._items.get(path)
+            if item is None or item[0] != key:
+                self.misses = self.misses + 1
+                return None
+            self._items.move_to_end(path)
+            self.hits = self.hits + 1
+            return item[1]
+
+    def put(self, path: str, key: StatKey, value) -> List:
+        """
+        Stores a value and returns the values dropped for it: the value of an outdated stat key and the least recently
+        used values beyond MAX_ITEMS.
+        """
+        with self._lock:
+            dropped = [self._items[path][1]] if path in self._items and self._items[path][1] is not value else []
+            self._items[path] = (key, value)
+            self._items.move_to_end(path)
+            while len(self._items) > self.max_items:
+                dropped.append(self._items.popitem(last=False)[1][1])
+            return dropped
+
+    def as_dict(self) -> Dict:
+        return {'items': len(self._items), 'hits': self.hits, 'misses': self.misses}
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Answers the request line of one connection."""
+
+    def handle(self) -> None:
+        line = self.rfile.readline(MESSAGE_LIMIT)
+        if line:
+            self.wfile.write(json.dumps(self.server.ros_daemon.handle(line)).encode('utf-8') + b'\n')
+            self.wfile.flush()
+        if self.server.ros_daemon.stopping:  # only after the answer is out, the process ends with serve_forever
+            threading.Thread(target=self.server.shutdown).start()
+
+
+class RosDaemon:
+    """
+    Runs pack, verify and unpack jobs for clients of a Unix socket on a pool of worker threads. Parsed reference
+    containers and the byte sums of payload files stay in memory between jobs, so warm jobs neither parse the mirror nor
+    read unchanged payloads twice. Requests and responses are single lines of JSON. All paths have to be absolute.
+    """
+
+    def __init__(self, socket_path: pathlib.Path, workers: Optional[int] = None, mirrors: int = DEFAULT_MIRRORS,
+                 files: int = DEFAULT_FILES):
+        self.socket_path = socket_path
+        self.mirrors = LruCache(mirrors)
+        self.sums = LruCache(files)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.jobs = 0
+        self.stopping = False
+        self._lock = threading.Lock()
+        self._users = {}  # type: Dict[int, int]  # references to open mirrors by id, the cache holds one of them
+        self._server = None  # type: Optional[socketserver.ThreadingUnixStreamServer]
+
+    @contextlib.contextmanager
+    def open_mirror(self, path: Optional[pathlib.Path]) -> Iterator[Optional[RosContainer]]:
+        """
+        Yields the parsed reference container of a path for the time of one job, or None without a path. A container
+        dropped from the cache is closed once the last job using it is done with it.
+        """
+        if path is None:
+            yield None
+            return
+
+        key = stat_key(path)
+        with self._lock:
+            container = self.mirrors.get(str(path), key)
+            if container is not None:
+                self._users[id(container)] = self._users[id(container)] + 1
+        if container is None:
+            container = RosContainer(path)
+            with self._lock:
+                self._users[id(container)] = 2  # the cache and this job
+                for dropped in self.mirrors.put(str(path), key, container):
+                    self._release(dropped)
+        try:
+            yield container
+        finally:
+            with self._lock:
+                self._release(container)
+
+    def _release(self, container: RosContainer) -> None:
+        self._users[id(container)] = self._users[id(container)] - 1
+        if self._users[id(container)] == 0:
+            del self._users[id(container)]
+            container.close()
+
+    def pack(self, request: Dict) -> Dict:
+        mirror_path = pathlib.Path(request['mirror']) if request.get('mirror') else None
+        with self.open_mirror(mirror_path) as mirror:
+            version = request.get('version')
+            if (mirror is None) == (version is None):
+                raise ValueError('either a mirror file or a header version has to be given')
+
+            if bool(request.get('source')) == bool(request.get('manifest')):
+                raise ValueError('either a directory or a manifest has to be packed')
+            source_directory = pathlib.Path(request['source']) if request.get('source') else None
+            sources = read_manifest(pathlib.Path(request['manifest'])) if request.get('manifest') else None
+            plan, end_offset = plan_ros(source_directory, mirror, False, version, sources)
+
+            keys = {}
+            for entry in plan:
+                keys[entry.path] = stat_key(entry.path)
+                entry.checksum = self.sums.get(str(entry.path), keys[entry.path])
+
+            write_planned_ros(plan, end_offset, source_directory, mirror, False, version,
+                              pathlib.Path(request['output']))
+            for entry in plan:
+                self.sums.put(str(entry.path), keys[entry.path], entry.checksum)
+            return {'status': 0, 'output': ['packed {} payloads into {} bytes'.format(len(plan), end_offset)]}
+
+    def verify(self, request: Dict) -> Dict:
+        output = []
+        for path in request['containers']:
+            result = verify_file(pathlib.Path(path))
+            output.extend('{}: {}'.format(result.path, problem) for problem in result.problems)
+        return {'status': 3 if output else 0, 'output': output}
+
+    def unpack(self, request: Dict) -> Dict:
+        with RosContainer(pathlib.Path(request['container'])) as container:
+            paths = unpack_ros(container, pathlib.Path(request['output']), False, request.get('jobs'))
+        return {'status': 0, 'output': ['unpacked {} payloads'.format(len(paths))]}
+
+    def stats(self, request: Dict) -> Dict:
+        return {'status': 0, 'output': [json.dumps({'jobs': self.jobs, 'mirrors': self.mirrors.as_dict(),
+                                                    'files': self.sums.as_dict()})]}
+
+    def run(self, request: Dict) -> Dict:
+        """
+        Runs one request and returns the response. Failing jobs are answered with status 3 for broken input and 4 for
+        failed writes, like the command line tools.
+        """
+        commands = {'pack': self.pack, 'verify': self.verify, 'unpack': self.unpack, 'stats': self.stats}
+        if request.get('command') not in commands:
+            return {'status': 1, 'error': 'unknown command {!r}'.format(request.get('command'))}
+
+        with self._lock:
+            self.jobs = self.jobs + 1
+        try:
+            return commands[request['command']](request)
+        except (KeyError, TypeError) as error:
+            return {'status': 1, 'error': 'incomplete request: {}'.format(error)}
+        except ValueError as error:
+            return {'status': 3, 'error': str(error)}
+        except OSError as error:
+            return {'status': 4, 'error': str(error)}
+
+    def handle(self, line: bytes) -> Dict:
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {'status': 1, 'error': 'request is no JSON'}
+        if not isinstance(request, dict):
+            return {'status': 1, 'error': 'request is no JSON object'}
+
+        if request.get('command') == 'shutdown':
+            self.stopping = True
+            return {'status': 0, 'output': ['shutting down']}
+        return self.pool.submit(self.run, request).result()
+
+    def serve(self) -> None:
+        """
+        Listens on the socket until a client sends shutdown. A socket file left behind by a daemon which is not running
+        any more is replaced.
+        """
+        if self.socket_path.exists():
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                    probe.connect(str(self.socket_path))
+                raise ValueError('a daemon is already listening on {}'.format(self.socket_path))
+            except ConnectionRefusedError:
+                self.socket_path.unlink()
+
+        self._server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), RequestHandler)
+        self._server.daemon_threads = True
+        self._server.ros_daemon = self
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            self.pool.shutdown()
+            self.socket_path.unlink()
+
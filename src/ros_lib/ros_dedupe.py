@@ -0,0 +1,127 @@
+import collections
+import hashlib
+import os
+import pathlib
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from ros_lib.ros_checksum import byte_sum
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_manifest import RosSourceEntry
+from ros_lib.ros_pack import init_packing
+from ros_lib.ros_payload_header import RosPayloadHeader
+from ros_lib.ros_stats import count, timer
+from ros_lib.ros_stream import CHUNK_SIZE, RosPayloadSource, build_header_table, plan_ros, write_payload
+from ros_lib.ros_writer import atomic_output
+
+
+class RosDedupeResult(NamedTuple):
+    """
+    Outcome of a deduplicating pack. DUPLICATES payloads point at the bytes of an earlier payload, which makes the
+    container of END_OFFSET bytes BYTES_SAVED bytes smaller.
+    """
+    end_offset: int
+    duplicates: int
+    bytes_saved: int
+
+
+def hash_payload(entry: RosPayloadSource, output_no: int, offset: int) -> Tuple[bytes, int]:
+    """
+    Writes the subheader and the data of a planned payload to OFFSET of the output file through a fixed size buffer and
+    returns the SHA-256 of both and the byte sum of the data, all from a single read of the file.
+    """
+    with timer('dedupe'):
+        digest = hashlib.sha256(entry.subheader)
+    os.pwrite(output_no, entry.subheader, offset)
+    offset = offset + len(entry.subheader)
+    checksum = 0
+    copied = 0
+
+    with open(entry.path, 'rb') as source:
+        if os.fstat(source.fileno()).st_size != entry.size:
+            raise ValueError('{} changed while packing'.format(entry.path.name))
+        buffer = bytearray(min(CHUNK_SIZE, entry.size))
+        with memoryview(buffer) as view:
+            while copied < entry.size:
+                with timer('payload_read'):
+                    read = source.readinto(view[:min(len(buffer), entry.size - copied)])
+                if read == 0:
+                    break
+                with timer('dedupe'):
+                    digest.update(view[:read])
+                checksum = checksum + byte_sum(view[:read])
+                with timer('write'):
+                    os.pwrite(output_no, view[:read], offset + copied)
+                copied = copied + read
+
+    if copied < entry.size:
+        raise ValueError('{} got shorter while packing'.format(entry.path.name))
+    count('bytes_read', entry.size)
+    count('bytes_written', entry.length)
+    return digest.digest(), checksum
+
+
+def write_deduped_ros(plan: List[RosPayloadSource], source_directory: Optional[pathlib.Path],
+                      mirror: Optional[RosContainer], verbose: bool, version: int,
+                      output_path: pathlib.Path) -> RosDedupeResult:
+    """
+    Second pass of the streaming packer storing byte-identical payloads only once. Payloads are laid out again while
+    they are streamed: payloads whose length no other payload has are copied as usual, all others are hashed on the way
+    and a payload whose subheader and data match an earlier one gets the offset of the earlier one instead of its own.
+    Like the other packers the payload checksum sums every payload, shared or not, and header and directory table are
+    written last. The container is written to a temporary file and published under OUTPUT_PATH only when complete.
+    """
+    lengths = collections.Counter(entry.length for entry in plan)
+    written = {}  # type: Dict[Tuple[int, bytes], int]
+    offset = init_packing(len(plan) * RosPayloadHeader.HEADER_SIZE, version, mirror)
+    payload_checksum = 0
+    duplicates = 0
+    bytes_saved = 0
+
+    if verbose:
+        print('\nStart streaming with deduplication')
+
+    with atomic_output(output_path, offset + sum(entry.length for entry in plan)) as temporary:
+        output_no = os.open(temporary, os.O_WRONLY)
+        try:
+            for entry in plan:
+                entry.payload_header.set_offset(offset)
+                if entry.length == 0 or lengths[entry.length] == 1:  # nothing to share
+                    payload_checksum = payload_checksum + write_payload(entry, output_no)
+                    offset = offset + entry.length
+                    continue
+
+                digest, entry.checksum = hash_payload(entry, output_no, offset)
+                payload_checksum = payload_checksum + entry.checksum + byte_sum(entry.subheader)
+                first = written.setdefault((entry.length, digest), offset)
+                if first != offset:  # the copy just written is overwritten by the next payload or cut off
+                    if verbose:
+                        print('payload {} shares the bytes at {:#x}'.format(entry.name, first))
+                    entry.payload_header.set_offset(first)
+                    duplicates = duplicates + 1
+                    bytes_saved = bytes_saved + entry.length
+                    continue
+                offset = offset + entry.length
+
+            os.ftruncate(output_no, offset)
+            count('duplicates', duplicates)
+            count('bytes_saved', bytes_saved)
+
+            table = build_header_table(plan, source_directory, mirror, verbose, version, offset, payload_checksum)
+            if verbose:
+                print('write header and payload header\ndone.')
+            with timer('write'):
+                os.pwrite(output_no, table, 0)
+            count('bytes_written', len(table))
+        finally:
+            os.close(output_no)
+
+    return RosDedupeResult(offset, duplicates, bytes_saved)
+
+
+def dedupe_ros(source_directory: Optional[pathlib.Path], mirror: Optional[RosContainer], verbose: bool, version: int,
+               output_path: pathlib.Path, sources: Optional[List[RosSourceEntry]] = None) -> RosDedupeResult:
+    """
+    Packs a directory, or the files given by SOURCES, like stream_ros but stores byte-identical payloads only once.
+    """
+    plan, _ = plan_ros(source_directory, mirror, verbose, version, sources)
+    return write_deduped_ros(plan, source_directory, mirror, verbose, version, output_path)
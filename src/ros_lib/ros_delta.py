@@ -0,0 +1,192 @@
+import hashlib
+import mmap
+import os
+import pathlib
+import struct
+from typing import Dict, List, Tuple
+
+from ros_lib.ros_container import RosContainer, RosDirectoryEntry
+from ros_lib.ros_stats import count, timer
+from ros_lib.ros_stream import CHUNK_SIZE, copy_range
+
+DELTA_MAGIC = struct.pack('4s', 'RDLT'.encode('ascii'))
+DELTA_VERSION = 1
+DELTA_HEADER = struct.Struct('<4sI32s32sQI')  # 84 Bytes: magic, version, base and target SHA-256, target size, runs
+DELTA_RUN = struct.Struct('<BQQQ')  # 25 Bytes: kind, target offset, source offset, length
+COPY = 0  # run copied from the base container
+LITERAL = 1  # run copied from the data behind the runs of the delta
+
+Run = Tuple[int, int, int, int]  # kind, target offset, source offset, length
+
+
+def view_digest(view: memoryview) -> bytes:
+    """
+    Returns the SHA-256 of a view, hashed chunk by chunk without copying.
+    """
+    digest = hashlib.sha256()
+    with timer('delta_hash'):
+        for position in range(0, len(view), CHUNK_SIZE):
+            digest.update(view[position:position + CHUNK_SIZE])
+    return digest.digest()
+
+
+def container_digest(container: RosContainer) -> bytes:
+    with container.get_view(0, len(container)) as view:
+        return view_digest(view)
+
+
+def entry_digest(container: RosContainer, entry: RosDirectoryEntry) -> bytes:
+    with container.get_view(entry.offset, entry.length) as view:
+        return view_digest(view)
+
+
+def file_digest(file_no: int, size: int) -> bytes:
+    if size == 0:
+        return view_digest(memoryview(b''))
+    with mmap.mmap(file_no, size, access=mmap.ACCESS_READ) as data, memoryview(data) as view:
+        return view_digest(view)
+
+
+def in_bounds(container: RosContainer) -> List[RosDirectoryEntry]:
+    return [entry for entry in container.entries if entry.length and entry.offset + entry.length <= len(container)]
+
+
+def plan_delta(base: RosContainer, target: RosContainer, verbose: bool) -> List[Run]:
+    """
+    Describes the target container as runs over its whole size. Payloads of the target whose length and content hash
+    match a payload of the base, no matter its name, are copied from the base. Everything else, i.e. main header,
+    directory table, changed payloads and bytes between payloads, is carried literally. Payloads are only hashed if a
+    payload of the same length exists on the other side.
+    """
+    base_entries, target_entries = in_bounds(base), in_bounds(target)
+    lengths = {entry.length for entry in base_entries} & {entry.length for entry in target_entries}
+    known = {}  # type: Dict[Tuple[int, bytes], RosDirectoryEntry]
+    for old in base_entries:
+        if old.length in lengths:
+            known.setdefault((old.length, entry_digest(base, old)), old)
+
+    copies = set()
+    for entry in target_entries:
+        old = known.get((entry.length, entry_digest(target, entry))) if entry.length in lengths else None
+        if old is not None:
+            copies.add((entry.offset, old.offset, entry.length))
+        elif verbose:
+            print('payload {} changed'.format(entry.index))
+
+    runs = []  # type: List[Run]
+    literal_offset = 0
+    position = 0
+    for offset, base_offset, length in sorted(copies):
+        if offset < position:  # overlaps a payload copied already
+            continue
+        if offset > position:
+            runs.append((LITERAL, position, literal_offset, offset - position))
+            literal_offset = literal_offset + offset - position
+        if runs and runs[-1][0] == COPY and runs[-1][1] + runs[-1][3] == offset and \
+                runs[-1][2] + runs[-1][3] == base_offset:
+            runs[-1] = (COPY, runs[-1][1], runs[-1][2], runs[-1][3] + length)
+        else:
+            runs.append((COPY, offset, base_offset, length))
+        position = offset + length
+    if position < len(target):
+        runs.append((LITERAL, position, literal_offset, len(target) - position))
+    return runs
+
+
+def diff_ros(base: RosContainer, target: RosContainer, output_path: pathlib.Path, verbose: bool) -> Tuple[int, int]:
+    """
+    Writes a delta which rebuilds TARGET from BASE byte for byte: a header with the SHA-256 of both containers, the runs
+    and the literal data. Returns the number of bytes copied from the base and the number of bytes carried by the delta.
+    A failed run removes the delta again.
+    """
+    runs = plan_delta(base, target, verbose)
+
+    table = bytearray(DELTA_HEADER.size + len(runs) * DELTA_RUN.size)
+    DELTA_HEADER.pack_into(table, 0, DELTA_MAGIC, DELTA_VERSION, container_digest(base), container_digest(target),
+                           len(target), len(runs))
+    for i, run in enumerate(runs):
+        DELTA_RUN.pack_into(table, DELTA_HEADER.size + i * DELTA_RUN.size, *run)
+
+    with open(output_path, 'xb') as output:
+        try:
+            with timer('write'):
+                output.write(table)
+                output.flush()
+                position = len(table)
+                for kind, offset, _, length in runs:
+                    if kind == LITERAL:
+                        copy_range(target.fileno(), output.fileno(), length, position, offset)
+                        position = position + length
+            count('bytes_written', position)
+        except BaseException:  # never leave a partial delta behind
+            os.unlink(output_path)
+            raise
+
+    copied = sum(run[3] for run in runs if run[0] == COPY)
+    if verbose:
+        print('{} runs, {} bytes copied from the base, {} bytes in the delta'.format(len(runs), copied,
+                                                                                     len(target) - copied))
+    return copied, len(target) - copied
+
+
+def read_delta(file, name: str) -> Tuple[bytes, bytes, int, List[Run], int]:
+    """
+    Reads header and runs of an open delta. Returns base and target SHA-256, target size, the runs and the offset of the
+    literal data. Raises ValueError if the delta is malformed.
+    """
+    data = file.read(DELTA_HEADER.size)
+    if len(data) < DELTA_HEADER.size:
+        raise ValueError('{} is too small for a delta'.format(name))
+    magic, version, base_digest, target_digest, size, run_count = DELTA_HEADER.unpack(data)
+    if magic != DELTA_MAGIC or version != DELTA_VERSION:
+        raise ValueError('{} is no delta of version {}'.format(name, DELTA_VERSION))
+
+    data = file.read(run_count * DELTA_RUN.size)
+    if len(data) < run_count * DELTA_RUN.size:
+        raise ValueError('runs of {} exceed the delta'.format(name))
+    runs = list(DELTA_RUN.iter_unpack(data))
+    data_offset = DELTA_HEADER.size + len(data)
+
+    position = 0
+    delta_size = os.fstat(file.fileno()).st_size
+    for kind, offset, source_offset, length in runs:
+        if offset != position or kind not in (COPY, LITERAL) or \
+                (kind == LITERAL and data_offset + source_offset + length > delta_size):
+            raise ValueError('{} has a broken run at {:#x}'.format(name, offset))
+        position = offset + length
+    if position != size:
+        raise ValueError('runs of {} do not cover the target'.format(name))
+    return base_digest, target_digest, size, runs, data_offset
+
+
+def patch_ros(base: RosContainer, delta_path: pathlib.Path, output_path: pathlib.Path, verbose: bool) -> bool:
+    """
+    Rebuilds the target container of a delta from its base. Raises ValueError if the delta was made for another base or
+    the result does not match the container the delta was made from. The output is removed on any error.
+    """
+    with open(delta_path, 'rb') as delta:
+        base_digest, target_digest, size, runs, data_offset = read_delta(delta, delta_path.name)
+        if container_digest(base) != base_digest:
+            raise ValueError('{} is not the base of {}'.format(base.path.name, delta_path.name))
+
+        with open(output_path, 'x+b') as output:
+            try:
+                output_no = output.fileno()
+                for kind, offset, source_offset, length in runs:
+                    if verbose:
+                        print('{} {} bytes at {:#x}'.format('copy' if kind == COPY else 'write', length, offset))
+                    with timer('write'):
+                        if kind == LITERAL:
+                            copy_range(delta.fileno(), output_no, length, offset, data_offset + source_offset)
+                        elif source_offset + length <= len(base):
+                            copy_range(base.fileno(), output_no, length, offset, source_offset)
+                        else:
+                            raise ValueError('run at {:#x} exceeds {}'.format(offset, base.path.name))
+                count('bytes_written', size)
+
+                if file_digest(output_no, size) != target_digest:
+                    raise ValueError('{} does not match the target of {}'.format(output_path.name, delta_path.name))
+            except BaseException:  # also a failed write or an interrupt, never leave a partial container behind
+                os.unlink(output_path)
+                raise
+    return True
@@ -1,5 +1,8 @@
 import struct
 
+from ros_lib.ros_checksum import checksum32
+from ros_lib.ros_struct import NUMBER, RecordField, RosHeaderV1Struct, TIME_STAMP
+
 
 class RosHeaderV1:
     """Header structure of a ros file. Total 48 Byte in little endian. LENGTH describes the length of the ros container
@@ -13,38 +16,53 @@ class RosHeaderV1:
     -------------------------------------------------
     |DIR_ENTRIES|            UNKNOWN 2              |
     -------------------------------------------------
+
+    The fields are kept in a RosHeaderV1Struct. The former attributes are RecordFields reading and writing the bytes of
+    the record, on the class they still give the defaults.
     """
     HEADER_SIZE = 48
-    SIGNATURE = struct.pack('4s', 'PACK'.encode('ascii'))  # 4 Bytes
-    ARC_INDEX = struct.pack('4s', '1.01'.encode('ascii'))  # 4 Bytes
-    ARC_MAGIC = struct.pack('4s', 'LS23'.encode('ascii'))  # 4 Bytes
-    UNKNOWN1 = struct.pack('<I', 0)  # 4 Bytes
-    UNKNOWN2 = struct.pack('<III', 0, 0, 0)  # 12 Bytes
+    SIGNATURE = RecordField('signature', struct.pack('4s', 'PACK'.encode('ascii')))  # 4 Bytes
+    ARC_INDEX = RecordField('arc_index', struct.pack('4s', '1.01'.encode('ascii')))  # 4 Bytes
+    ARC_MAGIC = RecordField('arc_magic', struct.pack('4s', 'LS23'.encode('ascii')))  # 4 Bytes
+    UNKNOWN1 = RecordField('unknown1', struct.pack('<I', 0))  # 4 Bytes
+    UNKNOWN2 = RecordField('unknown2', struct.pack('<III', 0, 0, 0))  # 12 Bytes
     UNKNOWN_TIME = 0
 
+    time_stamp = RecordField('time_stamp')
+    dir_entries = RecordField('dir_entries', layout=NUMBER)
+    length = RecordField('length', layout=NUMBER)
+    checksum = RecordField('checksum', layout=NUMBER)
+
+    __slots__ = ('record',)
+
     def __init__(self, time_stamp_sec, time_stamp_min, time_stamp_hour, time_stamp_day, time_stamp_month,
                  time_stamp_year, dir_entries, length, checksum):
-        self.time_stamp = struct.pack('<6Bh', time_stamp_sec, time_stamp_min, time_stamp_hour, self.UNKNOWN_TIME,
-                                      time_stamp_day, time_stamp_month, time_stamp_year)  # 8 Bytes
-        self.dir_entries = struct.pack('<I', dir_entries)  # 4 Bytes
-        self.length = struct.pack('<I', length)  # 4 Bytes without this header
-        self.checksum = struct.pack('<I', checksum)  # 4 Bytes
+        cls = type(self)
+        self.record = RosHeaderV1Struct(cls.ARC_MAGIC, cls.ARC_INDEX,
+                                        TIME_STAMP.pack(time_stamp_sec, time_stamp_min, time_stamp_hour,
+                                                        self.UNKNOWN_TIME, time_stamp_day, time_stamp_month,
+                                                        time_stamp_year),  # 8 Bytes
+                                        length,  # 4 Bytes without this header
+                                        checksum32(checksum),  # 4 Bytes
+                                        cls.SIGNATURE, cls.UNKNOWN1, dir_entries, cls.UNKNOWN2)
 
     def set_timestamp(self, time):
-        self.time_stamp = time
+        self.record.time_stamp = time
         return True
 
     def set_arc_magic(self, arc_magic):
-        self.ARC_MAGIC = arc_magic
+        self.record.arc_magic = arc_magic
 
     def set_unknown1(self, unknown1):
-        self.UNKNOWN1 = unknown1
+        self.record.unknown1 = unknown1
         return True
 
     def set_unknown2(self, unknown2):
-        self.UNKNOWN2 = unknown2
+        self.record.unknown2 = unknown2
         return True
 
+    def pack_into(self, buffer, offset=0):
+        self.record.pack_into(buffer, offset)
+
     def get_bytes(self):
-        header = self.ARC_MAGIC + self.ARC_INDEX + self.time_stamp + self.length + self.checksum + self.SIGNATURE + self.UNKNOWN1 + self.dir_entries + self.UNKNOWN2
-        return header
+        return self.record.get_bytes()
@@ -1,5 +1,7 @@
 import struct
+from ros_lib.ros_checksum import byte_sum, checksum32
 from ros_lib.ros_header_v1 import RosHeaderV1
+from ros_lib.ros_struct import CHECKSUM, NUMBER, RecordField, RosHeaderV2Struct, TIME_STAMP
 
 
 class RosHeaderV2(RosHeaderV1):
@@ -19,45 +21,54 @@ class RosHeaderV2(RosHeaderV1):
     ----------------------------------------------------------------------------------------------
     |FIRMWARE VERSION                               |
     ------------------------------------------------
+
+    The fields are kept in a RosHeaderV2Struct, the former attributes are RecordFields like in RosHeaderV1.
     """
 
     HEADER_SIZE = 80
-    ARC_INDEX = struct.pack('4s', '2.00'.encode('ascii'))
-    ARC_MAGIC = struct.pack('4s', 'BL01'.encode('ascii'))  # 4 Bytes
-    HEADER_LENGTH = struct.pack('<I', HEADER_SIZE)
+    ARC_INDEX = RecordField('arc_index', struct.pack('4s', '2.00'.encode('ascii')))
+    ARC_MAGIC = RecordField('arc_magic', struct.pack('4s', 'BL01'.encode('ascii')))  # 4 Bytes
+    HEADER_LENGTH = RecordField('header_length', struct.pack('<I', HEADER_SIZE), NUMBER)
     HEADER_CHECKSUM = struct.pack('<I', 0)  # 4 Bytes
-    UNKNOWN2 = struct.pack('<I', 0)  # 4 Bytes
-    UNKNOWN3 = struct.pack('<II', 0, 0)  # 8 Bytes
-    FIRMWARE_VERSION = struct.pack('16s', 'Firmware'.encode('ascii'))  # 16 Bytes
+    UNKNOWN2 = RecordField('unknown2', struct.pack('<I', 0))  # 4 Bytes
+    UNKNOWN3 = RecordField('unknown3', struct.pack('<II', 0, 0))  # 8 Bytes
+    FIRMWARE_VERSION = RecordField('version', struct.pack('16s', 'Firmware'.encode('ascii')))  # 16 Bytes
+
+    header_checksum = RecordField('header_checksum', layout=NUMBER)
+    length1 = RecordField('length1', layout=NUMBER)
+    payload_checksum1 = RecordField('payload_checksum1', layout=NUMBER)
+    length2 = RecordField('length2', layout=NUMBER)
+    payload_checksum2 = RecordField('payload_checksum2', layout=NUMBER)
+
+    __slots__ = ()
 
     def __init__(self, length1, dir_entries, time_stamp_sec, time_stamp_min, time_stamp_hour, time_stamp_day,
                  time_stamp_month, time_stamp_year, length2, payload_checksum2):
-        self.header_checksum = struct.pack('<I', 0)  # 4 Bytes
-        self.length1 = struct.pack('<I', length1)  # 4 Bytes
-        self.payload_checksum1 = struct.pack('<I', 0)  # 4 Bytes
-        self.dir_entries = struct.pack('<I', dir_entries)  # 4 Bytes
-        self.time_stamp = struct.pack('<6Bh', time_stamp_sec, time_stamp_min, time_stamp_hour, self.UNKNOWN_TIME,
-                                      time_stamp_day, time_stamp_month, time_stamp_year)  # 8 Bytes
-        self.length2 = struct.pack('<I', length2)  # 4 Bytes
-        self.payload_checksum2 = struct.pack('<I', payload_checksum2)  # 4 Bytes
+        cls = type(self)
+        self.record = RosHeaderV2Struct(cls.ARC_MAGIC, cls.ARC_INDEX, self.HEADER_SIZE,
+                                        0,  # 4 Bytes header checksum
+                                        length1,  # 4 Bytes
+                                        0,  # 4 Bytes payload checksum 1
+                                        cls.SIGNATURE, cls.UNKNOWN1, dir_entries, cls.UNKNOWN2,
+                                        TIME_STAMP.pack(time_stamp_sec, time_stamp_min, time_stamp_hour,
+                                                        self.UNKNOWN_TIME, time_stamp_day, time_stamp_month,
+                                                        time_stamp_year),  # 8 Bytes
+                                        length2,  # 4 Bytes
+                                        checksum32(payload_checksum2),  # 4 Bytes
+                                        cls.UNKNOWN3, cls.FIRMWARE_VERSION)
 
     def calc_checksums(self):
-        self.header_checksum = struct.pack('<I', 0)
-        self.payload_checksum1 = struct.pack('<I', 0)
-        self.payload_checksum1 = struct.pack('<I', sum(self.get_bytes()))  # 4 Bytes
-        # 4 Bytes (0xFFFFFFFF - Checksum over this header)
-        self.header_checksum = struct.pack('<I', 4294967295 - sum(self.get_bytes()))
+        self.record.header_checksum = 0
+        self.record.payload_checksum1 = 0
+        checksum = byte_sum(self.record.get_bytes())
+        self.record.payload_checksum1 = checksum32(checksum)  # 4 Bytes
+        # 4 Bytes (0xFFFFFFFF - Checksum over this header), the header only grew by PAYLOAD CHECKSUM 1
+        self.record.header_checksum = 4294967295 - checksum - byte_sum(CHECKSUM.pack(self.record.payload_checksum1))
 
     def set_unknown3(self, unknown3):
-        self.UNKNOWN3 = unknown3
+        self.record.unknown3 = unknown3
         return True
 
     def set_version(self, version):
-        self.FIRMWARE_VERSION = version
+        self.record.version = version
         return True
-
-    def get_bytes(self):
-        header = self.ARC_MAGIC + self.ARC_INDEX + self.HEADER_LENGTH + self.header_checksum + self.length1 + \
-                 self.payload_checksum1 + self.SIGNATURE + self.UNKNOWN1 + self.dir_entries + self.UNKNOWN2 + \
-                 self.time_stamp + self.length2 + self.payload_checksum2 + self.UNKNOWN3 + self.FIRMWARE_VERSION
-        return header
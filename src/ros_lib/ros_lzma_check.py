@@ -0,0 +1,133 @@
+import json
+import lzma
+import os
+import pathlib
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from ros_lib.ros_compress import LZMA_MAGIC
+from ros_lib.ros_manifest import RosSourceEntry
+from ros_lib.ros_stream import CHUNK_SIZE
+
+UNKNOWN_SIZE = 0xFFFFFFFFFFFFFFFF  # uncompressed size of LZMA archives written as a stream
+MEMO_LIMIT = 100000  # number of files whose result is remembered
+
+
+class RosLzmaCheck(NamedTuple):
+    """
+    Outcome of decoding one LZMA payload. DECLARED is the uncompressed size from the LZMA header, None if the archive
+    does not declare one. The payload is fine if PROBLEM is None. CACHED results were taken over from an earlier check
+    of the unchanged file.
+    """
+    name: str
+    size: int
+    declared: Optional[int]
+    decoded: int
+    seconds: float
+    problem: Optional[str]
+    cached: bool = False
+
+    @property
+    def throughput(self) -> float:
+        """Decoded MiB per second."""
+        return self.decoded / self.seconds / (1 << 20) if self.seconds > 0 else 0.0
+
+
+def decode_lzma(path: pathlib.Path) -> Tuple[Optional[int], int, Optional[str]]:
+    """
+    Decodes a LZMA archive chunk by chunk without keeping the output and returns the declared size, the decoded size and
+    the problem found, if any: a corrupt or truncated stream, or data behind its end. liblzma holds the stream to its
+    declared size, so an archive which decodes to another size than declared is reported as corrupt.
+    """
+    decompressor = lzma.LZMADecompressor(format=lzma.FORMAT_ALONE)
+    declared = None
+    decoded = 0
+
+    with open(path, 'rb') as file:
+        head = file.read(13)
+        if len(head) == 13 and struct.unpack_from('<Q', head, 5)[0] != UNKNOWN_SIZE:
+            declared = struct.unpack_from('<Q', head, 5)[0]
+
+        data = head
+        try:
+            while data and not decompressor.eof:
+                decoded = decoded + len(decompressor.decompress(data, CHUNK_SIZE))
+                while not decompressor.eof and not decompressor.needs_input:  # output left of this chunk
+                    decoded = decoded + len(decompressor.decompress(b'', CHUNK_SIZE))
+                data = file.read(CHUNK_SIZE)
+        except lzma.LZMAError as error:
+            return declared, decoded, 'corrupt LZMA stream after {} decoded bytes: {}'.format(decoded, error)
+
+        if not decompressor.eof:
+            return declared, decoded, 'LZMA stream ends early after {} decoded bytes'.format(decoded)
+        if decompressor.unused_data or data or file.read(1):  # data holds the chunk read after the end of the stream
+            return declared, decoded, 'trailing data after the LZMA stream of {} decoded bytes'.format(decoded)
+    return declared, decoded, None
+
+
+def check_lzma_file(job: Tuple[str, str]) -> RosLzmaCheck:
+    name, path = job
+    start = time.perf_counter()
+    declared, decoded, problem = decode_lzma(pathlib.Path(path))
+    return RosLzmaCheck(name, os.stat(path).st_size, declared, decoded, time.perf_counter() - start, problem)
+
+
+def is_lzma(entry: RosSourceEntry) -> bool:
+    """
+    Tells if the packer gives a payload a LZMA-subheader, so its file has to be a valid LZMA archive.
+    """
+    if entry.lzma is False:
+        return False
+    with open(entry.path, 'rb') as file:
+        return file.read(2) == LZMA_MAGIC
+
+
+def stat_key(path: pathlib.Path) -> str:
+    stat = path.stat()
+    return '{}:{}:{}:{}'.format(path.resolve(), stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+def check_lzma_payloads(sources: List[RosSourceEntry], workers: Optional[int] = None,
+                        cache_path: Optional[pathlib.Path] = None) -> List[RosLzmaCheck]:
+    """
+    Decodes every LZMA payload of SOURCES across a process pool and returns the results in packing order. If CACHE_PATH
+    is given, results are remembered there by path, size, mtime and inode of the file, so unchanged files are not
+    decoded again by the next check.
+    """
+    memo = {}  # type: Dict[str, List]
+    if cache_path is not None:
+        try:
+            memo = json.loads(cache_path.read_text())
+        except (FileNotFoundError, ValueError):
+            memo = {}
+
+    selected = [entry for entry in sources if is_lzma(entry)]
+    keys = [stat_key(entry.path) for entry in selected]
+    results = {}  # type: Dict[int, RosLzmaCheck]
+    jobs = []
+    for i, entry in enumerate(selected):
+        if keys[i] in memo:
+            memo[keys[i]] = memo.pop(keys[i])  # most recently used last
+            results[i] = RosLzmaCheck(entry.name, *memo[keys[i]], cached=True)
+        else:
+            jobs.append(i)
+
+    if len(jobs) == 1 or workers == 1:
+        checked = [check_lzma_file((selected[i].name, str(selected[i].path))) for i in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            checked = list(pool.map(check_lzma_file, [(selected[i].name, str(selected[i].path)) for i in jobs]))
+    for i, result in zip(jobs, checked):
+        results[i] = result
+        memo[keys[i]] = list(result[1:6])
+
+    if cache_path is not None and jobs:
+        for key in list(memo)[:max(0, len(memo) - MEMO_LIMIT)]:
+            del memo[key]
+        temporary = cache_path.with_name('.{}.{}.tmp'.format(cache_path.name, os.getpid()))
+        temporary.write_text(json.dumps(memo))
+        os.replace(temporary, cache_path)
+
+    return [results[i] for i in range(len(selected))]
@@ -1,8 +1,8 @@
 import struct
-from ros_lib.ros_header_v1 import RosHeaderV1
+from ros_lib.ros_struct import LZMA_TIME_STAMP, RecordField, RosLzmaSubheaderStruct
 
 
-class RosLzmaSubheader(RosHeaderV1):
+class RosLzmaSubheader:
     """Structure of the header of each payload file. Total 32 byte in little endian except time stamp year.
     SIZE can be found at 0x05 of the payload and describes the length of the uncompressed LZMA payload.
 
@@ -11,23 +11,57 @@ class RosLzmaSubheader(RosHeaderV1):
     | ARC_MAGIC | ARC_INDEX |     TIME STAMP        |
     -------------------------------------------------
     |  UNKNOWN1 |   SIZE    |      UNKNOWN2         |
+
+    The fields are kept in a RosLzmaSubheaderStruct, the former attributes are RecordFields like in RosHeaderV1. It
+    shares no fields with the main headers, so it does not derive from them.
     """
 
     HEADER_SIZE = 32
-    ARC_MAGIC = struct.pack('4s', 'BL01'.encode('ascii'))  # 4 Bytes
-    ARC_INDEX = struct.pack('4s', '2.00'.encode('ascii'))  # 4 Bytes
-    UNKNOWN2 = struct.pack('<II', 0, 0)  # 8 Bytes
+    ARC_MAGIC = RecordField('arc_magic', struct.pack('4s', 'BL01'.encode('ascii')))  # 4 Bytes
+    ARC_INDEX = RecordField('arc_index', struct.pack('4s', '2.00'.encode('ascii')))  # 4 Bytes
+    UNKNOWN1 = RecordField('unknown1', struct.pack('<I', 0))  # 4 Bytes
+    UNKNOWN2 = RecordField('unknown2', struct.pack('<II', 0, 0))  # 8 Bytes
+    UNKNOWN_TIME = 0
+
+    time_stamp = RecordField('time_stamp')
+    size = RecordField('size')
+
+    __slots__ = ('record',)
 
     def __init__(self, time_stamp_sec, time_stamp_min, time_stamp_hour, time_stamp_day, time_stamp_month,
                  time_stamp_year, size):
+        cls = type(self)
+        self.record = RosLzmaSubheaderStruct(cls.ARC_MAGIC, cls.ARC_INDEX,
+                                             LZMA_TIME_STAMP.pack(time_stamp_sec, time_stamp_min, time_stamp_hour,
+                                                                  self.UNKNOWN_TIME, time_stamp_day, time_stamp_month,
+                                                                  time_stamp_year),  # 8 Bytes, year in big-endian
+                                             cls.UNKNOWN1,
+                                             size,  # 4 Byte size of uncompressed LZMA archive
+                                             cls.UNKNOWN2)
 
-        self.time_stamp = struct.pack('<6B', time_stamp_sec, time_stamp_min, time_stamp_hour, self.UNKNOWN_TIME,
-                                      time_stamp_day, time_stamp_month)
-        self.time_stamp = self.time_stamp + struct.pack('>h', time_stamp_year)  # 8 Bytes time stamp, year in big-endian
-        self.size = size  # 4 Byte size of uncompressed LZMA archive
+    def set_timestamp(self, time):
+        self.record.time_stamp = time
+        return True
 
     def set_time(self, time):
-        self.time_stamp = time
+        self.record.time_stamp = time
+
+    def set_size(self, size):
+        self.record.size = size
+
+    def set_arc_magic(self, arc_magic):
+        self.record.arc_magic = arc_magic
+
+    def set_unknown1(self, unknown1):
+        self.record.unknown1 = unknown1
+        return True
+
+    def set_unknown2(self, unknown2):
+        self.record.unknown2 = unknown2
+        return True
+
+    def pack_into(self, buffer, offset=0):
+        self.record.pack_into(buffer, offset)
 
     def get_bytes(self):
-        return self.ARC_MAGIC + self.ARC_INDEX + self.time_stamp + self.UNKNOWN1 + self.size + self.UNKNOWN2
+        return self.record.get_bytes()
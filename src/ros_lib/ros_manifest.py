@@ -0,0 +1,110 @@
+import json
+import os
+import pathlib
+import stat
+from typing import List, NamedTuple, Optional, Union
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11, only JSON manifests can be read
+    tomllib = None
+
+NAME_SIZE = 16  # bytes of the name field of a payload header
+
+
+class RosSourceEntry(NamedTuple):
+    """
+    One payload to pack: its NAME inside the container, the file it is streamed from and the size of that file. LZMA
+    forces (True) or suppresses (False) the LZMA-subheader, None detects it from the file. MIRROR names the payload of
+    the reference container whose unknowns are copied, True for the payload of the same name and False for none.
+    """
+    name: str
+    path: pathlib.Path
+    size: int
+    lzma: Optional[bool] = None
+    mirror: Union[bool, str] = True
+
+
+def check_name(name: str) -> str:
+    """
+    Returns NAME if it fits into a payload header, raises ValueError otherwise.
+    """
+    try:
+        encoded = name.encode('ascii')
+    except UnicodeEncodeError:
+        raise ValueError('payload name {!r} is not ascii'.format(name))
+    if not encoded or len(encoded) > NAME_SIZE or '/' in name or '\x00' in name:
+        raise ValueError('payload name {!r} does not fit into a payload header'.format(name))
+    return name
+
+
+def scan_directory(source_directory: pathlib.Path) -> List[RosSourceEntry]:
+    """
+    Lists the payloads of a directory with a single scandir pass, in the order the directory returns them. Every entry
+    is named after its file.
+    """
+    with os.scandir(source_directory) as scan:
+        return [RosSourceEntry(entry.name, pathlib.Path(entry.path), entry.stat().st_size) for entry in scan]
+
+
+def parse_manifest(data, base_directory: pathlib.Path) -> List[RosSourceEntry]:
+    """
+    Turns a parsed manifest into entries. The manifest is a list of entries or an object with the list in 'entries'.
+    Every entry has a 'path', relative to BASE_DIRECTORY unless absolute, and optionally a 'name' (defaults to the
+    file name), 'lzma' (true or false) and 'mirror' (name of the reference payload, or false). The files are checked
+    with one stat each.
+    """
+    if isinstance(data, dict):
+        data = data.get('entries')
+    if not isinstance(data, list):
+        raise ValueError('manifest has no list of entries')
+
+    entries = []
+    names = set()
+    for i, item in enumerate(data):
+        if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+            raise ValueError('manifest entry {} has no path'.format(i))
+        path = base_directory / os.path.expanduser(item['path'])
+        name = check_name(item.get('name', path.name))
+        if name in names:
+            raise ValueError('payload name {} is used twice'.format(name))
+        names.add(name)
+
+        lzma = item.get('lzma')
+        mirror = item.get('mirror', True)
+        if lzma is not None and not isinstance(lzma, bool):
+            raise ValueError('lzma of {} is neither true nor false'.format(name))
+        if not isinstance(mirror, (bool, str)) or mirror == '':
+            raise ValueError('mirror of {} is neither a name nor false'.format(name))
+
+        try:
+            file_stat = path.stat()
+        except OSError as error:
+            raise ValueError('{}: {}'.format(name, error))
+        if not stat.S_ISREG(file_stat.st_mode):
+            raise ValueError('{} of {} is not a file'.format(path, name))
+        entries.append(RosSourceEntry(name, path, file_stat.st_size, lzma, mirror))
+
+    if not entries:
+        raise ValueError('manifest has no entries')
+    return entries
+
+
+def read_manifest(manifest: pathlib.Path) -> List[RosSourceEntry]:
+    """
+    Reads a JSON or, by the suffix .toml, a TOML manifest. Relative paths are taken from the directory of the manifest.
+    """
+    if manifest.suffix == '.toml':
+        if tomllib is None:
+            raise ValueError('TOML manifests need Python 3.11 or newer')
+        with open(manifest, 'rb') as file:
+            try:
+                data = tomllib.load(file)
+            except tomllib.TOMLDecodeError as error:
+                raise ValueError('{}: {}'.format(manifest.name, error))
+    else:
+        try:
+            data = json.loads(manifest.read_text())
+        except ValueError as error:
+            raise ValueError('{}: {}'.format(manifest.name, error))
+    return parse_manifest(data, manifest.absolute().parent)
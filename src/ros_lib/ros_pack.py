@@ -1,19 +1,24 @@
 import datetime
 import pathlib
-import struct
-from typing import List, Union, Tuple, Dict
+from typing import List, Optional, Union, Tuple
 
+from ros_lib.ros_checksum import byte_sum
+from ros_lib.ros_container import RosContainer, analyze_ros
 from ros_lib.ros_header_v1 import RosHeaderV1
 from ros_lib.ros_header_v2 import RosHeaderV2
 from ros_lib.ros_lzma_subheader import RosLzmaSubheader
 from ros_lib.ros_payload_header import RosPayloadHeader
+from ros_lib.ros_stats import count, timer
+from ros_lib.ros_struct import pack_directory
 
 
 def check_ros(mirror_file: pathlib.Path) -> bool:
     """
     Checks if a given file matches ROS-file characteristics and returns False if not
     """
-    ros_binary = mirror_file.read_bytes()
+    with open(mirror_file, 'rb') as file:
+        ros_binary = file.read(28)
+
     if not ros_binary[24:28] == RosHeaderV1.SIGNATURE:
         print('{} does not have "PACK" at 0x18, sure it is a ros file?'.format(mirror_file.name))
         return False
@@ -25,54 +30,32 @@ def check_ros(mirror_file: pathlib.Path) -> bool:
     return True
 
 
-def analyze_ros(ros_binary: bytes) -> Tuple[bool, Dict[str, bytes]]:
-    """
-    Determines the header version of a ROS-file and returns unknowns and timestamps.
-    """
-    if ros_binary[4:8] == RosHeaderV1.ARC_INDEX:
-        is_version1 = True
-
-    elif ros_binary[4:8] == RosHeaderV2.ARC_INDEX:
-        is_version1 = False
-    else:
-        raise ValueError('Container does not have a valid version index')
-
-    if is_version1:
-        data = {'time': ros_binary[8:15], 'unknown1': ros_binary[28:32], 'unknown2': ros_binary[37:49]}
-
-    else:
-        data = {'unknown1': ros_binary[28:32], 'unknown2': ros_binary[36:40], 'time': ros_binary[40:48],
-                'unknown3': ros_binary[56:64], 'version': ros_binary[64:80]}
-
-    return is_version1, data
-
-
-def analyze_payload_header(mirror_file: pathlib.Path, verbose: bool, payloadheader: RosPayloadHeader) -> None:
+def analyze_payload_header(mirror: RosContainer, verbose: bool, payloadheader: RosPayloadHeader,
+                           name: Optional[str] = None) -> None:
     """
-    Inserts unknowns in payload header
+    Inserts unknowns in payload header, taken from the payload of the same name or of NAME
     """
-    ros_binary = mirror_file.read_bytes()
-    for i in range(0, 60):
-        if ros_binary[i * 16: (i * 16) + 16] == payloadheader.get_name():
-            if verbose:
-                print('Update unknowns in payload header')
-            payloadheader.set_unknown(ros_binary[(i * 16) + 16 + 8: (i * 16) + 16 + 16])
+    with timer('mirror_lookup'):
+        entry = mirror.get_entry(payloadheader.get_name() if name is None else name)
+    if entry is not None:
+        if verbose:
+            print('Update unknowns in payload header')
+        payloadheader.set_unknown(entry.unknown)
 
 
-def analyze_lzma_subheader(mirror_file: pathlib.Path, name: str, tmp_header: RosLzmaSubheader) -> None:
+def analyze_lzma_subheader(mirror: RosContainer, name: str, tmp_header: RosLzmaSubheader) -> None:
     """Inserts unknowns and timestamp in LZMA-subheader."""
 
-    binary = mirror_file.read_bytes()
-    name_len = len(name.encode('ascii'))
-    for i in range(0, 60):
-        if binary[i * 16: (i * 16) + name_len] == name.encode('ascii'):
-            offset = struct.unpack('<L', binary[i * 16 + 16:i * 16 + 16 + 4])[0]
-            tmp_header.set_time(binary[offset + 8:offset + 16])
-            tmp_header.set_unknown1(binary[offset + 16:offset + 20])
-            tmp_header.set_unknown2(binary[offset + 24:offset + 32])
+    with timer('mirror_lookup'):
+        entry = mirror.get_entry(name)
+        subheader = mirror.read(entry.offset, RosLzmaSubheader.HEADER_SIZE) if entry is not None else None
+    if entry is not None:
+        tmp_header.set_time(subheader[8:16])
+        tmp_header.set_unknown1(subheader[16:20])
+        tmp_header.set_unknown2(subheader[24:32])
 
 
-def init_packing(offset: int, version: int, mirror_file: pathlib.Path) -> int:
+def init_packing(offset: int, version: int, mirror: Optional[RosContainer]) -> int:
     """
     Adds the header length to a given offset.
     """
@@ -83,20 +66,19 @@ def init_packing(offset: int, version: int, mirror_file: pathlib.Path) -> int:
         if version == 2:
             offset = offset + RosHeaderV2.HEADER_SIZE
 
-    if mirror_file and mirror_file.is_file():
-        if analyze_ros(mirror_file.read_bytes())[0]:
-            offset = offset + RosHeaderV1.HEADER_SIZE
-        if not analyze_ros(mirror_file.read_bytes())[0]:
-            offset = offset + RosHeaderV2.HEADER_SIZE
+    if mirror is not None:
+        offset = offset + mirror.header_size
 
     return offset
 
 
-def create_header(source_directory: pathlib.Path, mirror_file: pathlib.Path, verbose: bool, version: int, offset: int, payload_checksum: int) -> Union[RosHeaderV1, RosHeaderV2]:
+def create_header(source_directory: pathlib.Path, mirror: Optional[RosContainer], verbose: bool, version: int, offset: int, payload_checksum: int, dir_entries: Optional[int] = None) -> Union[RosHeaderV1, RosHeaderV2]:
     """
-    Creates the header including mirroring, if selected.
+    Creates the header including mirroring, if selected. The source directory is only listed if the number of
+    directory entries is not given.
     """
-    dir_entries = sum(1 for x in source_directory.iterdir())
+    if dir_entries is None:
+        dir_entries = sum(1 for x in source_directory.iterdir())
     time = datetime.datetime.today()
 
     if version is not None:
@@ -114,8 +96,8 @@ def create_header(source_directory: pathlib.Path, mirror_file: pathlib.Path, ver
                                  offset - RosHeaderV2.HEADER_SIZE, payload_checksum)
             header.calc_checksums()
 
-    if mirror_file and mirror_file.is_file():
-        data = analyze_ros(mirror_file.read_bytes())
+    if mirror is not None:
+        data = mirror.is_version1, mirror.data
 
         if data[0]:
             header = RosHeaderV1(time.second, time.minute, time.hour, time.day, time.month, time.year,
@@ -138,12 +120,36 @@ def create_header(source_directory: pathlib.Path, mirror_file: pathlib.Path, ver
     return header
 
 
-def pack_ros(source_directory: pathlib.Path, mirror_file: pathlib.Path, verbose: bool, version: int) -> List[Union[Union[RosPayloadHeader, RosHeaderV1], Tuple[Union[RosPayloadHeader, RosHeaderV1], bytes]]]:
+def create_lzma_subheader(name: str, binary: bytes, mirror: Optional[RosContainer], verbose: bool,
+                          time: datetime.datetime) -> Optional[RosLzmaSubheader]:
+    """
+    Creates the LZMA-subheader of a payload, if its first bytes look like a LZMA archive. Only the first 9 bytes of the
+    payload are needed.
+    """
+    if binary[0:2] != (93).to_bytes(2, byteorder='little'):  # check if LZMA-magic is there
+        return None
+
+    if verbose:
+        print('{} looks like a LZMA archive! creating subheader'.format(name))
+    tmp_lzma_subheader = RosLzmaSubheader(time.second, time.minute, time.hour, time.day, time.month, time.year,
+                                          binary[5:9])
+
+    if mirror is not None:  # mirror if necessary
+        if verbose:
+            print('mirroring subheader')
+        analyze_lzma_subheader(mirror, name, tmp_lzma_subheader)
+
+    return tmp_lzma_subheader
+
+
+def pack_ros(source_directory: pathlib.Path, mirror: Optional[RosContainer], verbose: bool, version: int) -> List[Union[Union[RosPayloadHeader, RosHeaderV1], Tuple[Union[RosPayloadHeader, RosHeaderV1], bytes]]]:
     """
     Packs the content in on one single ros-file
     """
     stack = []
-    dir_entries = sum(1 for x in source_directory.iterdir())
+    with timer('directory_scan'):
+        paths = list(source_directory.iterdir())
+    dir_entries = len(paths)
     current_offset = dir_entries * RosPayloadHeader.HEADER_SIZE
     payload_checksum = 0
     time = datetime.datetime.today()
@@ -151,25 +157,20 @@ def pack_ros(source_directory: pathlib.Path, mirror_file: pathlib.Path, verbose:
     if verbose:
         print('\nStart packing:')
 
-    current_offset = init_packing(current_offset, version, mirror_file)
+    current_offset = init_packing(current_offset, version, mirror)
 
-    for i in source_directory.iterdir():
+    for i in paths:
         if verbose:
             print('\nFile: {}'.format(i.name))
-        binary = i.read_bytes()
+        with timer('payload_read'):
+            binary = i.read_bytes()
+        count('bytes_read', len(binary))
+        count('entries')
 
         # create LZMA subheader if necessary
-        if binary[0:2] == (93).to_bytes(2, byteorder='little'):  # check if LZMA-magic is there
-            if verbose:
-                print('{} looks like a LZMA archive! creating subheader'.format(i.name))
-            tmp_lzma_subheader = RosLzmaSubheader(time.second, time.minute, time.hour, time.day, time.month,
-                                                  time.year, binary[5:9])
-
-            if mirror_file and mirror_file.is_file():  # mirror if necessary
-                if verbose:
-                    print('mirroring subheader')
-                analyze_lzma_subheader(mirror_file, i.name, tmp_lzma_subheader)
-
+        with timer('lzma_detection'):
+            tmp_lzma_subheader = create_lzma_subheader(i.name, binary, mirror, verbose, time)
+        if tmp_lzma_subheader is not None:
             binary = tmp_lzma_subheader.get_bytes() + binary
 
         if verbose:
@@ -177,16 +178,18 @@ def pack_ros(source_directory: pathlib.Path, mirror_file: pathlib.Path, verbose:
 
         tmp_payload_header = RosPayloadHeader(i, len(binary), current_offset)
 
-        if mirror_file and mirror_file.is_file():  # mirror if necessary
-            analyze_payload_header(mirror_file, verbose, tmp_payload_header)
+        if mirror is not None:  # mirror if necessary
+            analyze_payload_header(mirror, verbose, tmp_payload_header)
 
         stack.insert(0, (tmp_payload_header, binary))
         current_offset = current_offset + len(stack[0][1])
         if verbose:
             print('calculating partial checksum')
-        payload_checksum = payload_checksum + sum(stack[0][0].get_bytes()) + sum(stack[0][1])
+        payload_checksum = payload_checksum + byte_sum(stack[0][0].get_bytes()) + byte_sum(stack[0][1])
 
-    stack.insert(0, create_header(source_directory, mirror_file, verbose, version, current_offset, payload_checksum))
+    with timer('header_build'):
+        stack.insert(0, create_header(source_directory, mirror, verbose, version, current_offset, payload_checksum,
+                                      dir_entries))
 
     return stack
 
@@ -198,23 +201,24 @@ def write_ros(output_path: pathlib.Path, verbose: bool, stack: List[Union[Union[
     if verbose:
         print('\nStart writing')
 
-    file = open(output_path.name, 'xb')
-
-    if verbose:
-        print('write header')
-    file.write(stack[0].get_bytes())
+    file = open(output_path, 'xb')
 
     if verbose:
-        print('write payload header')
-    for i in reversed(stack):
-        if isinstance(i, tuple):
-            file.write(i[0].get_bytes())
+        print('write header and payload header')
+    with timer('header_build'):
+        table = pack_directory([i[0] for i in reversed(stack) if isinstance(i, tuple)], stack[0].HEADER_SIZE)
+        stack[0].pack_into(table)
+    with timer('write'):
+        file.write(table)
+    count('bytes_written', len(table))
 
     if verbose:
         print('write payload data\ndone.')
-    for i in reversed(stack):
-        if isinstance(i, tuple):
-            file.write(i[1])
+    with timer('write'):
+        for i in reversed(stack):
+            if isinstance(i, tuple):
+                file.write(i[1])
+                count('bytes_written', len(i[1]))
 
     file.close()
 
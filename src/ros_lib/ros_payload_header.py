@@ -1,5 +1,7 @@
 import struct
 
+from ros_lib.ros_struct import NUMBER, RecordField, RosPayloadHeaderStruct
+
 
 class RosPayloadHeader:
     """Structure of the header of each payload. Total 32 byte in little endian.
@@ -10,22 +12,43 @@ class RosPayloadHeader:
     -------------------------------------------------
     | OFFSET    | LENGTH    |       UNKNOWN1        |
     -------------------------------------------------
+
+    The fields are kept in a RosPayloadHeaderStruct, the former attributes are RecordFields like in RosHeaderV1.
     """
 
     HEADER_SIZE = 32
-    UNKNOWN = struct.pack('<LL', 0, 0)  # 8 Byte
+    UNKNOWN = RecordField('unknown', struct.pack('<LL', 0, 0))  # 8 Byte
+
+    name = RecordField('name')
+    offset = RecordField('offset', layout=NUMBER)
+    length = RecordField('length', layout=NUMBER)
+
+    __slots__ = ('record',)
 
     def __init__(self, path, length, offset):
-        self.name = struct.pack('16s', path.name.encode('ascii'))  # 16 Byte
-        self.offset = struct.pack('<L', offset)  # 4 Byte
-        self.length = struct.pack('<L', length)  # 4 Byte
+        name = path if isinstance(path, str) else path.name  # a payload file or the name of the payload
+        self.record = RosPayloadHeaderStruct(struct.pack('16s', name.encode('ascii')),  # 16 Byte
+                                             offset,  # 4 Byte
+                                             length,  # 4 Byte
+                                             type(self).UNKNOWN)
 
     def set_unknown(self, unknown):
-        self.UNKNOWN = unknown
+        self.record.unknown = unknown
+
+    def set_offset(self, offset):
+        self.record.offset = offset
 
     def get_name(self):
-        return self.name
+        return self.record.name
+
+    def get_offset(self):
+        return self.record.offset
+
+    def get_length(self):
+        return self.record.length
+
+    def pack_into(self, buffer, offset=0):
+        self.record.pack_into(buffer, offset)
 
     def get_bytes(self):
-        # Check if 32 Byte
-        return self.name + self.offset + self.length + self.UNKNOWN
+        return self.record.get_bytes()
@@ -0,0 +1,115 @@
+import mmap
+import os
+import pathlib
+from typing import List, Tuple
+
+from ros_lib.ros_checksum import byte_sum
+from ros_lib.ros_container import RosContainer, RosDirectoryEntry
+from ros_lib.ros_payload_header import RosPayloadHeader
+from ros_lib.ros_stats import count, timer
+from ros_lib.ros_stream import CHUNK_SIZE, RosPayloadSource, build_header_table, copy_range, plan_ros, write_payload
+
+
+def same_content(container: RosContainer, offset: int, path: pathlib.Path, size: int) -> bool:
+    """
+    Compares the first SIZE bytes of a file with the container starting at OFFSET.
+    """
+    if size == 0:
+        return True
+
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ) as source:
+        for position in range(0, size, CHUNK_SIZE):
+            if source[position:position + CHUNK_SIZE] != container.read(offset + position,
+                                                                        min(CHUNK_SIZE, size - position)):
+                return False
+    return True
+
+
+def is_unchanged(container: RosContainer, old: RosDirectoryEntry, entry: RosPayloadSource, trust_mtime: bool) -> bool:
+    """
+    Checks if a planned payload is equal to a payload of the container. If TRUST_MTIME is set, files of the same size
+    which carry exactly the mtime of the container, as stamped by unpack_ros, are taken as unchanged. All others are
+    compared byte by byte.
+    """
+    if old is None or old.length != entry.length:
+        return False
+
+    if container.read(old.offset, len(entry.subheader)) != entry.subheader:
+        return False
+
+    if trust_mtime and entry.path.stat().st_mtime_ns == container.stat.st_mtime_ns:
+        return True
+
+    return same_content(container, old.offset + len(entry.subheader), entry.path, entry.size)
+
+
+def payload_sum(container: RosContainer, entry: RosDirectoryEntry) -> int:
+    with container.get_view(entry.offset, entry.length) as view:
+        return byte_sum(view)
+
+
+def repack_ros(container: RosContainer, source_directory: pathlib.Path, verbose: bool, output_path: pathlib.Path,
+               trust_mtime: bool = False) -> bool:
+    """
+    Packs a directory like pack_ros with CONTAINER as mirror, but takes unchanged payloads over from the container. Those
+    are moved with bulk copies and their sums are never recalculated: the payload checksum of the container is patched by
+    the sums of the payloads that changed and the difference of the directory tables. A failed run removes the output
+    again.
+    """
+    for old in container.entries:
+        if old.offset + old.length > len(container):
+            raise ValueError('payload {} exceeds {}'.format(old.index, container.path.name))
+
+    plan, end_offset = plan_ros(source_directory, container, verbose, None)
+
+    taken = set()
+    copies = []  # type: List[Tuple[int, int, int]]  # runs of (old offset, new offset, length)
+    changed = []  # type: List[RosPayloadSource]
+    for entry in plan:
+        old = container.get_entry(entry.name)
+        if not is_unchanged(container, old, entry, trust_mtime):
+            changed.append(entry)
+            continue
+
+        taken.add(old.index)
+        offset = entry.payload_header.get_offset()
+        if copies and copies[-1][0] + copies[-1][2] == old.offset and copies[-1][1] + copies[-1][2] == offset:
+            copies[-1] = (copies[-1][0], copies[-1][1], copies[-1][2] + old.length)
+        else:
+            copies.append((old.offset, offset, old.length))
+
+    if verbose:
+        print('\n{} of {} payloads changed'.format(len(changed), len(plan)))
+
+    # the sum of the new directory table is added back by build_header_table
+    payload_checksum = container.payload_checksum - \
+        byte_sum(container.read(container.header_size, container.dir_entries * RosPayloadHeader.HEADER_SIZE))
+    for old in container.entries:
+        if old.index not in taken:
+            payload_checksum = payload_checksum - payload_sum(container, old)
+
+    with open(output_path, 'xb') as output:
+        try:
+            output_no = output.fileno()
+
+            if verbose:
+                print('copy {} unchanged runs'.format(len(copies)))
+            for old_offset, offset, length in copies:
+                with timer('write'):
+                    copy_range(container.fileno(), output_no, length, offset, old_offset)
+                count('bytes_written', length)
+
+            for entry in changed:
+                if verbose:
+                    print('write payload {}'.format(entry.name))
+                payload_checksum = payload_checksum + write_payload(entry, output_no)
+
+            table = build_header_table(plan, source_directory, container, verbose, None, end_offset, payload_checksum)
+            with timer('write'):
+                os.pwrite(output_no, table, 0)
+            count('bytes_written', len(table))
+        except BaseException:  # never leave a partial container behind
+            os.unlink(output_path)
+            raise
+
+    return True
@@ -0,0 +1,111 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# phases timed by the packer, timers are inclusive, e.g. header_build contains the checksum of the header
+PHASES = ('directory_scan', 'payload_read', 'lzma_detection', 'mirror_lookup', 'checksum', 'header_build', 'write',
+          'compress', 'fsync', 'dedupe', 'lzma_check')
+
+
+class RosStats:
+    """
+    Accumulates the time spent in named phases and named counters, e.g. bytes_read, bytes_written and entries.
+    Callbacks are called with kind ('timer' or 'counter'), name and value on every recorded event.
+    """
+
+    def __init__(self):
+        self.timers = {}  # type: Dict[str, List]  # name -> [calls, seconds]
+        self.counters = {}  # type: Dict[str, int]
+        self.callbacks = []  # type: List[Callable[[str, str, float], None]]
+        self._lock = threading.Lock()
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            timer = self.timers.setdefault(name, [0, 0.0])
+            timer[0] = timer[0] + 1
+            timer[1] = timer[1] + seconds
+        for callback in self.callbacks:
+            callback('timer', name, seconds)
+
+    def add_count(self, name: str, value: int) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        for callback in self.callbacks:
+            callback('counter', name, value)
+
+    def as_dict(self) -> Dict:
+        return {'timers': {name: {'calls': calls, 'seconds': seconds} for name, (calls, seconds) in self.timers.items()},
+                'counters': dict(self.counters)}
+
+    def as_text(self) -> str:
+        lines = ['{:16} {:>8} {:>12}'.format('phase', 'calls', 'seconds')]
+        for name, (calls, seconds) in self.timers.items():
+            lines.append('{:16} {:8} {:12.6f}'.format(name, calls, seconds))
+        for name, value in self.counters.items():
+            lines.append('{:16} {:>21}'.format(name, value))
+        return '\n'.join(lines)
+
+
+class _Timer:
+    __slots__ = ('stats', 'name', 'start')
+
+    def __init__(self, stats: RosStats, name: str):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self) -> '_Timer':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stats.add_time(self.name, time.perf_counter() - self.start)
+
+
+class _NoTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> '_NoTimer':
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+
+_NO_TIMER = _NoTimer()
+_stats = None  # type: Optional[RosStats]
+
+
+def enable(stats: Optional[RosStats] = None) -> RosStats:
+    """
+    Starts collecting into STATS or a new RosStats and returns it.
+    """
+    global _stats
+    _stats = stats if stats is not None else RosStats()
+    return _stats
+
+
+def disable() -> Optional[RosStats]:
+    """
+    Stops collecting and returns what was collected.
+    """
+    global _stats
+    stats, _stats = _stats, None
+    return stats
+
+
+def get_stats() -> Optional[RosStats]:
+    return _stats
+
+
+def timer(name: str):
+    """
+    Returns a context manager timing a phase. While disabled a shared context manager doing nothing is returned.
+    """
+    if _stats is None:
+        return _NO_TIMER
+    return _Timer(_stats, name)
+
+
+def count(name: str, value: int = 1) -> None:
+    if _stats is not None:
+        _stats.add_count(name, value)
@@ -0,0 +1,308 @@
+import datetime
+import os
+import pathlib
+import struct
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from ros_lib.ros_checksum import byte_sum, sum_file
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_manifest import RosSourceEntry, scan_directory
+from ros_lib.ros_pack import analyze_payload_header, create_header, create_lzma_subheader, init_packing
+from ros_lib.ros_payload_header import RosPayloadHeader
+from ros_lib.ros_stats import count, timer
+from ros_lib.ros_struct import pack_directory
+
+CHUNK_SIZE = 1 << 20  # 1 MiB
+LZMA_PROBE_SIZE = 13  # properties, dictionary size and uncompressed size of a LZMA archive
+
+
+class RosPayloadSource:
+    """
+    A planned payload: the payload header, an optional LZMA-subheader and the file the payload data is streamed from.
+    LENGTH is the length of the payload inside the container including the subheader. CHECKSUM is the byte sum of the
+    file, if already known.
+    """
+
+    def __init__(self, path: pathlib.Path, size: int, subheader: bytes, payload_header: RosPayloadHeader,
+                 checksum: Optional[int] = None):
+        self.path = path
+        self.size = size
+        self.subheader = subheader
+        self.payload_header = payload_header
+        self.checksum = checksum
+
+    @property
+    def length(self) -> int:
+        return len(self.subheader) + self.size
+
+    @property
+    def name(self) -> str:
+        return self.payload_header.get_name().rstrip(b'\x00').decode('ascii')
+
+
+def plan_ros(source_directory: pathlib.Path, mirror: Optional[RosContainer], verbose: bool, version: int,
+             sources: Optional[List[RosSourceEntry]] = None,
+             lzma_sizes: Optional[Dict[str, int]] = None) -> Tuple[List[RosPayloadSource], int]:
+    """
+    First pass of the streaming packer. Lays out the container from the file sizes and the first bytes of each file and
+    returns the planned payloads together with the end offset of the container. SOURCES replaces the content of the
+    source directory, e.g. by the entries of a manifest. LZMA_SIZES gives the uncompressed size of LZMA payloads by
+    name, e.g. of payloads compressed while packing, whose LZMA header does not carry it.
+    """
+    if sources is None:
+        with timer('directory_scan'):
+            sources = scan_directory(source_directory)
+    current_offset = init_packing(len(sources) * RosPayloadHeader.HEADER_SIZE, version, mirror)
+    time = datetime.datetime.today()
+    plan = []
+
+    if verbose:
+        print('\nStart planning:')
+
+    for i in sources:
+        if verbose:
+            print('\nFile: {}'.format(i.name))
+        head = b''
+        if i.lzma is not False:
+            with timer('payload_read'), open(i.path, 'rb') as file:
+                head = file.read(LZMA_PROBE_SIZE)
+        count('entries')
+
+        mirror_name = i.name if i.mirror is True else i.mirror
+        entry_mirror = mirror if mirror_name else None
+        with timer('lzma_detection'):
+            tmp_lzma_subheader = create_lzma_subheader(mirror_name or i.name, head, entry_mirror, verbose, time)
+        if tmp_lzma_subheader is None and i.lzma:
+            raise ValueError('{} is no LZMA archive'.format(i.path))
+        if tmp_lzma_subheader is not None and lzma_sizes is not None and i.name in lzma_sizes:
+            tmp_lzma_subheader.set_size(struct.pack('<I', lzma_sizes[i.name] & 0xFFFFFFFF))  # 4 Byte
+        subheader = tmp_lzma_subheader.get_bytes() if tmp_lzma_subheader is not None else b''
+
+        tmp_payload_header = RosPayloadHeader(i.name, len(subheader) + i.size, current_offset)
+        if entry_mirror is not None:  # mirror if necessary
+            analyze_payload_header(entry_mirror, verbose, tmp_payload_header, mirror_name)
+
+        plan.append(RosPayloadSource(i.path, i.size, subheader, tmp_payload_header))
+        current_offset = current_offset + plan[-1].length
+
+    return plan, current_offset
+
+
+def copy_range(source_no: int, output_no: int, size: int, offset: int, source_offset: int = 0) -> None:
+    """
+    Copies SIZE bytes starting at SOURCE_OFFSET of a file to OFFSET of the output file. The copy is done by the kernel
+    with copy_file_range or sendfile where available, otherwise through a fixed size buffer.
+    """
+    copied = 0
+
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while copied < size:
+                count = os.copy_file_range(source_no, output_no, size - copied, source_offset + copied,
+                                           offset + copied)
+                if count == 0:
+                    break
+                copied = copied + count
+        except OSError:  # e.g. not supported by the file system
+            pass
+
+    if copied < size and hasattr(os, 'sendfile'):
+        os.lseek(output_no, offset + copied, os.SEEK_SET)
+        try:
+            while copied < size:
+                count = os.sendfile(output_no, source_no, source_offset + copied, size - copied)
+                if count == 0:
+                    break
+                copied = copied + count
+        except OSError:
+            pass
+
+    if copied < size:
+        os.lseek(source_no, source_offset + copied, os.SEEK_SET)
+        os.lseek(output_no, offset + copied, os.SEEK_SET)
+        while copied < size:
+            chunk = os.read(source_no, min(CHUNK_SIZE, size - copied))
+            if not chunk:
+                break
+            os.write(output_no, chunk)
+            copied = copied + len(chunk)
+
+    if copied < size:
+        raise ValueError('payload got shorter while packing')
+
+
+def copy_and_sum(source: BinaryIO, output_no: int, size: int, offset: int) -> int:
+    """
+    Copies SIZE bytes of a file to OFFSET of the output file through a fixed size buffer and returns their byte sum, so
+    the file is read only once.
+    """
+    checksum = 0
+    copied = 0
+    buffer = bytearray(min(CHUNK_SIZE, size))
+    with memoryview(buffer) as view:
+        while copied < size:
+            read = source.readinto(view[:min(len(buffer), size - copied)])
+            if read == 0:
+                break
+            checksum = checksum + byte_sum(view[:read])
+            os.pwrite(output_no, view[:read], offset + copied)
+            copied = copied + read
+
+    if copied < size:
+        raise ValueError('payload got shorter while packing')
+    return checksum
+
+
+def write_payload(entry: RosPayloadSource, output_no: int) -> int:
+    """
+    Writes the subheader and the data of a planned payload to its offset of the output file and returns the byte sum of
+    both. Data of a known sum is copied by the kernel, otherwise it is summed while it is copied.
+    """
+    offset = entry.payload_header.get_offset()
+    os.pwrite(output_no, entry.subheader, offset)
+
+    with open(entry.path, 'rb') as source:
+        if os.fstat(source.fileno()).st_size != entry.size:
+            raise ValueError('{} changed while packing'.format(entry.path.name))
+        with timer('write'):
+            if entry.checksum is None:
+                entry.checksum = copy_and_sum(source, output_no, entry.size, offset + len(entry.subheader))
+                count('bytes_read', entry.size)
+            else:
+                copy_range(source.fileno(), output_no, entry.size, offset + len(entry.subheader))
+    count('bytes_written', entry.length)
+
+    return entry.checksum + byte_sum(entry.subheader)
+
+
+def build_header_table(plan: List[RosPayloadSource], source_directory: Optional[pathlib.Path],
+                       mirror: Optional[RosContainer], verbose: bool, version: Optional[int], end_offset: int,
+                       payload_checksum: int) -> bytes:
+    """
+    Packs the directory table of the planned payloads and the main header in front of it into one buffer, ready to be
+    written at offset 0. PAYLOAD_CHECKSUM is the byte sum of the payloads, the sum of the table is added here.
+    """
+    with timer('header_build'):
+        table = pack_directory([entry.payload_header for entry in plan], init_packing(0, version, mirror))
+        # the room for the header is still zero, so this is the byte sum of the payload headers
+        payload_checksum = payload_checksum + byte_sum(table)
+        header = create_header(source_directory, mirror, verbose, version, end_offset, payload_checksum, len(plan))
+        header.pack_into(table)
+    return table
+
+
+def write_planned_ros(plan: List[RosPayloadSource], end_offset: int, source_directory: pathlib.Path,
+                      mirror: Optional[RosContainer], verbose: bool, version: int, output_path: pathlib.Path) -> bool:
+    """
+    Second pass of the streaming packer. The payloads are streamed into the output first, the header and the directory
+    table are written last. A failed run removes the output again.
+    """
+    payload_checksum = 0
+
+    if verbose:
+        print('\nStart streaming')
+
+    with open(output_path, 'xb') as output:
+        try:
+            output_no = output.fileno()
+
+            for entry in plan:
+                if verbose:
+                    print('write payload {}'.format(entry.name))
+                payload_checksum = payload_checksum + write_payload(entry, output_no)
+
+            table = build_header_table(plan, source_directory, mirror, verbose, version, end_offset, payload_checksum)
+
+            if verbose:
+                print('write header and payload header\ndone.')
+            with timer('write'):
+                os.pwrite(output_no, table, 0)
+            count('bytes_written', len(table))
+        except BaseException:  # never leave a partial container behind
+            os.unlink(output_path)
+            raise
+
+    return True
+
+
+def send_file(path: pathlib.Path, size: int, output: BinaryIO) -> None:
+    """
+    Appends the first SIZE bytes of a file to a writable binary file object. If the file object has a file descriptor,
+    e.g. a pipe or stdout, the copy is done by the kernel with sendfile, otherwise through a fixed size buffer.
+    """
+    with open(path, 'rb') as source:
+        if os.fstat(source.fileno()).st_size != size:
+            raise ValueError('{} changed while packing'.format(path.name))
+        copied = 0
+
+        try:
+            output_no = output.fileno()
+            output.flush()
+        except (AttributeError, OSError):  # io.UnsupportedOperation for BytesIO and the like
+            output_no = None
+
+        if output_no is not None and hasattr(os, 'sendfile'):
+            try:
+                while copied < size:
+                    count = os.sendfile(output_no, source.fileno(), copied, size - copied)
+                    if count == 0:
+                        break
+                    copied = copied + count
+            except OSError:
+                pass
+
+        source.seek(copied)
+        buffer = bytearray(min(CHUNK_SIZE, size - copied))
+        with memoryview(buffer) as view:
+            while copied < size:
+                count = source.readinto(view[:min(len(buffer), size - copied)])
+                if count == 0:
+                    break
+                output.write(view[:count])
+                copied = copied + count
+
+        if copied < size:
+            raise ValueError('{} got shorter while packing'.format(path.name))
+
+
+def write_planned_to(plan: List[RosPayloadSource], end_offset: int, source_directory: pathlib.Path,
+                     mirror: Optional[RosContainer], verbose: bool, version: int, output: BinaryIO) -> int:
+    """
+    Second pass of the streaming packer for outputs that can not seek, like pipes. The payloads are summed first, so
+    header and directory table can be written ahead of the payloads. Returns the number of bytes written.
+    """
+    payload_checksum = 0
+
+    for entry in plan:
+        if entry.checksum is None:
+            with open(entry.path, 'rb') as source:
+                entry.checksum = sum_file(source.fileno(), entry.size)
+            count('bytes_read', entry.size)
+        payload_checksum = payload_checksum + entry.checksum + byte_sum(entry.subheader)
+
+    table = build_header_table(plan, source_directory, mirror, verbose, version, end_offset, payload_checksum)
+
+    if verbose:
+        print('\nStart streaming')
+
+    with timer('write'):
+        output.write(table)
+        for entry in plan:
+            if verbose:
+                print('write payload {}'.format(entry.name))
+            output.write(entry.subheader)
+            send_file(entry.path, entry.size, output)
+        output.flush()
+    count('bytes_written', end_offset)
+
+    return end_offset
+
+
+def stream_ros(source_directory: pathlib.Path, mirror: Optional[RosContainer], verbose: bool, version: int,
+               output_path: pathlib.Path, sources: Optional[List[RosSourceEntry]] = None) -> bool:
+    """
+    Packs the content of a directory, or the files given by SOURCES, into one single ros-file without loading the
+    payloads into memory.
+    """
+    plan, end_offset = plan_ros(source_directory, mirror, verbose, version, sources)
+    return write_planned_ros(plan, end_offset, source_directory, mirror, verbose, version, output_path)
@@ -0,0 +1,165 @@
+import struct
+from typing import Sequence
+
+HEADER_V1 = struct.Struct('<4s4s8sII4s4sI12s')  # 48 Bytes
+HEADER_V2 = struct.Struct('<4s4sIIII4s4sI4s8sII8s16s')  # 80 Bytes
+PAYLOAD_HEADER = struct.Struct('<16sLL8s')  # 32 Bytes
+LZMA_SUBHEADER = struct.Struct('<4s4s8s4s4s8s')  # 32 Bytes
+TIME_STAMP = struct.Struct('<6Bh')  # 8 Bytes
+LZMA_TIME_STAMP = struct.Struct('>6Bh')  # 8 Bytes, year in big-endian
+CHECKSUM = struct.Struct('<I')  # 4 Bytes
+NUMBER = struct.Struct('<I')  # 4 Bytes, lengths and counts of the headers
+
+
+class RosHeaderV1Struct:
+    """
+    Fields of a header in version 1. Numbers are kept as int, everything else as the bytes stored in the container.
+    """
+    __slots__ = ('arc_magic', 'arc_index', 'time_stamp', 'length', 'checksum', 'signature', 'unknown1', 'dir_entries',
+                 'unknown2')
+    LAYOUT = HEADER_V1
+    HEADER_SIZE = HEADER_V1.size
+
+    def __init__(self, arc_magic: bytes, arc_index: bytes, time_stamp: bytes, length: int, checksum: int,
+                 signature: bytes, unknown1: bytes, dir_entries: int, unknown2: bytes):
+        self.arc_magic = arc_magic
+        self.arc_index = arc_index
+        self.time_stamp = time_stamp
+        self.length = length
+        self.checksum = checksum
+        self.signature = signature
+        self.unknown1 = unknown1
+        self.dir_entries = dir_entries
+        self.unknown2 = unknown2
+
+    def pack_into(self, buffer, offset: int = 0) -> None:
+        self.LAYOUT.pack_into(buffer, offset, self.arc_magic, self.arc_index, self.time_stamp, self.length,
+                              self.checksum, self.signature, self.unknown1, self.dir_entries, self.unknown2)
+
+    def get_bytes(self) -> bytes:
+        return self.LAYOUT.pack(self.arc_magic, self.arc_index, self.time_stamp, self.length, self.checksum,
+                                self.signature, self.unknown1, self.dir_entries, self.unknown2)
+
+
+class RosHeaderV2Struct:
+    """
+    Fields of a header in version 2. Numbers are kept as int, everything else as the bytes stored in the container.
+    """
+    __slots__ = ('arc_magic', 'arc_index', 'header_length', 'header_checksum', 'length1', 'payload_checksum1',
+                 'signature', 'unknown1', 'dir_entries', 'unknown2', 'time_stamp', 'length2', 'payload_checksum2',
+                 'unknown3', 'version')
+    LAYOUT = HEADER_V2
+    HEADER_SIZE = HEADER_V2.size
+
+    def __init__(self, arc_magic: bytes, arc_index: bytes, header_length: int, header_checksum: int, length1: int,
+                 payload_checksum1: int, signature: bytes, unknown1: bytes, dir_entries: int, unknown2: bytes,
+                 time_stamp: bytes, length2: int, payload_checksum2: int, unknown3: bytes, version: bytes):
+        self.arc_magic = arc_magic
+        self.arc_index = arc_index
+        self.header_length = header_length
+        self.header_checksum = header_checksum
+        self.length1 = length1
+        self.payload_checksum1 = payload_checksum1
+        self.signature = signature
+        self.unknown1 = unknown1
+        self.dir_entries = dir_entries
+        self.unknown2 = unknown2
+        self.time_stamp = time_stamp
+        self.length2 = length2
+        self.payload_checksum2 = payload_checksum2
+        self.unknown3 = unknown3
+        self.version = version
+
+    def _fields(self) -> tuple:
+        return (self.arc_magic, self.arc_index, self.header_length, self.header_checksum, self.length1,
+                self.payload_checksum1, self.signature, self.unknown1, self.dir_entries, self.unknown2,
+                self.time_stamp, self.length2, self.payload_checksum2, self.unknown3, self.version)
+
+    def pack_into(self, buffer, offset: int = 0) -> None:
+        self.LAYOUT.pack_into(buffer, offset, *self._fields())
+
+    def get_bytes(self) -> bytes:
+        return self.LAYOUT.pack(*self._fields())
+
+
+class RosPayloadHeaderStruct:
+    """
+    Fields of a payload header. NAME and UNKNOWN are kept as the bytes stored in the container.
+    """
+    __slots__ = ('name', 'offset', 'length', 'unknown')
+    LAYOUT = PAYLOAD_HEADER
+    HEADER_SIZE = PAYLOAD_HEADER.size
+
+    def __init__(self, name: bytes, offset: int, length: int, unknown: bytes):
+        self.name = name
+        self.offset = offset
+        self.length = length
+        self.unknown = unknown
+
+    def pack_into(self, buffer, offset: int = 0) -> None:
+        self.LAYOUT.pack_into(buffer, offset, self.name, self.offset, self.length, self.unknown)
+
+    def get_bytes(self) -> bytes:
+        return self.LAYOUT.pack(self.name, self.offset, self.length, self.unknown)
+
+
+class RosLzmaSubheaderStruct:
+    """
+    Fields of a LZMA-subheader, all kept as the bytes stored in the container.
+    """
+    __slots__ = ('arc_magic', 'arc_index', 'time_stamp', 'unknown1', 'size', 'unknown2')
+    LAYOUT = LZMA_SUBHEADER
+    HEADER_SIZE = LZMA_SUBHEADER.size
+
+    def __init__(self, arc_magic: bytes, arc_index: bytes, time_stamp: bytes, unknown1: bytes, size: bytes,
+                 unknown2: bytes):
+        self.arc_magic = arc_magic
+        self.arc_index = arc_index
+        self.time_stamp = time_stamp
+        self.unknown1 = unknown1
+        self.size = size
+        self.unknown2 = unknown2
+
+    def pack_into(self, buffer, offset: int = 0) -> None:
+        self.LAYOUT.pack_into(buffer, offset, self.arc_magic, self.arc_index, self.time_stamp, self.unknown1,
+                              self.size, self.unknown2)
+
+    def get_bytes(self) -> bytes:
+        return self.LAYOUT.pack(self.arc_magic, self.arc_index, self.time_stamp, self.unknown1, self.size,
+                                self.unknown2)
+
+
+def pack_directory(payload_headers: Sequence, header_size: int) -> bytearray:
+    """
+    Packs the whole directory table into one preallocated buffer. The first HEADER_SIZE bytes are left free for the main
+    header, which can be packed into the same buffer once its checksums are known.
+    """
+    table = bytearray(header_size + len(payload_headers) * PAYLOAD_HEADER.size)
+    offset = header_size
+    for payload_header in payload_headers:
+        payload_header.pack_into(table, offset)
+        offset = offset + PAYLOAD_HEADER.size
+    return table
+
+
+class RecordField:
+    """
+    Exposes a field of the record of a header wrapper as the bytes stored in the container, readable and writable like
+    the plain attributes the wrappers used to have. Numbers are converted with LAYOUT, other fields are passed through.
+    On the class itself the DEFAULT of the field is returned, which the wrappers use to fill a new record.
+    """
+    __slots__ = ('field', 'default', 'layout')
+
+    def __init__(self, field: str, default: bytes = None, layout: struct.Struct = None):
+        self.field = field
+        self.default = default
+        self.layout = layout
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self.default
+        value = getattr(instance.record, self.field)
+        return value if self.layout is None else self.layout.pack(value)
+
+    def __set__(self, instance, value: bytes) -> None:
+        setattr(instance.record, self.field, value if self.layout is None else self.layout.unpack(value)[0])
@@ -0,0 +1,253 @@
+import datetime
+import struct
+import tarfile
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+from ros_lib.ros_checksum import byte_sum, checksum32
+from ros_lib.ros_container import RosDirectoryEntry
+from ros_lib.ros_header_v1 import RosHeaderV1
+from ros_lib.ros_header_v2 import RosHeaderV2
+from ros_lib.ros_stats import count, timer
+from ros_lib.ros_stream import CHUNK_SIZE
+from ros_lib.ros_struct import HEADER_V1, HEADER_V2, PAYLOAD_HEADER, TIME_STAMP, RosHeaderV1Struct, RosHeaderV2Struct
+from ros_lib.ros_unpack import entry_name
+
+PAX_HEADER = 'ROS.header'  # main header of the container as hex
+PAX_DIRECTORY = 'ROS.directory'  # directory table of the container as hex
+
+
+class RosLayout:
+    """
+    Main header and directory table of a container, parsed with the header structs. Payloads are visited in the order
+    of their offsets, so a container can be read and written front to back.
+    """
+
+    def __init__(self, header: bytes, directory: bytes):
+        if header[24:28] != RosHeaderV1.SIGNATURE:
+            raise ValueError('no "PACK" signature at 0x18, sure it is a ros container?')
+        if header[4:8] == RosHeaderV1.ARC_INDEX:
+            self.header = RosHeaderV1Struct(*HEADER_V1.unpack(header[:RosHeaderV1.HEADER_SIZE]))
+            self.end_offset = self.header.length + RosHeaderV1.HEADER_SIZE
+            self.payload_checksum = self.header.checksum
+        elif header[4:8] == RosHeaderV2.ARC_INDEX:
+            self.header = RosHeaderV2Struct(*HEADER_V2.unpack(header[:RosHeaderV2.HEADER_SIZE]))
+            self.end_offset = self.header.length2 + RosHeaderV2.HEADER_SIZE
+            self.payload_checksum = self.header.payload_checksum2
+        else:
+            raise ValueError('container does not have a valid version index')
+
+        if len(directory) != self.header.dir_entries * PAYLOAD_HEADER.size:
+            raise ValueError('directory table has {} bytes instead of {}'.format(
+                len(directory), self.header.dir_entries * PAYLOAD_HEADER.size))
+        self.header_bytes = header[:self.header.HEADER_SIZE]
+        self.directory = directory
+        self.entries = [RosDirectoryEntry(i, *PAYLOAD_HEADER.unpack_from(directory, i * PAYLOAD_HEADER.size))
+                        for i in range(self.header.dir_entries)]
+
+    @property
+    def start_offset(self) -> int:
+        return len(self.header_bytes) + len(self.directory)
+
+    @property
+    def mtime(self) -> int:
+        second, minute, hour, _, day, month, year = TIME_STAMP.unpack(self.header.time_stamp)
+        try:
+            return int(datetime.datetime(year, month, day, hour, minute, second).timestamp())
+        except (ValueError, OverflowError):  # time stamps of unknown origin
+            return 0
+
+    def stream_order(self) -> Iterator[Tuple[RosDirectoryEntry, Optional[RosDirectoryEntry]]]:
+        """
+        Yields every payload in the order of its offset, together with the payload it shares its bytes with, if any.
+        Only payloads of exactly the same range can share, other overlaps can not be streamed and raise ValueError.
+        """
+        position = self.start_offset
+        previous = None
+        for entry in sorted(self.entries, key=lambda item: (item.offset, item.index)):
+            if entry.offset + entry.length > self.end_offset:
+                raise ValueError('payload {} ends at {:#x} behind the container'.format(entry.index,
+                                                                                       entry.offset + entry.length))
+            if entry.offset >= position:
+                previous = entry
+                position = entry.offset + entry.length
+                yield entry, None
+            elif previous is not None and (entry.offset, entry.length) == (previous.offset, previous.length):
+                yield entry, previous
+            elif previous is None:
+                raise ValueError('payload {} starts at {:#x} inside the headers'.format(entry.index, entry.offset))
+            else:
+                raise ValueError('payload {} overlaps payload {}'.format(entry.index, previous.index))
+
+
+class SummingReader:
+    """
+    Reads a payload of known length from a stream and sums its bytes on the way.
+    """
+
+    def __init__(self, stream: BinaryIO, entry: RosDirectoryEntry):
+        self.stream = stream
+        self.entry = entry
+        self.left = entry.length
+        self.checksum = 0
+
+    def read(self, size: int = -1) -> bytes:
+        size = self.left if size < 0 else min(size, self.left)
+        data = self.stream.read(size)
+        if len(data) < size:
+            raise ValueError('container ends inside payload {}'.format(self.entry.index))
+        self.left = self.left - len(data)
+        self.checksum = self.checksum + byte_sum(data)
+        return data
+
+
+def read_exactly(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) < size:
+        raise ValueError('container ends after {} bytes of the headers'.format(len(data)))
+    return data
+
+
+def skip(stream: BinaryIO, size: int) -> None:
+    """
+    Reads over SIZE bytes outside of the payloads, chunk by chunk, as pipes can not seek. The tar stream does not carry
+    these bytes and the payload checksum does not cover them, so anything but zeros raises ValueError instead of being
+    lost.
+    """
+    while size > 0:
+        data = stream.read(min(CHUNK_SIZE, size))
+        if not data:
+            raise ValueError('container ends {} bytes too early'.format(size))
+        if data.count(0) != len(data):
+            raise ValueError('container has non-zero bytes outside of its payloads, they can not be carried in tar')
+        size = size - len(data)
+
+
+def write_zeros(output: BinaryIO, size: int) -> None:
+    while size > 0:
+        output.write(bytes(min(CHUNK_SIZE, size)))
+        size = size - min(CHUNK_SIZE, size)
+
+
+def check_checksum(layout: RosLayout, checksum: int) -> None:
+    if checksum32(checksum) != layout.payload_checksum:
+        raise ValueError('payload checksum is {:#010x} instead of {:#010x}'.format(checksum32(checksum),
+                                                                                 layout.payload_checksum))
+
+
+def ros_to_tar(source: BinaryIO, output: BinaryIO, verbose: bool = False) -> int:
+    """
+    Converts a container read front to back from SOURCE, e.g. stdin, into a tar stream written to OUTPUT. Every payload
+    becomes a member named like its payload header, including its LZMA-subheader. Main header and directory table, with
+    all unknowns, time stamps and offsets, go into the global PAX header, so tar_to_ros rebuilds the container byte for
+    byte. Bytes outside of the payloads have to be zero, tar_to_ros writes zeros there. Payloads sharing the same range
+    become hard links. Only one chunk of a payload is held in memory at a time. Returns the number of payloads.
+    """
+    head = read_exactly(source, RosHeaderV1.HEADER_SIZE)
+    if head[4:8] == RosHeaderV2.ARC_INDEX:
+        head = head + read_exactly(source, RosHeaderV2.HEADER_SIZE - RosHeaderV1.HEADER_SIZE)
+    dir_entries = struct.unpack_from('<I', head, 32)[0]
+    layout = RosLayout(head, read_exactly(source, dir_entries * PAYLOAD_HEADER.size))
+
+    checksum = byte_sum(layout.directory)
+    sums = {}  # type: Dict[Tuple[int, int], int]
+    position = layout.start_offset
+    pax_headers = {PAX_HEADER: layout.header_bytes.hex(), PAX_DIRECTORY: layout.directory.hex()}
+
+    with tarfile.open(fileobj=output, mode='w|', format=tarfile.PAX_FORMAT, pax_headers=pax_headers) as archive:
+        for entry, shared in layout.stream_order():
+            member = tarfile.TarInfo(entry_name(entry))
+            member.mtime = layout.mtime
+            if shared is not None:
+                if verbose:
+                    print('link payload {} to {}'.format(member.name, entry_name(shared)))
+                member.type = tarfile.LNKTYPE
+                member.linkname = entry_name(shared)
+                archive.addfile(member)
+                checksum = checksum + sums[(entry.offset, entry.length)]
+                continue
+
+            if verbose:
+                print('write payload {}'.format(member.name))
+            skip(source, entry.offset - position)
+            member.size = entry.length
+            reader = SummingReader(source, entry)
+            with timer('write'):
+                archive.addfile(member, reader)
+            sums[(entry.offset, entry.length)] = reader.checksum
+            checksum = checksum + reader.checksum
+            position = entry.offset + entry.length
+            count('bytes_written', entry.length)
+
+    skip(source, layout.end_offset - position)
+    check_checksum(layout, checksum)
+    return len(layout.entries)
+
+
+def copy_member(member: BinaryIO, output: BinaryIO) -> int:
+    """
+    Copies a tar member to OUTPUT chunk by chunk and returns its byte sum.
+    """
+    checksum = 0
+    while True:
+        data = member.read(CHUNK_SIZE)
+        if not data:
+            return checksum
+        output.write(data)
+        checksum = checksum + byte_sum(data)
+
+
+def tar_to_ros(source: BinaryIO, output: BinaryIO, verbose: bool = False) -> int:
+    """
+    Converts a tar stream written by ros_to_tar, read from SOURCE, e.g. stdin, back into a container written front to
+    back to OUTPUT. Header and directory table come from the global PAX header and are written first, the members have
+    to follow in the order of their offsets, each with the name and length of its payload. Bytes between payloads are
+    written as zeros. The payload checksum is checked at the end, the tar stream may be compressed. Returns the number
+    of bytes written.
+    """
+    try:
+        with tarfile.open(fileobj=source, mode='r|*') as archive:
+            if PAX_HEADER not in archive.pax_headers or PAX_DIRECTORY not in archive.pax_headers:
+                raise ValueError('tar stream carries no ros header, was it written by ros_tar.py?')
+            layout = RosLayout(bytes.fromhex(archive.pax_headers[PAX_HEADER]),
+                               bytes.fromhex(archive.pax_headers[PAX_DIRECTORY]))
+            output.write(layout.header_bytes)
+            output.write(layout.directory)
+
+            checksum = byte_sum(layout.directory)
+            sums = {}  # type: Dict[Tuple[int, int], int]
+            position = layout.start_offset
+            order = layout.stream_order()
+            for member in archive:
+                entry, shared = next(order, (None, None))
+                if entry is None:
+                    raise ValueError('member {} is not in the directory table'.format(member.name))
+                if member.name != entry_name(entry):
+                    raise ValueError('member {} is found instead of payload {} ({})'.format(member.name, entry.index,
+                                                                                           entry_name(entry)))
+                if shared is not None:
+                    if not member.islnk():
+                        raise ValueError('member {} has to be a link to {}'.format(member.name, entry_name(shared)))
+                    checksum = checksum + sums[(entry.offset, entry.length)]
+                    continue
+                if not member.isfile() or member.size != entry.length:
+                    raise ValueError('member {} is no file of {} bytes'.format(member.name, entry.length))
+
+                if verbose:
+                    print('write payload {}'.format(member.name))
+                write_zeros(output, entry.offset - position)
+                with timer('write'):
+                    sums[(entry.offset, entry.length)] = copy_member(archive.extractfile(member), output)
+                checksum = checksum + sums[(entry.offset, entry.length)]
+                position = entry.offset + entry.length
+                count('bytes_written', entry.length)
+
+            missing = next(order, (None, None))[0]
+            if missing is not None:
+                raise ValueError('tar stream ends before payload {} ({})'.format(missing.index, entry_name(missing)))
+    except tarfile.TarError as error:
+        raise ValueError('broken tar stream: {}'.format(error))
+
+    write_zeros(output, layout.end_offset - position)
+    output.flush()
+    check_checksum(layout, checksum)
+    return layout.end_offset
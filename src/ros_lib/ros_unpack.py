@@ -0,0 +1,74 @@
+import os
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from ros_lib.ros_container import RosContainer, RosDirectoryEntry
+from ros_lib.ros_lzma_subheader import RosLzmaSubheader
+
+
+def entry_name(entry: RosDirectoryEntry) -> str:
+    """
+    Returns the file name of a payload header and raises ValueError if it can not be used as one.
+    """
+    name = entry.name.rstrip(b'\x00').decode('ascii')
+    if not name or name in ('.', '..') or '/' in name or '\\' in name or '\x00' in name:
+        raise ValueError('payload {} has no usable file name: {!r}'.format(entry.index, entry.name))
+    return name
+
+
+def has_lzma_subheader(container: RosContainer, entry: RosDirectoryEntry) -> bool:
+    """
+    Checks if a payload starts with a LZMA-subheader followed by the LZMA magic.
+    """
+    if entry.length < RosLzmaSubheader.HEADER_SIZE + 2:
+        return False
+    head = container.read(entry.offset, RosLzmaSubheader.HEADER_SIZE + 2)
+    return head[0:8] == RosLzmaSubheader.ARC_MAGIC + RosLzmaSubheader.ARC_INDEX and \
+        head[RosLzmaSubheader.HEADER_SIZE:] == (93).to_bytes(2, byteorder='little')
+
+
+def unpack_entry(container: RosContainer, entry: RosDirectoryEntry, output_directory: pathlib.Path) -> pathlib.Path:
+    """
+    Writes one payload without its LZMA-subheader to the output directory, straight from the memory map.
+    """
+    offset, length = entry.offset, entry.length
+    if has_lzma_subheader(container, entry):
+        offset = offset + RosLzmaSubheader.HEADER_SIZE
+        length = length - RosLzmaSubheader.HEADER_SIZE
+
+    path = output_directory / entry_name(entry)
+    with container.get_view(offset, length) as view, open(path, 'xb') as file:
+        file.write(view)
+    # keep the time of the container, so an incremental repack can tell untouched payloads from modified ones
+    os.utime(path, ns=(container.stat.st_atime_ns, container.stat.st_mtime_ns))
+    return path
+
+
+def unpack_ros(container: RosContainer, output_directory: pathlib.Path, verbose: bool,
+               workers: Optional[int] = None) -> List[pathlib.Path]:
+    """
+    Extracts all payloads of a container into a directory, which can be packed again by pack_ros. The payloads are
+    written concurrently by a thread pool.
+    """
+    for entry in container.entries:
+        if entry.offset + entry.length > len(container):
+            raise ValueError('payload {} exceeds the container'.format(entry_name(entry)))
+
+    names = [entry_name(entry) for entry in container.entries]
+    if len(set(names)) != len(names):
+        raise ValueError('container holds several payloads with the same name')
+
+    output_directory.mkdir(parents=True, exist_ok=True)
+
+    if verbose:
+        print('\nStart unpacking {} payloads'.format(len(names)))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        paths = list(pool.map(lambda entry: unpack_entry(container, entry, output_directory), container.entries))
+
+    if verbose:
+        for path in paths:
+            print('wrote {}'.format(path.name))
+
+    return paths
@@ -0,0 +1,133 @@
+import pathlib
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, NamedTuple, Optional
+
+from ros_lib.ros_checksum import byte_sum, checksum32
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_header_v1 import RosHeaderV1
+from ros_lib.ros_header_v2 import RosHeaderV2
+from ros_lib.ros_payload_header import RosPayloadHeader
+from ros_lib.ros_stream import CHUNK_SIZE
+
+FILES_PER_TASK = 16  # containers handed to a worker process at once
+
+
+class RosVerifyResult(NamedTuple):
+    """Outcome of verifying one container. The container is fine if PROBLEMS is empty."""
+    path: pathlib.Path
+    version: Optional[int]
+    dir_entries: int
+    problems: List[str]
+
+
+def range_sum(container: RosContainer, offset: int, length: int) -> int:
+    """
+    Returns the byte sum of a range of the container, summed chunk by chunk straight from the memory map.
+    """
+    checksum = 0
+    for position in range(offset, offset + length, CHUNK_SIZE):
+        with container.get_view(position, min(CHUNK_SIZE, offset + length - position)) as view:
+            checksum = checksum + byte_sum(view)
+    return checksum
+
+
+def verify_header(container: RosContainer) -> List[str]:
+    """
+    Checks the fields of the main header against the size of the container.
+    """
+    problems = []
+    header = container.header
+    if header[24:28] != RosHeaderV1.SIGNATURE:
+        problems.append('no "PACK" signature at 0x18')
+
+    if container.is_version1:
+        length = struct.unpack_from('<I', header, 16)[0]
+        if length != len(container) - RosHeaderV1.HEADER_SIZE:
+            problems.append('length is {} instead of {}'.format(length, len(container) - RosHeaderV1.HEADER_SIZE))
+        return problems
+
+    header_length, header_checksum, length1, payload_checksum1 = struct.unpack_from('<IIII', header, 8)
+    length2 = struct.unpack_from('<I', header, 48)[0]
+    if header_length != RosHeaderV2.HEADER_SIZE:
+        problems.append('header length is {} instead of {}'.format(header_length, RosHeaderV2.HEADER_SIZE))
+    if length1 != len(container) + 32:
+        problems.append('length 1 is {} instead of {}'.format(length1, len(container) + 32))
+    if length2 != len(container) - RosHeaderV2.HEADER_SIZE:
+        problems.append('length 2 is {} instead of {}'.format(length2, len(container) - RosHeaderV2.HEADER_SIZE))
+
+    # checksum 1 is the byte sum of the header with both header checksums zero, the header checksum covers checksum 1
+    checksum = byte_sum(header[0:12]) + byte_sum(header[16:20]) + byte_sum(header[24:])
+    if payload_checksum1 != checksum32(checksum):
+        problems.append('checksum 1 is {:#010x} instead of {:#010x}'.format(payload_checksum1, checksum32(checksum)))
+    expected = checksum32(0xFFFFFFFF - checksum - byte_sum(header[20:24]))
+    if header_checksum != expected:
+        problems.append('header checksum is {:#010x} instead of {:#010x}'.format(header_checksum, expected))
+    return problems
+
+
+def verify_entries(container: RosContainer) -> List[str]:
+    """
+    Checks that every payload lies behind the directory table, inside the container and does not overlap another one.
+    Payloads of exactly the same offset and length share their bytes, as written by the deduplicating packer.
+    """
+    problems = []
+    start = container.header_size + container.dir_entries * RosPayloadHeader.HEADER_SIZE
+    for entry in container.entries:
+        if entry.offset < start:
+            problems.append('payload {} starts at {:#x} inside the headers'.format(entry.index, entry.offset))
+        if entry.offset + entry.length > len(container):
+            problems.append('payload {} ends at {:#x} behind the container'.format(entry.index,
+                                                                                   entry.offset + entry.length))
+
+    previous = None
+    for entry in sorted(container.entries, key=lambda item: (item.offset, item.length)):
+        if previous is not None and (entry.offset, entry.length) == (previous.offset, previous.length):
+            continue
+        if previous is not None and entry.offset < previous.offset + previous.length:
+            problems.append('payload {} overlaps payload {}'.format(entry.index, previous.index))
+        if previous is None or entry.offset + entry.length > previous.offset + previous.length:
+            previous = entry
+    return problems
+
+
+def verify_ros(container: RosContainer) -> List[str]:
+    """
+    Verifies an opened container and returns its problems: header fields which do not match the container, payloads out
+    of bounds or overlapping, and a payload checksum which does not match the recomputed byte sum of the payload headers
+    and payloads. The payload sum is only recomputed if all payloads are in bounds.
+    """
+    problems = verify_header(container) + verify_entries(container)
+    if any(entry.offset + entry.length > len(container) for entry in container.entries):
+        return problems
+
+    checksum = range_sum(container, container.header_size, container.dir_entries * RosPayloadHeader.HEADER_SIZE)
+    for entry in container.entries:
+        checksum = checksum + range_sum(container, entry.offset, entry.length)
+    if container.payload_checksum != checksum32(checksum):
+        problems.append('payload checksum is {:#010x} instead of {:#010x}'.format(container.payload_checksum,
+                                                                                  checksum32(checksum)))
+    return problems
+
+
+def verify_file(path: pathlib.Path) -> RosVerifyResult:
+    """
+    Opens and verifies a container. Files which can not be parsed as a container are reported as a problem.
+    """
+    try:
+        with RosContainer(path) as container:
+            return RosVerifyResult(path, container.version, container.dir_entries, verify_ros(container))
+    except (OSError, ValueError) as error:
+        return RosVerifyResult(path, None, 0, [str(error)])
+
+
+def verify_files(paths: List[pathlib.Path], workers: Optional[int] = None) -> Iterator[RosVerifyResult]:
+    """
+    Verifies many containers across a process pool and yields the results in the order of PATHS.
+    """
+    if len(paths) == 1 or workers == 1:
+        yield from map(verify_file, paths)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(verify_file, paths, chunksize=FILES_PER_TASK)
@@ -0,0 +1,133 @@
+import contextlib
+import os
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
+
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_manifest import RosSourceEntry
+from ros_lib.ros_stats import count, timer
+from ros_lib.ros_stream import RosPayloadSource, build_header_table, plan_ros, write_payload
+
+
+def preallocate(file_no: int, size: int) -> None:
+    """
+    Reserves SIZE bytes for a file, so concurrent writes do not fragment it. File systems which can not preallocate get
+    a sparse file of the final size instead.
+    """
+    if size == 0:
+        return
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(file_no, 0, size)
+            return
+        except OSError:  # e.g. EOPNOTSUPP
+            pass
+    os.ftruncate(file_no, size)
+
+
+def publish(temporary: pathlib.Path, output_path: pathlib.Path) -> None:
+    """
+    Moves a finished file to its name in one step. Like the other writers, an existing file is never replaced: the file
+    is linked to its name, which fails if the name is taken, and only renamed where hard links are not supported.
+    """
+    try:
+        os.link(temporary, output_path)
+    except FileExistsError:
+        raise
+    except OSError:  # no hard links on this file system
+        if output_path.exists():
+            raise FileExistsError('{} already exists'.format(output_path))
+        os.rename(temporary, output_path)
+        return
+    os.unlink(temporary)
+
+
+def sync_directory(directory: pathlib.Path) -> None:
+    directory_no = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(directory_no)
+    finally:
+        os.close(directory_no)
+
+
+@contextlib.contextmanager
+def atomic_output(output_path: pathlib.Path, size: int, fsync: bool = False) -> Iterator[pathlib.Path]:
+    """
+    Creates a preallocated temporary file next to OUTPUT_PATH and yields its path. When the block succeeds the file is
+    optionally synced and published under OUTPUT_PATH, otherwise it is removed. A crash never leaves a partial file
+    under OUTPUT_PATH.
+    """
+    output_path = output_path.absolute()
+    temporary = output_path.with_name('.{}.{}.tmp'.format(output_path.name, os.getpid()))
+    file_no = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        try:
+            preallocate(file_no, size)
+            yield temporary
+            if fsync:
+                with timer('fsync'):
+                    os.fsync(file_no)
+        finally:
+            os.close(file_no)
+        publish(temporary, output_path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(temporary)
+        raise
+
+    if fsync:
+        with timer('fsync'):
+            sync_directory(output_path.parent)
+
+
+def write_payload_at(entry: RosPayloadSource, path: pathlib.Path) -> int:
+    """
+    Writes one payload through a descriptor of its own, so kernel copies which move the file position do not get in the
+    way of concurrent writers.
+    """
+    output_no = os.open(path, os.O_WRONLY)
+    try:
+        return write_payload(entry, output_no)
+    finally:
+        os.close(output_no)
+
+
+def write_parallel_ros(plan: List[RosPayloadSource], end_offset: int, source_directory: Optional[pathlib.Path],
+                       mirror: Optional[RosContainer], verbose: bool, version: int, output_path: pathlib.Path,
+                       workers: Optional[int] = None, fsync: bool = False) -> bool:
+    """
+    Second pass of the streaming packer writing payloads concurrently. The output is preallocated to its final size in
+    a temporary file, every payload is written to its planned offset by a thread pool and header and directory table are
+    written last, once all payload sums are known. The container is published under OUTPUT_PATH only when complete.
+    """
+    if verbose:
+        print('\nStart writing {} payloads in parallel'.format(len(plan)))
+
+    with atomic_output(output_path, end_offset, fsync) as temporary:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            payload_checksum = sum(pool.map(lambda entry: write_payload_at(entry, temporary), plan))
+
+        table = build_header_table(plan, source_directory, mirror, verbose, version, end_offset, payload_checksum)
+
+        if verbose:
+            print('write header and payload header\ndone.')
+        output_no = os.open(temporary, os.O_WRONLY)
+        try:
+            with timer('write'):
+                os.pwrite(output_no, table, 0)
+        finally:
+            os.close(output_no)
+        count('bytes_written', len(table))
+
+    return True
+
+
+def parallel_ros(source_directory: Optional[pathlib.Path], mirror: Optional[RosContainer], verbose: bool, version: int,
+                 output_path: pathlib.Path, workers: Optional[int] = None, fsync: bool = False,
+                 sources: Optional[List[RosSourceEntry]] = None) -> bool:
+    """
+    Packs a directory, or the files given by SOURCES, like stream_ros but with the parallel writer.
+    """
+    plan, end_offset = plan_ros(source_directory, mirror, verbose, version, sources)
+    return write_parallel_ros(plan, end_offset, source_directory, mirror, verbose, version, output_path, workers, fsync)
@@ -1,34 +1,80 @@
 #!/usr/bin/env python3
 
+import contextlib
+import json
 import pathlib
 import argparse
+import sys
+import time
 
+from ros_lib.ros_api import pack_to_file
+from ros_lib.ros_batch import read_jobs, run_batch
+from ros_lib.ros_cache import RosCache
+from ros_lib.ros_compress import DICT_SIZE_MAX, DICT_SIZE_MIN, compress_ros, read_compress_manifest
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_daemon import RosDaemon
+from ros_lib.ros_dedupe import dedupe_ros
+from ros_lib.ros_lzma_check import check_lzma_payloads
+from ros_lib.ros_manifest import read_manifest, scan_directory
 from ros_lib.ros_pack import check_ros, pack_ros, write_ros
+from ros_lib.ros_repack import repack_ros
+from ros_lib import ros_stats
+from ros_lib.ros_stream import stream_ros
+from ros_lib.ros_writer import parallel_ros
+
+# options of a single pack, with --batch every job is packed with the settings of the job list instead
+BATCH_IGNORED = (('-v', 'verbosity'), ('-o', 'output'), ('-s', 'stream'), ('-p', 'parallel'), ('--fsync', 'fsync'),
+                 ('-d', 'dedupe'), ('-i', 'incremental'), ('--trust-mtime', 'trust_mtime'), ('-c', 'cache'),
+                 ('--cache-size', 'cache_size'), ('-z', 'compress'), ('--compress-manifest', 'compress_manifest'),
+                 ('--lzma-preset', 'lzma_preset'), ('--lzma-dict-size', 'lzma_dict_size'),
+                 ('--check-lzma', 'check_lzma'), ('--check-cache', 'check_cache'), ('--stats', 'stats'),
+                 ('-m', 'mirror'), ('-V', 'version'))
 
 
 def check_arguments(arguments: argparse.Namespace) -> bool:
     """
-    Checking arguments and returns False if: DIR_TO_PACK does not exists, is no directory, is empty, OUTPUT
-    already exists, MIRROR already exists or is no file; VERSION and MIRROR is set or neither.
+    Checking arguments and returns False if: DIR_TO_PACK and MANIFEST are set; MANIFEST is no file or set together
+    with INCREMENTAL, CACHE or compression; DIR_TO_PACK does not exists, is no directory, is empty, OUTPUT already
+    exists, MIRROR already exists or is no file; VERSION and MIRROR is set or neither; INCREMENTAL is set without
+    MIRROR or together with CACHE; TRUST_MTIME is set without INCREMENTAL; INCREMENTAL or CACHE write to stdout;
+    CACHE is no directory; COMPRESS or COMPRESS_MANIFEST is set together with INCREMENTAL or CACHE or writes to
+    stdout; COMPRESS_MANIFEST is no file; PARALLEL is set together with INCREMENTAL, CACHE or compression or writes
+    to stdout; FSYNC is set without PARALLEL; DEDUPE is set together with INCREMENTAL, CACHE, compression or
+    PARALLEL or writes to stdout; CHECK_CACHE is set without CHECK_LZMA; LZMA_PRESET is not between 0 and 9.
     """
 
     if arguments.verbosity:
         print(
             '\nChecking Arguments:\ngiven directory: {}\ngiven output {}\nmirror file: {}\nselected '
-            'header version: {}'.format(
-                arguments.DIR_TO_PACK, arguments.output, arguments.mirror, arguments.version))
+            'header version: {}\nmanifest: {}'.format(
+                arguments.DIR_TO_PACK, arguments.output, arguments.mirror, arguments.version, arguments.manifest))
 
-    if not arguments.DIR_TO_PACK.exists():
-        print('Error: {} does not exist!'.format(arguments.DIR_TO_PACK.name))
+    if arguments.DIR_TO_PACK is not None and arguments.manifest is not None:
+        print('Error: Either a directory or a manifest has to be packed, not both!')
         return False
 
-    if not arguments.DIR_TO_PACK.is_dir():
-        print('Error: {} is not a directory!'.format(arguments.DIR_TO_PACK.name))
-        return False
+    if arguments.manifest is not None:
+        if not arguments.manifest.is_file():
+            print('Error: {} is not a file!'.format(arguments.manifest))
+            return False
 
-    if not list(arguments.DIR_TO_PACK.iterdir()):
-        print('Error: {} is empty!'.format(arguments.DIR_TO_PACK.name))
-        return False
+        if arguments.incremental or arguments.cache is not None or arguments.compress or \
+                arguments.compress_manifest is not None:
+            print('Error: A manifest can not be combined with incremental repacking, the cache or compression!')
+            return False
+
+    else:
+        if not arguments.DIR_TO_PACK.exists():
+            print('Error: {} does not exist!'.format(arguments.DIR_TO_PACK.name))
+            return False
+
+        if not arguments.DIR_TO_PACK.is_dir():
+            print('Error: {} is not a directory!'.format(arguments.DIR_TO_PACK.name))
+            return False
+
+        if not any(arguments.DIR_TO_PACK.iterdir()):
+            print('Error: {} is empty!'.format(arguments.DIR_TO_PACK.name))
+            return False
 
     if arguments.output.exists():
         print('Error: {} already exists!'.format(arguments.output.name))
@@ -47,6 +93,64 @@ def check_arguments(arguments: argparse.Namespace) -> bool:
         print('Error: No header version and no mirror file!')
         return False
 
+    if arguments.incremental and arguments.mirror is None:
+        print('Error: Incremental repacking needs a mirror file!')
+        return False
+
+    if str(arguments.output) == '-' and (arguments.incremental or arguments.cache is not None):
+        print('Error: Incremental repacking and the cache can not write to stdout!')
+        return False
+
+    if arguments.trust_mtime and not arguments.incremental:
+        print('Error: Trusting mtimes needs incremental repacking!')
+        return False
+
+    if arguments.incremental and arguments.cache is not None:
+        print('Error: Incremental repacking can not be combined with the cache!')
+        return False
+
+    if arguments.cache is not None and arguments.cache.exists() and not arguments.cache.is_dir():
+        print('Error: {} is not a directory!'.format(arguments.cache))
+        return False
+
+    compress = arguments.compress or arguments.compress_manifest is not None
+    if compress and (arguments.incremental or arguments.cache is not None or str(arguments.output) == '-'):
+        print('Error: Compression can not be combined with incremental repacking, the cache or stdout!')
+        return False
+
+    if arguments.compress_manifest is not None and not arguments.compress_manifest.is_file():
+        print('Error: {} is not a file!'.format(arguments.compress_manifest))
+        return False
+
+    if arguments.parallel and (arguments.incremental or arguments.cache is not None or compress or
+                               str(arguments.output) == '-'):
+        print('Error: The parallel writer can not be combined with incremental repacking, the cache, compression or '
+              'stdout!')
+        return False
+
+    if arguments.fsync and not arguments.parallel:
+        print('Error: Syncing needs the parallel writer!')
+        return False
+
+    if arguments.dedupe and (arguments.incremental or arguments.cache is not None or compress or arguments.parallel or
+                             str(arguments.output) == '-'):
+        print('Error: Deduplication can not be combined with incremental repacking, the cache, compression, the '
+              'parallel writer or stdout!')
+        return False
+
+    if arguments.check_cache is not None and not arguments.check_lzma:
+        print('Error: The check cache needs --check-lzma!')
+        return False
+
+    if not 0 <= arguments.lzma_preset <= 9:
+        print('Error: LZMA preset {} is not between 0 and 9!'.format(arguments.lzma_preset))
+        return False
+
+    if arguments.lzma_dict_size is not None and not DICT_SIZE_MIN <= arguments.lzma_dict_size <= DICT_SIZE_MAX:
+        print('Error: LZMA dictionary size {} is not between {} and {}!'.format(arguments.lzma_dict_size, DICT_SIZE_MIN,
+                                                                                DICT_SIZE_MAX))
+        return False
+
     return True
 
 
@@ -55,31 +159,218 @@ def setup_arguments() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description='A simple packer for the ros firmmware container format.')
     parser.add_argument('-v', '--verbosity', help='increase output verbosity', action='store_true')
     parser.add_argument('-o', '--output', type=pathlib.Path, default=pathlib.Path('container.ros'),
-                        help='name your output')
+                        help='name your output, - writes the container to stdout')
+    parser.add_argument('-s', '--stream', action='store_true',
+                        help='stream the payloads into the output instead of loading them into memory')
+    parser.add_argument('-p', '--parallel', action='store_true',
+                        help='write the payloads concurrently into a preallocated file, published when complete')
+    parser.add_argument('--fsync', action='store_true', help='sync the container to disk before publishing it')
+    parser.add_argument('-d', '--dedupe', action='store_true',
+                        help='store byte-identical payloads only once and report the bytes saved')
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help='take unchanged payloads over from the mirror file instead of packing them again')
+    parser.add_argument('--trust-mtime', action='store_true',
+                        help='with -i, take files carrying the mtime of the mirror file as unchanged without comparing')
+    parser.add_argument('-c', '--cache', type=pathlib.Path,
+                        help='directory of a build cache, which is used if given')
+    parser.add_argument('--cache-size', type=int, default=1024, help='size limit of the build cache in MiB')
+    parser.add_argument('-z', '--compress', action='append', default=[], metavar='GLOB',
+                        help='compress raw payloads matching GLOB with LZMA while packing, can be given several times')
+    parser.add_argument('--compress-manifest', type=pathlib.Path,
+                        help='JSON list of payloads to compress, or object of payloads and their LZMA options')
+    parser.add_argument('--lzma-preset', type=int, default=6, help='LZMA preset of compressed payloads (default 6)')
+    parser.add_argument('--lzma-dict-size', type=int, help='LZMA dictionary size of compressed payloads in bytes')
+    parser.add_argument('--check-lzma', action='store_true',
+                        help='decode every LZMA payload before packing and refuse to pack broken ones')
+    parser.add_argument('--check-cache', type=pathlib.Path, metavar='FILE',
+                        help='JSON file remembering checked LZMA payloads, unchanged files are not decoded again')
+    parser.add_argument('-j', '--jobs', type=int,
+                        help='number of processes compressing or checking payloads, of threads writing payloads with '
+                             '--parallel or of threads running jobs with --serve')
+    parser.add_argument('--batch', type=pathlib.Path, metavar='JOBS',
+                        help='pack every job of a JSON job list across a process pool and print a summary')
+    parser.add_argument('--serve', type=pathlib.Path, metavar='SOCKET',
+                        help='run as daemon answering pack, verify and unpack jobs on a Unix socket')
+    parser.add_argument('--stats', nargs='?', const='text', choices=['json', 'text'],
+                        help='print time per phase and counters after packing')
     group = parser.add_mutually_exclusive_group()
     group.add_argument('-m', '--mirror', type=pathlib.Path,
                        help='ros-file to mirror. This will help determine the header version')
     group.add_argument('-V', '--version', type=int, choices=[1, 2], help='select header version 1 or header version 2')
-    parser.add_argument('DIR_TO_PACK', type=pathlib.Path, help='location of the unpacked ros structure.')
+    parser.add_argument('--manifest', type=pathlib.Path,
+                        help='JSON or TOML manifest of payload names, source files and order, instead of DIR_TO_PACK')
+    parser.add_argument('DIR_TO_PACK', type=pathlib.Path, nargs='?', help='location of the unpacked ros structure.')
     args = parser.parse_args()
 
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('-j/--jobs needs at least 1')
+    if args.serve is not None or args.batch is not None:
+        if args.serve is not None and args.batch is not None:
+            parser.error('--serve and --batch can not be combined')
+        if args.DIR_TO_PACK is not None or args.manifest is not None:
+            parser.error('--serve and --batch do not pack DIR_TO_PACK or --manifest itself')
+        if args.batch is not None:
+            # every job of a job list is packed with the streaming packer and the settings of the job
+            ignored = [option for option, dest in BATCH_IGNORED if getattr(args, dest) != parser.get_default(dest)]
+            if ignored:
+                parser.error('--batch packs with the settings of its job list, {} can not be used'.format(
+                    ', '.join(ignored)))
+    elif args.DIR_TO_PACK is None and args.manifest is None:
+        parser.error('DIR_TO_PACK or --manifest is required')
+
     return args
 
 
 def main():
     arguments = setup_arguments()
 
+    if arguments.serve is not None:
+        try:
+            RosDaemon(arguments.serve.absolute(), arguments.jobs).serve()
+        except ValueError as error:
+            print('Error: {}'.format(error))
+            return 1
+        return 0
+
+    if arguments.batch is not None:
+        return batch(arguments)
+
+    if str(arguments.output) == '-':
+        # the container goes to stdout, so all messages go to stderr
+        output = sys.stdout.buffer
+        with contextlib.redirect_stdout(sys.stderr):
+            return run(arguments, output)
+
+    return run(arguments, None)
+
+
+def batch(arguments: argparse.Namespace) -> int:
+    """
+    Runs the jobs of a job list and prints status, time and output of every job, followed by a summary. Returns 0 if all
+    jobs succeeded, otherwise the highest exit code of a job.
+    """
+    try:
+        jobs = read_jobs(arguments.batch)
+    except (OSError, ValueError) as error:
+        print('Error: {}'.format(error))
+        return 1
+
+    start = time.perf_counter()
+    results = []
+    for result in run_batch(jobs, arguments.jobs):
+        results.append(result)
+        print('{}\t{:.3f}\t{}\t{}'.format(result.status, result.seconds, result.job.output, result.error or ''))
+
+    print('{} of {} jobs packed in {:.3f} s, {:.3f} s of packing'.format(
+        sum(1 for result in results if result.status == 0), len(results), time.perf_counter() - start,
+        sum(result.seconds for result in results)))
+    return max(result.status for result in results)
+
+
+def check_lzma(arguments: argparse.Namespace, sources) -> bool:
+    """
+    Decodes the LZMA payloads about to be packed, prints size and decode throughput of each and returns False if any of
+    them is broken.
+    """
+    with ros_stats.timer('lzma_check'):
+        results = check_lzma_payloads(sources if sources is not None else scan_directory(arguments.DIR_TO_PACK),
+                                      arguments.jobs, arguments.check_cache)
+
+    for result in results:
+        if result.problem is not None:
+            print('Error: {}: {}'.format(result.name, result.problem))
+        elif result.cached:
+            print('{}: {} bytes decode to {} bytes (cached)'.format(result.name, result.size, result.decoded))
+        else:
+            print('{}: {} bytes decode to {} bytes, {:.1f} MiB/s'.format(result.name, result.size, result.decoded,
+                                                                          result.throughput))
+
+    return all(result.problem is None for result in results)
+
+
+def run(arguments: argparse.Namespace, output) -> int:
+
     if not check_arguments(arguments):
         return 1
 
+    if arguments.stats is not None:
+        ros_stats.enable()
+
+    mirror = None
     if arguments.mirror is not None:
         if not check_ros(arguments.mirror):
             return 3
+        try:
+            mirror = RosContainer(arguments.mirror)
+        except ValueError as error:
+            print('Error: {}'.format(error))
+            return 3
+
+    sources = None
+    if arguments.manifest is not None:
+        try:
+            sources = read_manifest(arguments.manifest)
+        except ValueError as error:
+            print('Error: {}'.format(error))
+            return 1
 
-    ros_structure = pack_ros(arguments.DIR_TO_PACK, arguments.mirror, arguments.verbosity, arguments.version)
+    if arguments.check_lzma and not check_lzma(arguments, sources):
+        if mirror is not None:
+            mirror.close()
+        return 3
 
-    if not write_ros(arguments.output, arguments.verbosity, ros_structure):
+    try:
+        if output is not None:
+            pack_to_file(arguments.DIR_TO_PACK, output, mirror, arguments.version, arguments.verbosity, sources)
+        elif arguments.cache is not None:
+            cache = RosCache(arguments.cache, arguments.cache_size << 20)
+            if not cache.pack(arguments.DIR_TO_PACK, mirror, arguments.verbosity, arguments.version,
+                              arguments.output):
+                return 4
+        elif arguments.compress or arguments.compress_manifest is not None:
+            manifest = None
+            if arguments.compress_manifest is not None:
+                manifest = read_compress_manifest(arguments.compress_manifest)
+            if not compress_ros(arguments.DIR_TO_PACK, mirror, arguments.verbosity, arguments.version,
+                                arguments.output, arguments.compress, manifest, arguments.lzma_preset,
+                                arguments.lzma_dict_size, arguments.jobs):
+                return 4
+        elif arguments.incremental:
+            if not repack_ros(mirror, arguments.DIR_TO_PACK, arguments.verbosity, arguments.output,
+                              arguments.trust_mtime):
+                return 4
+        elif arguments.parallel:
+            if not parallel_ros(arguments.DIR_TO_PACK, mirror, arguments.verbosity, arguments.version,
+                                arguments.output, arguments.jobs, arguments.fsync, sources):
+                return 4
+        elif arguments.dedupe:
+            result = dedupe_ros(arguments.DIR_TO_PACK, mirror, arguments.verbosity, arguments.version,
+                                arguments.output, sources)
+            print('Deduplicated {} payloads, saved {} bytes, {} bytes written'.format(
+                result.duplicates, result.bytes_saved, result.end_offset))
+        elif arguments.stream or sources is not None:
+            if not stream_ros(arguments.DIR_TO_PACK, mirror, arguments.verbosity, arguments.version,
+                              arguments.output, sources):
+                return 4
+        else:
+            ros_structure = pack_ros(arguments.DIR_TO_PACK, mirror, arguments.verbosity, arguments.version)
+            if not write_ros(arguments.output, arguments.verbosity, ros_structure):
+                return 4
+    except ValueError as error:  # broken input, e.g. a payload changing while packing
+        print('Error: {}'.format(error))
+        return 3
+    except OSError as error:
+        print('Error: {}'.format(error))
         return 4
+    finally:
+        if mirror is not None:
+            mirror.close()
+
+    stats = ros_stats.disable()
+    if arguments.stats == 'json':
+        print(json.dumps(stats.as_dict(), indent=2))
+    elif arguments.stats == 'text':
+        print(stats.as_text())
 
     return 0
 
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+import contextlib
+import pathlib
+import argparse
+import sys
+
+from ros_lib.ros_tar import ros_to_tar, tar_to_ros
+
+
+def check_arguments(arguments: argparse.Namespace) -> bool:
+    """
+    Checking arguments and returns False if: INPUT does not exist or is no file; OUTPUT already exists.
+    """
+
+    if arguments.verbosity:
+        print('\nChecking Arguments:\ngiven command: {}\ngiven input: {}\ngiven output {}'.format(
+            arguments.command, arguments.INPUT, arguments.output))
+
+    if str(arguments.INPUT) != '-':
+        if not arguments.INPUT.exists():
+            print('Error: {} does not exist!'.format(arguments.INPUT.name))
+            return False
+
+        if not arguments.INPUT.is_file():
+            print('Error: {} is not a file!'.format(arguments.INPUT.name))
+            return False
+
+    if str(arguments.output) != '-' and arguments.output.exists():
+        print('Error: {} already exists!'.format(arguments.output.name))
+        return False
+
+    return True
+
+
+def setup_arguments() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description='Converts ros containers into tar streams and back, over pipes.')
+    parser.add_argument('-v', '--verbosity', help='increase output verbosity', action='store_true')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    to_tar = commands.add_parser('to-tar', help='convert a ros container into a tar stream')
+    to_tar.add_argument('-o', '--output', type=pathlib.Path, default=pathlib.Path('-'),
+                        help='name of the tar file, defaults to - (stdout)')
+    to_tar.add_argument('INPUT', type=pathlib.Path, nargs='?', default=pathlib.Path('-'),
+                        help='ros-file to convert, defaults to - (stdin).')
+
+    to_ros = commands.add_parser('to-ros', help='convert a tar stream written by to-tar back into a ros container')
+    to_ros.add_argument('-o', '--output', type=pathlib.Path, default=pathlib.Path('-'),
+                        help='name of the ros-file, defaults to - (stdout)')
+    to_ros.add_argument('INPUT', type=pathlib.Path, nargs='?', default=pathlib.Path('-'),
+                        help='tar file to convert, may be compressed, defaults to - (stdin).')
+    args = parser.parse_args()
+
+    return args
+
+
+def main():
+    arguments = setup_arguments()
+
+    if str(arguments.output) == '-':
+        # the output goes to stdout, so all messages go to stderr
+        output = sys.stdout.buffer
+        with contextlib.redirect_stdout(sys.stderr):
+            return run(arguments, output)
+
+    return run(arguments, None)
+
+
+def run(arguments: argparse.Namespace, output) -> int:
+
+    if not check_arguments(arguments):
+        return 1
+
+    convert = ros_to_tar if arguments.command == 'to-tar' else tar_to_ros
+    with contextlib.ExitStack() as stack:
+        source = sys.stdin.buffer if str(arguments.INPUT) == '-' else stack.enter_context(open(arguments.INPUT, 'rb'))
+        created = False
+        try:
+            if output is None:
+                output = stack.enter_context(open(arguments.output, 'xb'))
+                created = True
+            convert(source, output, arguments.verbosity)
+        except (ValueError, OSError) as error:
+            print('Error: {}'.format(error))
+            if created:  # never leave a partial output behind
+                stack.close()
+                arguments.output.unlink()
+            return 3 if isinstance(error, ValueError) else 4
+
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
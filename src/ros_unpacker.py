@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import pathlib
+import argparse
+
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_pack import check_ros
+from ros_lib.ros_unpack import unpack_ros
+
+
+def check_arguments(arguments: argparse.Namespace) -> bool:
+    """
+    Checking arguments and returns False if: CONTAINER does not exist or is no file, OUTPUT already exists.
+    """
+
+    if arguments.verbosity:
+        print('\nChecking Arguments:\ngiven container: {}\ngiven output {}'.format(arguments.CONTAINER,
+                                                                                    arguments.output))
+
+    if not arguments.CONTAINER.exists():
+        print('Error: {} does not exist!'.format(arguments.CONTAINER.name))
+        return False
+
+    if not arguments.CONTAINER.is_file():
+        print('Error: {} is not a file!'.format(arguments.CONTAINER.name))
+        return False
+
+    if arguments.output.exists():
+        print('Error: {} already exists!'.format(arguments.output.name))
+        return False
+
+    return True
+
+
+def setup_arguments() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description='A simple unpacker for the ros firmmware container format.')
+    parser.add_argument('-v', '--verbosity', help='increase output verbosity', action='store_true')
+    parser.add_argument('-o', '--output', type=pathlib.Path,
+                        help='directory to unpack into, defaults to the container name without suffix')
+    parser.add_argument('-j', '--jobs', type=int, help='number of payloads written in parallel')
+    parser.add_argument('CONTAINER', type=pathlib.Path, help='ros-file to unpack.')
+    args = parser.parse_args()
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('-j/--jobs needs at least 1')
+
+    if args.output is None:
+        args.output = pathlib.Path(args.CONTAINER.stem)
+
+    return args
+
+
+def main():
+    arguments = setup_arguments()
+
+    if not check_arguments(arguments):
+        return 1
+
+    if not check_ros(arguments.CONTAINER):
+        return 3
+
+    try:
+        with RosContainer(arguments.CONTAINER) as container:
+            unpack_ros(container, arguments.output, arguments.verbosity, arguments.jobs)
+    except ValueError as error:
+        print('Error: {}'.format(error))
+        return 3
+
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import pathlib
+import argparse
+
+from ros_lib.ros_verify import verify_files
+
+
+def check_arguments(arguments: argparse.Namespace) -> bool:
+    """
+    Checking arguments and returns False if: a CONTAINER does not exist or is no file.
+    """
+
+    if arguments.verbosity:
+        print('\nChecking Arguments:\ngiven containers: {}'.format(len(arguments.CONTAINER)))
+
+    for container in arguments.CONTAINER:
+        if not container.exists():
+            print('Error: {} does not exist!'.format(container))
+            return False
+
+        if not container.is_file():
+            print('Error: {} is not a file!'.format(container))
+            return False
+
+    return True
+
+
+def setup_arguments() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description='Verifies headers, directory tables and checksums of ros containers.')
+    parser.add_argument('-v', '--verbosity', help='increase output verbosity', action='store_true')
+    parser.add_argument('-j', '--jobs', type=int, help='number of containers verified in parallel')
+    parser.add_argument('CONTAINER', type=pathlib.Path, nargs='+', help='ros-files to verify.')
+    args = parser.parse_args()
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('-j/--jobs needs at least 1')
+
+    return args
+
+
+def main():
+    arguments = setup_arguments()
+
+    if not check_arguments(arguments):
+        return 1
+
+    failed = 0
+    for result in verify_files(arguments.CONTAINER, arguments.jobs):
+        if result.problems:
+            failed = failed + 1
+            for problem in result.problems:
+                print('{}: {}'.format(result.path, problem))
+        elif arguments.verbosity:
+            print('{}: version {}, {} payloads, OK'.format(result.path, result.version, result.dir_entries))
+
+    if arguments.verbosity or failed:
+        print('{} of {} containers failed'.format(failed, len(arguments.CONTAINER)))
+
+    return 3 if failed else 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,44 @@
+from pathlib import Path
+from typing import Callable, Dict
+
+import pytest
+
+TOOLS = Path(__file__).parent.parent  # the command line tools are next to ros_lib
+ROS_PACK = [str(TOOLS / 'ros_packer.py'), ]
+ROS_UNPACK = [str(TOOLS / 'ros_unpacker.py'), ]
+ROS_VERIFY = [str(TOOLS / 'ros_verify.py'), ]
+ROS_DELTA = [str(TOOLS / 'ros_delta.py'), ]
+ROS_CATALOG = [str(TOOLS / 'ros_catalog.py'), ]
+ROS_TAR = str(TOOLS / 'ros_tar.py')
+ROS_CLIENT = [str(TOOLS / 'ros_client.py'), ]
+TEST_CONTAINER = Path(__file__).parent / 'firmware/test_container.ros'
+TEST_DIRECTORY = Path(__file__).parent / 'firmware/Test_container'
+
+# properties and dictionary size of a LZMA archive, enough for the packer to add a LZMA-subheader
+LZMA_PAYLOAD = bytes([0x5d, 0x00, 0x00, 0x80, 0x00, 0x00, 0x10, 0x00, 0x00]) + bytes(range(256)) * 20
+PAYLOADS = {'KERNEL': LZMA_PAYLOAD, 'CONFIG': b'config' * 1000, 'EMPTY': b''}
+
+
+@pytest.fixture
+def make_payloads(tmp_path) -> Callable[..., Path]:
+    """
+    Returns a function writing a directory below tmp_path with one file per name and content of PAYLOADS and returning
+    the path of the directory.
+    """
+    def make_payloads(payloads: Dict[str, bytes] = PAYLOADS, name: str = 'payloads') -> Path:
+        directory = tmp_path / name
+        directory.mkdir(parents=True)
+        for payload_name, data in payloads.items():
+            (directory / payload_name).write_bytes(data)
+        return directory
+
+    return make_payloads
+
+
+@pytest.fixture
+def source(make_payloads) -> Path:
+    """
+    Payload directory with a LZMA payload, a plain payload and an empty one. Tests needing other payloads override it
+    with make_payloads.
+    """
+    return make_payloads()
@@ -0,0 +1,32 @@
+import random
+
+import pytest
+
+from benchmark.synthetic import make_payload_directory, make_reference_container, payload_sizes
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_unpack import has_lzma_subheader
+
+
+@pytest.mark.parametrize('version', [1, 2])
+def test_synthetic_reference(tmp_path, version):
+    total = make_payload_directory(tmp_path / 'payloads', 30, 2000, 'uniform', lzma_ratio=0.5, seed=1)
+    assert total == sum(path.stat().st_size for path in (tmp_path / 'payloads').iterdir())
+
+    make_reference_container(tmp_path / 'payloads', version, tmp_path / 'reference.ros')
+    with RosContainer(tmp_path / 'reference.ros') as container:
+        assert container.version == version
+        assert container.dir_entries == 30
+        assert 0 < sum(has_lzma_subheader(container, entry) for entry in container.entries) < 30
+
+
+def test_payload_sizes_are_reproducible():
+    assert payload_sizes(10, 1000, 'lognormal', random.Random(3)) == payload_sizes(10, 1000, 'lognormal',
+                                                                                   random.Random(3))
+    assert payload_sizes(3, 7, 'fixed', random.Random(0)) == [7, 7, 7]
+
+
+def test_payloads_are_reproducible(tmp_path):
+    for name in ('first', 'second'):
+        make_payload_directory(tmp_path / name, 5, 3000, 'uniform', lzma_ratio=0.5, seed=7)
+    for path in (tmp_path / 'first').iterdir():
+        assert path.read_bytes() == (tmp_path / 'second' / path.name).read_bytes()
@@ -0,0 +1,55 @@
+import asyncio
+import io
+import subprocess
+
+from conftest import ROS_PACK, TEST_DIRECTORY
+from ros_lib.ros_api import pack, pack_ros_async, pack_to_bytes
+from ros_lib.ros_pack import pack_ros, write_ros
+
+
+def make_reference(tmp_path):
+    reference = tmp_path / 'reference.ros'
+    write_ros(reference, False, pack_ros(TEST_DIRECTORY, None, False, 2))
+    return reference
+
+
+def test_pack_targets(tmp_path):
+    reference = make_reference(tmp_path)
+    container = reference.read_bytes()
+
+    assert pack_to_bytes(TEST_DIRECTORY, mirror=reference) == container
+
+    output = io.BytesIO()
+    assert pack(TEST_DIRECTORY, output, mirror=str(reference)) == len(container)
+    assert output.getvalue() == container
+
+    with open(tmp_path / 'file.ros', 'wb') as file:
+        pack(TEST_DIRECTORY, file, mirror=reference)
+    assert (tmp_path / 'file.ros').read_bytes() == container
+
+    assert pack(TEST_DIRECTORY, tmp_path / 'path.ros', mirror=reference) == len(container)
+    assert (tmp_path / 'path.ros').read_bytes() == container
+
+
+def test_pack_async_concurrently(tmp_path):
+    reference = make_reference(tmp_path)
+
+    async def pack_all():
+        return await asyncio.gather(*[pack_ros_async(TEST_DIRECTORY, mirror=reference) for _ in range(8)])
+
+    assert asyncio.run(pack_all()) == [reference.read_bytes()] * 8
+
+
+def test_pack_to_stdout(tmp_path):
+    reference = make_reference(tmp_path)
+    result = subprocess.run(ROS_PACK + ['-v', '-m', str(reference), '-o', '-', str(TEST_DIRECTORY)],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    assert result.returncode == 0
+    assert result.stdout == reference.read_bytes()
+    assert b'Checking Arguments' in result.stderr
+
+
+def test_write_ros_keeps_output_directory(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    write_ros(tmp_path / 'sub' / 'out.ros', False, pack_ros(TEST_DIRECTORY, None, False, 1))
+    assert (tmp_path / 'sub' / 'out.ros').is_file()
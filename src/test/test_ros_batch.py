@@ -0,0 +1,66 @@
+import json
+import subprocess
+
+import pytest
+
+from conftest import ROS_PACK
+from ros_lib import ros_batch
+from ros_lib.ros_batch import RosBatchJob, parse_jobs, read_jobs, run_batch
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_stream import stream_ros
+
+
+@pytest.fixture
+def release(tmp_path, make_payloads):
+    for variant in ('alpha', 'beta', 'gamma'):
+        make_payloads({'KERNEL': variant.encode('ascii') * 1000, 'CONFIG': b'config'}, variant)
+    stream_ros(tmp_path / 'alpha', None, False, 2, tmp_path / 'reference.ros')
+    (tmp_path / 'broken.ros').write_bytes(b'no container')
+
+    jobs = [{'source': variant, 'output': 'out/{}.ros'.format(variant), 'mirror': 'reference.ros'}
+            for variant in ('alpha', 'beta', 'gamma')]
+    jobs.append({'source': 'beta', 'output': 'out/beta_v1.ros', 'version': 1})
+    jobs.append({'source': 'gamma', 'output': 'out/broken.ros', 'mirror': 'broken.ros'})
+    (tmp_path / 'out').mkdir()
+    (tmp_path / 'jobs.json').write_text(json.dumps({'jobs': jobs}))
+    return tmp_path
+
+
+def test_run_batch(release):
+    results = list(run_batch(read_jobs(release / 'jobs.json'), workers=2))
+    assert [result.status for result in results] == [0, 0, 0, 0, 3]
+    assert [result.job.output.name for result in results] == ['alpha.ros', 'beta.ros', 'gamma.ros', 'beta_v1.ros',
+                                                              'broken.ros']
+    assert not ros_batch._mirrors  # references are closed after the batch
+
+    for variant in ('alpha', 'beta', 'gamma'):
+        with RosContainer(release / 'reference.ros') as mirror:
+            stream_ros(release / variant, mirror, False, None, release / '{}.ros'.format(variant))
+        assert (release / 'out' / '{}.ros'.format(variant)).read_bytes() == \
+            (release / '{}.ros'.format(variant)).read_bytes()
+    with RosContainer(release / 'out' / 'beta_v1.ros') as container:
+        assert container.version == 1
+
+    # outputs are never overwritten
+    results = list(run_batch(read_jobs(release / 'jobs.json')[:2], workers=1))
+    assert [result.status for result in results] == [1, 1]
+
+
+def test_parse_jobs(tmp_path):
+    assert parse_jobs([{'source': 'a', 'output': 'a.ros', 'version': 2}], tmp_path) == \
+        [RosBatchJob(tmp_path / 'a', tmp_path / 'a.ros', None, 2)]
+    for jobs in ([], [{'source': 'a', 'output': 'a.ros'}], [{'source': 'a', 'output': 'a.ros', 'version': 3}],
+                 [{'source': 'a', 'output': 'a.ros', 'version': 1, 'mirror': 'm.ros'}],
+                 [{'source': 'a', 'output': 'a.ros', 'version': 1}, {'source': 'b', 'output': 'a.ros', 'version': 1}]):
+        with pytest.raises(ValueError):
+            parse_jobs(jobs, tmp_path)
+
+
+def test_cli(release):
+    process = subprocess.run(ROS_PACK + ['--batch', str(release / 'jobs.json'), '-j', '2'], stdout=subprocess.PIPE)
+    assert process.returncode == 3
+    assert process.stdout.splitlines()[-1].startswith(b'4 of 5 jobs packed in ')
+    assert subprocess.call(ROS_PACK + ['--batch', str(release / 'jobs.json'), str(release / 'alpha')]) == 2
+    for options in (['-V', '1'], ['-o', 'other.ros'], ['-p'], ['-d'], ['-z', '*'], ['--check-lzma'], ['--stats']):
+        assert subprocess.call(ROS_PACK + ['--batch', str(release / 'jobs.json')] + options) == 2
+    assert subprocess.call(ROS_PACK + ['--batch', str(release / 'jobs.json'), '-j', '0']) == 2
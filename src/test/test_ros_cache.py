@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from conftest import TEST_CONTAINER
+from ros_lib.ros_cache import RosCache
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_stream import stream_ros
+
+
+@pytest.fixture
+def source(make_payloads):
+    return make_payloads({'PAYLOAD_A': b'A' * 5000, 'PAYLOAD_B': b'B' * 3000})
+
+
+def test_cache_hit_and_miss(source, tmp_path):
+    with RosContainer(TEST_CONTAINER) as mirror:
+        cache = RosCache(tmp_path / 'cache')
+        assert cache.pack(source, mirror, False, None, tmp_path / 'first.ros')
+        assert len(list((tmp_path / 'cache/objects').glob('*.ros'))) == 1
+
+        cache = RosCache(tmp_path / 'cache')
+        assert cache.pack(source, mirror, False, None, tmp_path / 'second.ros')
+        assert len(list((tmp_path / 'cache/objects').glob('*.ros'))) == 1
+
+        (source / 'PAYLOAD_B').write_bytes(b'C' * 3000)
+        assert cache.pack(source, mirror, False, None, tmp_path / 'third.ros')
+        assert len(list((tmp_path / 'cache/objects').glob('*.ros'))) == 2
+
+        stream_ros(source, mirror, False, None, tmp_path / 'streamed.ros')
+
+    assert (tmp_path / 'first.ros').read_bytes() == (tmp_path / 'second.ros').read_bytes()
+    assert (tmp_path / 'third.ros').read_bytes() == (tmp_path / 'streamed.ros').read_bytes()
+
+
+def test_remembers_file_sums(source, tmp_path):
+    cache = RosCache(tmp_path / 'cache')
+    assert cache.digest_file(source / 'PAYLOAD_A')[1] == 5000 * ord('A')
+    cache.save()
+
+    cache = RosCache(tmp_path / 'cache')
+    key = cache._stat_key(source / 'PAYLOAD_A')
+    cache._files[key][1] = 42  # a remembered sum is not recalculated
+    assert cache.digest_file(source / 'PAYLOAD_A')[1] == 42
+
+    stat = (source / 'PAYLOAD_A').stat()
+    (source / 'PAYLOAD_A').write_bytes(b'B' * 5000)  # same size and mtime, only ctime tells the edit
+    os.utime(source / 'PAYLOAD_A', ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cache.digest_file(source / 'PAYLOAD_A')[1] == 5000 * ord('B')
+
+
+def test_eviction(source, tmp_path):
+    cache = RosCache(tmp_path / 'cache', max_size=0)
+    assert cache.pack(source, None, False, 2, tmp_path / 'out.ros')
+    assert not list((tmp_path / 'cache/objects').iterdir())
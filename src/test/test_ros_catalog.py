@@ -0,0 +1,66 @@
+import os
+from pathlib import Path
+import shutil
+import subprocess
+
+import pytest
+
+from conftest import ROS_CATALOG, TEST_CONTAINER, TEST_DIRECTORY
+from ros_lib.ros_catalog import RosCatalog
+from ros_lib.ros_delta import entry_digest
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_pack import pack_ros, write_ros
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch, make_payloads):
+    corpus = tmp_path / 'corpus'
+    (corpus / 'vendor_a').mkdir(parents=True)
+    (corpus / 'vendor_b').mkdir()
+    shutil.copy(TEST_CONTAINER, corpus / 'vendor_a' / 'first.ros')
+
+    payloads = make_payloads({'KERNEL': b'kernel' * 100, 'PAYLOAD_A': (TEST_DIRECTORY / 'PAYLOAD_A').read_bytes()})
+    monkeypatch.chdir(corpus / 'vendor_b')
+    write_ros(Path('second.ros'), False, pack_ros(payloads, None, False, 1))
+    (corpus / 'vendor_b' / 'broken.ros').write_bytes(b'LS23' * 4)
+    return corpus
+
+
+def test_scan_and_query(corpus, tmp_path):
+    with RosCatalog(tmp_path / 'catalog.sqlite') as catalog:
+        assert catalog.scan(corpus, workers=2) == (3, 0, 0)
+        containers = {Path(row[0]).name: row for row in catalog.containers()}
+        assert containers['first.ros'][1] == 2 and containers['first.ros'][3:5] == ('Firmware', 2)
+        assert containers['second.ros'][1] == 1 and containers['second.ros'][3] is None
+        assert containers['broken.ros'][5]
+
+        assert [Path(row[0]).name for row in catalog.find_entry('PAYLOAD_A')] == ['first.ros', 'second.ros']
+        assert [Path(row[0]).name for row in catalog.find_entry('KERN*')] == ['second.ros']
+
+        with RosContainer(corpus / 'vendor_b' / 'second.ros') as container:
+            digest = entry_digest(container, container.get_entry('PAYLOAD_A')).hex()
+        assert {Path(row[0]).name for row in catalog.find_payload(digest)} == {'first.ros', 'second.ros'}
+        shared = catalog.shared_payloads(corpus / 'vendor_b' / 'second.ros')
+        assert [(row[0], Path(row[1]).name, row[2]) for row in shared] == [('PAYLOAD_A', 'first.ros', 'PAYLOAD_A')]
+
+
+def test_rescan_is_incremental(corpus, tmp_path):
+    with RosCatalog(tmp_path / 'catalog.sqlite') as catalog:
+        catalog.scan(corpus)
+        assert catalog.scan(corpus) == (0, 3, 0)
+
+        (corpus / 'vendor_b' / 'broken.ros').unlink()
+        os.utime(corpus / 'vendor_a' / 'first.ros', ns=(0, 0))
+        assert catalog.scan(corpus) == (1, 1, 1)
+        assert catalog.scan(corpus / 'vendor_a') == (0, 1, 0)
+        assert len(catalog.containers()) == 2
+
+
+def test_command_line(corpus, tmp_path):
+    database = str(tmp_path / 'catalog.sqlite')
+    assert subprocess.call(ROS_CATALOG + ['-d', database, 'entry', 'KERNEL']) == 1
+    assert subprocess.call(ROS_CATALOG + ['-d', database, 'scan', '-j', '0', str(corpus)],
+                           stderr=subprocess.DEVNULL) == 2
+    assert subprocess.call(ROS_CATALOG + ['-d', database, 'scan', '-j', '2', str(corpus)]) == 0
+    output = subprocess.check_output(ROS_CATALOG + ['-d', database, 'entry', 'KERNEL'])
+    assert output.decode().startswith(str(corpus / 'vendor_b' / 'second.ros') + '\t0\t')
@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from ros_lib import ros_checksum
+from ros_lib.ros_checksum import PythonChecksum, byte_sum, checksum32, sum_file
+from ros_lib.ros_header_v1 import RosHeaderV1
+from ros_lib.ros_header_v2 import RosHeaderV2
+
+DATA = os.urandom(3 * ros_checksum.CHUNK_SIZE + 17)
+
+
+def test_python_backend_matches_sum():
+    backend = PythonChecksum()
+    assert backend.sum(DATA) == sum(DATA)
+    assert backend.sum(bytearray(DATA)) == sum(DATA)
+    assert backend.sum(memoryview(DATA)[5:]) == sum(DATA[5:])
+
+
+def test_numpy_backend_matches_sum():
+    pytest.importorskip('numpy')
+    backend = ros_checksum.NumpyChecksum(workers=4, parallel_threshold=1 << 20)
+    assert backend.sum(DATA) == sum(DATA)
+    assert backend.sum(memoryview(DATA)[5:]) == sum(DATA[5:])
+
+
+def test_sum_file(tmp_path):
+    payload = tmp_path / 'payload'
+    payload.write_bytes(DATA)
+    with open(payload, 'rb') as file:
+        assert sum_file(file.fileno(), len(DATA)) == sum(DATA)
+        assert sum_file(file.fileno(), 0) == 0
+    assert byte_sum(b'') == 0
+
+
+def test_checksum_wraps_around():
+    assert checksum32(0x1_0000_0005) == 5
+    assert RosHeaderV1(0, 0, 0, 1, 1, 2020, 1, 0, 0x1_0000_0005).checksum == b'\x05\x00\x00\x00'
+    assert RosHeaderV2(0, 1, 0, 0, 0, 1, 1, 2020, 0, 0x2_0000_0007).payload_checksum2 == b'\x07\x00\x00\x00'
@@ -0,0 +1,63 @@
+import json
+import lzma
+import subprocess
+
+import pytest
+
+from conftest import LZMA_PAYLOAD, PAYLOADS, ROS_PACK
+from ros_lib.ros_compress import compress_ros, read_compress_manifest, select_payloads
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_unpack import unpack_ros
+
+KERNEL = bytes(range(256)) * 400
+
+
+@pytest.fixture
+def source(make_payloads):
+    return make_payloads({'KERNEL': KERNEL, 'CONFIG': PAYLOADS['CONFIG'], 'PACKED': LZMA_PAYLOAD})
+
+
+def test_select_skips_lzma(source):
+    selected = select_payloads(sorted(source.iterdir()), ['K*', 'PACKED'])
+    assert [path.name for path in selected] == ['KERNEL']
+
+
+def test_read_manifest(tmp_path):
+    (tmp_path / 'list.json').write_text(json.dumps(['KERNEL']))
+    (tmp_path / 'object.json').write_text(json.dumps({'KERNEL': {'preset': 1}}))
+    assert read_compress_manifest(tmp_path / 'list.json') == {'KERNEL': {}}
+    assert read_compress_manifest(tmp_path / 'object.json') == {'KERNEL': {'preset': 1}}
+
+
+@pytest.mark.parametrize('options', [{'preset': 10}, {'preset': '1'}, {'preset': True}, {'dict_size': 4095},
+                                     {'dict_size': 1 << 31}, {'dict_size': 1.5}])
+def test_broken_manifest_options(tmp_path, options):
+    (tmp_path / 'object.json').write_text(json.dumps({'KERNEL': options}))
+    with pytest.raises(ValueError, match='KERNEL'):
+        read_compress_manifest(tmp_path / 'object.json')
+
+
+def test_command_line_errors(source, tmp_path):
+    (tmp_path / 'object.json').write_text(json.dumps({'KERNEL': {'preset': 10}}))
+    packer = ROS_PACK + ['-V', '2', '-o', str(tmp_path / 'packed.ros')]
+    assert subprocess.call(packer + ['--compress-manifest', str(tmp_path / 'object.json'), str(source)]) == 3
+    assert subprocess.call(packer + ['-z', 'KERNEL', '--lzma-dict-size', '4095', str(source)]) == 1
+
+    (source / 'BROKEN').symlink_to(tmp_path / 'missing')
+    assert subprocess.call(packer + ['-z', 'KERNEL', str(source)]) == 4
+    assert not (tmp_path / 'packed.ros').exists()
+
+
+@pytest.mark.parametrize('version', [1, 2])
+def test_compress_round_trip(source, tmp_path, version):
+    assert compress_ros(source, None, False, version, tmp_path / 'packed.ros', ['KERNEL'], preset=1, workers=2)
+    assert not list(tmp_path.glob('.ros_lzma_*'))
+
+    with RosContainer(tmp_path / 'packed.ros') as container:
+        kernel = container.get_entry('KERNEL')
+        assert container.read(kernel.offset + 20, 4) == len(KERNEL).to_bytes(4, byteorder='little')
+        unpack_ros(container, tmp_path / 'unpacked', False)
+
+    assert lzma.decompress((tmp_path / 'unpacked' / 'KERNEL').read_bytes(), format=lzma.FORMAT_ALONE) == KERNEL
+    assert (tmp_path / 'unpacked' / 'CONFIG').read_bytes() == b'config' * 1000
+    assert (tmp_path / 'unpacked' / 'PACKED').read_bytes() == LZMA_PAYLOAD
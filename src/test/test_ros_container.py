@@ -0,0 +1,41 @@
+from pathlib import Path
+
+import pytest
+
+from conftest import TEST_CONTAINER
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_pack import pack_ros, write_ros
+
+
+def test_parse_test_container():
+    with RosContainer(TEST_CONTAINER) as container:
+        assert container.version == 2
+        assert container.header_size == 80
+        assert [entry.name.rstrip(b'\x00') for entry in container.entries] == [b'PAYLOAD_B', b'PAYLOAD_A']
+
+        entry = container.get_entry('PAYLOAD_A')
+        assert (entry.offset, entry.length) == (0xb0, 0x40)
+        assert container.read(entry.offset, 4) == b'AAAA'
+        assert container.get_entry(b'PAYLOAD_B').offset == 0x90
+        assert container.get_entry('PAYLOAD_C') is None
+
+
+def test_lookup_beyond_60_entries(tmp_path, monkeypatch, make_payloads):
+    source = make_payloads({'P{:03}'.format(i): bytes([i]) * (i + 1) for i in range(100)})
+
+    monkeypatch.chdir(tmp_path)
+    write_ros(Path('big.ros'), False, pack_ros(source, None, False, 1))
+
+    with RosContainer(tmp_path / 'big.ros') as container:
+        assert container.version == 1
+        assert container.dir_entries == 100
+        entry = container.get_entry('P099')
+        assert entry.length == 100
+        assert container.read(entry.offset, entry.length) == bytes([99]) * 100
+
+
+def test_reject_truncated_directory(tmp_path):
+    broken = tmp_path / 'broken.ros'
+    broken.write_bytes(TEST_CONTAINER.read_bytes()[:100])
+    with pytest.raises(ValueError):
+        RosContainer(broken)
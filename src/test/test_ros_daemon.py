@@ -0,0 +1,90 @@
+import json
+from pathlib import Path
+import subprocess
+import time
+
+import pytest
+
+from conftest import ROS_CLIENT, ROS_PACK, TEST_CONTAINER, TEST_DIRECTORY
+from ros_lib.ros_client import send_request
+from ros_lib.ros_daemon import LruCache, RosDaemon
+from ros_lib.ros_pack import pack_ros, write_ros
+
+
+def test_lru_cache_invalidates_by_stat():
+    cache = LruCache(2)
+    cache.put('a', (1, 1, 1), 'A')
+    cache.put('b', (1, 1, 1), 'B')
+    assert cache.get('a', (1, 1, 1)) == 'A'
+    assert cache.get('a', (1, 2, 1)) is None
+    cache.put('c', (1, 1, 1), 'C')
+    assert cache.get('b', (1, 1, 1)) is None
+    assert cache.as_dict() == {'items': 2, 'hits': 1, 'misses': 2}
+    assert cache.put('a', (1, 2, 1), 'A2') == ['A'] and cache.put('d', (1, 1, 1), 'D') == ['C']
+
+
+def test_evicted_mirror_is_closed_after_its_last_job(tmp_path):
+    for name in ('first.ros', 'second.ros'):
+        (tmp_path / name).write_bytes(TEST_CONTAINER.read_bytes())
+    daemon = RosDaemon(tmp_path / 'ros.sock', mirrors=1)
+    with daemon.open_mirror(tmp_path / 'first.ros') as first:
+        with daemon.open_mirror(tmp_path / 'second.ros'):  # drops first from the cache
+            assert first.read(0, 4) == TEST_CONTAINER.read_bytes()[:4]
+        assert first.read(0, 4) == TEST_CONTAINER.read_bytes()[:4]
+    with pytest.raises(ValueError):  # closed once the job is done
+        first.read(0, 4)
+    with daemon.open_mirror(tmp_path / 'second.ros') as second:
+        assert second.read(0, 4) == TEST_CONTAINER.read_bytes()[:4]
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    socket_path = tmp_path / 'ros.sock'
+    process = subprocess.Popen(ROS_PACK + ['--serve', str(socket_path), '-j', '2'])
+    for _ in range(200):
+        try:
+            send_request(socket_path, {'command': 'stats'})
+            break
+        except OSError:  # not listening yet
+            time.sleep(0.05)
+    yield socket_path
+    if process.poll() is None:
+        send_request(socket_path, {'command': 'shutdown'})
+    process.wait(5)
+
+
+def test_daemon_jobs(daemon, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_ros(Path('packed.ros'), False, pack_ros(TEST_DIRECTORY, None, False, 2))
+    (tmp_path / 'reference.ros').write_bytes((tmp_path / 'packed.ros').read_bytes())
+
+    for name in ('first.ros', 'second.ros'):
+        assert subprocess.call(ROS_CLIENT + [str(daemon), 'pack', '-m', 'reference.ros', '-o', name,
+                                             str(TEST_DIRECTORY)]) == 0
+        assert (tmp_path / name).read_bytes() == (tmp_path / 'packed.ros').read_bytes()
+
+    stats = json.loads(send_request(daemon, {'command': 'stats'})['output'][0])
+    assert stats['mirrors'] == {'items': 1, 'hits': 1, 'misses': 1}
+    assert stats['files']['hits'] == 2
+
+    assert subprocess.call(ROS_CLIENT + [str(daemon), 'verify', 'first.ros', str(TEST_CONTAINER)]) == 0
+    assert subprocess.call(ROS_CLIENT + [str(daemon), 'unpack', 'first.ros']) == 0
+    assert (tmp_path / 'first' / 'PAYLOAD_A').read_bytes() == (TEST_DIRECTORY / 'PAYLOAD_A').read_bytes()
+
+    assert subprocess.call(ROS_CLIENT + [str(daemon), 'pack', '-V', '2', '-o', 'first.ros',
+                                         str(TEST_DIRECTORY)]) == 4
+    assert send_request(daemon, {'command': 'pack', 'version': 2})['status'] == 3
+    assert send_request(daemon, {'command': 'fly'})['status'] == 1
+
+    assert subprocess.call(ROS_CLIENT + [str(daemon), 'shutdown']) == 0
+    for _ in range(100):
+        if not daemon.exists():
+            break
+        time.sleep(0.05)
+    assert subprocess.call(ROS_CLIENT + [str(daemon), 'stats']) == 1
+
+
+def test_daemon_in_process(tmp_path):
+    daemon = RosDaemon(tmp_path / 'ros.sock')
+    assert daemon.run({'command': 'verify', 'containers': [str(TEST_CONTAINER)]}) == {'status': 0, 'output': []}
+    assert daemon.handle(b'[]')['status'] == 1
@@ -0,0 +1,68 @@
+import subprocess
+
+import pytest
+
+from conftest import LZMA_PAYLOAD, ROS_PACK
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_dedupe import dedupe_ros, write_deduped_ros
+from ros_lib.ros_stream import plan_ros, stream_ros, write_planned_ros
+from ros_lib.ros_verify import verify_file
+
+
+@pytest.fixture
+def source(make_payloads):
+    return make_payloads({'KERNEL_A': LZMA_PAYLOAD, 'KERNEL_B': LZMA_PAYLOAD, 'ROOTFS_A': b'rootfs' * 1000,
+                          'ROOTFS_B': b'rootfs' * 1000,
+                          'ROOTFS_C': b'ROOTFS' * 1000,  # same length, other bytes
+                          'CONFIG': b'config', 'EMPTY_A': b'', 'EMPTY_B': b''})
+
+
+@pytest.mark.parametrize('version', [1, 2])
+def test_duplicates_share_their_bytes(source, tmp_path, version):
+    # one plan for both, so the time stamps of the LZMA-subheaders match
+    plan, end_offset = plan_ros(source, None, False, version)
+    write_planned_ros(plan, end_offset, source, None, False, version, tmp_path / 'streamed.ros')
+    result = write_deduped_ros(plan, source, None, False, version, tmp_path / 'deduped.ros')
+
+    assert result.duplicates == 2
+    assert result.bytes_saved == len(LZMA_PAYLOAD) + 32 + 6000
+    assert result.end_offset == (tmp_path / 'deduped.ros').stat().st_size
+    assert result.end_offset + result.bytes_saved == (tmp_path / 'streamed.ros').stat().st_size
+    assert verify_file(tmp_path / 'deduped.ros').problems == []
+
+    with RosContainer(tmp_path / 'deduped.ros') as deduped, RosContainer(tmp_path / 'streamed.ros') as streamed:
+        # the checksum still counts every payload, shared or not, only the offsets in the directory table differ
+        assert (deduped.payload_checksum - sum(deduped.read(deduped.header_size, 8 * 32))) % (1 << 32) == \
+            (streamed.payload_checksum - sum(streamed.read(streamed.header_size, 8 * 32))) % (1 << 32)
+        for entry in streamed.entries:
+            shared = deduped.get_entry(entry.name)
+            assert deduped.read(shared.offset, shared.length) == streamed.read(entry.offset, entry.length)
+        assert deduped.get_entry('KERNEL_A').offset == deduped.get_entry('KERNEL_B').offset
+        assert deduped.get_entry('ROOTFS_A').offset == deduped.get_entry('ROOTFS_B').offset
+        assert deduped.get_entry('ROOTFS_A').offset != deduped.get_entry('ROOTFS_C').offset
+
+
+def test_mirrored_dedupe(source, tmp_path):
+    stream_ros(source, None, False, 2, tmp_path / 'reference.ros')
+    with RosContainer(tmp_path / 'reference.ros') as mirror:
+        result = dedupe_ros(source, mirror, False, None, tmp_path / 'deduped.ros')
+    assert result.duplicates == 2
+    assert verify_file(tmp_path / 'deduped.ros').problems == []
+
+
+def test_failed_write_leaves_no_output(source, tmp_path):
+    plan, _ = plan_ros(source, None, False, 2)
+    (source / 'ROOTFS_B').write_bytes(b'shorter')
+    with pytest.raises(ValueError):
+        write_deduped_ros(plan, source, None, False, 2, tmp_path / 'deduped.ros')
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['payloads']
+
+
+def test_cli(source, tmp_path):
+    output = subprocess.check_output(ROS_PACK + ['-V', '2', '-d', '-o', str(tmp_path / 'deduped.ros'), str(source)])
+    assert b'Deduplicated 2 payloads, saved 11161 bytes' in output
+    assert subprocess.call(ROS_PACK + ['-V', '2', '-d', '-p', '-o', str(tmp_path / 'other.ros'), str(source)]) == 1
+
+    (source / 'BROKEN').symlink_to(tmp_path / 'missing')
+    assert subprocess.call(ROS_PACK + ['-V', '2', '-d', '-o', str(tmp_path / 'broken.ros'), str(source)]) == 4
+    assert not (tmp_path / 'broken.ros').exists()
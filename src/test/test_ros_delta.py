@@ -0,0 +1,74 @@
+from pathlib import Path
+import shutil
+import subprocess
+
+import pytest
+
+from conftest import LZMA_PAYLOAD, ROS_DELTA
+from ros_lib.ros_container import RosContainer
+from ros_lib import ros_delta
+from ros_lib.ros_delta import diff_ros, patch_ros
+from ros_lib.ros_pack import pack_ros, write_ros
+
+
+@pytest.fixture
+def containers(tmp_path, monkeypatch, make_payloads):
+    source = make_payloads({'KERNEL': LZMA_PAYLOAD, 'ROOTFS': b'rootfs' * 10000, 'CONFIG': b'config' * 100})
+
+    monkeypatch.chdir(tmp_path)
+    write_ros(Path('base.ros'), False, pack_ros(source, None, False, 2))
+    (source / 'CONFIG').write_bytes(b'CONFIG' * 120)
+    with RosContainer(tmp_path / 'base.ros') as mirror:
+        write_ros(Path('target.ros'), False, pack_ros(source, mirror, False, None))
+    return tmp_path / 'base.ros', tmp_path / 'target.ros'
+
+
+def test_diff_and_patch(containers, tmp_path):
+    base_path, target_path = containers
+    with RosContainer(base_path) as base, RosContainer(target_path) as target:
+        copied, carried = diff_ros(base, target, tmp_path / 'update.delta', False)
+    assert copied == len(LZMA_PAYLOAD) + 32 + 60000
+    assert (tmp_path / 'update.delta').stat().st_size < carried + 200
+
+    with RosContainer(base_path) as base:
+        assert patch_ros(base, tmp_path / 'update.delta', tmp_path / 'patched.ros', False)
+    assert (tmp_path / 'patched.ros').read_bytes() == target_path.read_bytes()
+
+
+def test_patch_needs_its_base(containers, tmp_path):
+    base_path, target_path = containers
+    assert subprocess.call(ROS_DELTA + ['diff', '-o', str(tmp_path / 'update.delta'), str(base_path),
+                                        str(target_path)]) == 0
+
+    shutil.copy(target_path, tmp_path / 'other.ros')
+    with RosContainer(tmp_path / 'other.ros') as other:
+        with pytest.raises(ValueError):
+            patch_ros(other, tmp_path / 'update.delta', tmp_path / 'patched.ros', False)
+    assert not (tmp_path / 'patched.ros').exists()
+
+    assert subprocess.call(ROS_DELTA + ['patch', '-o', str(tmp_path / 'patched.ros'), str(base_path),
+                                        str(tmp_path / 'update.delta')]) == 0
+    assert (tmp_path / 'patched.ros').read_bytes() == target_path.read_bytes()
+
+
+def test_failed_patch_leaves_no_output(containers, tmp_path, monkeypatch):
+    base_path, target_path = containers
+    with RosContainer(base_path) as base, RosContainer(target_path) as target:
+        diff_ros(base, target, tmp_path / 'update.delta', False)
+
+    def disk_full(*_):
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr(ros_delta, 'copy_range', disk_full)
+    with RosContainer(base_path) as base:
+        with pytest.raises(OSError):
+            patch_ros(base, tmp_path / 'update.delta', tmp_path / 'patched.ros', False)
+    assert not (tmp_path / 'patched.ros').exists()
+
+    with RosContainer(base_path) as base, RosContainer(target_path) as target:
+        with pytest.raises(OSError):
+            diff_ros(base, target, tmp_path / 'other.delta', False)
+    assert not (tmp_path / 'other.delta').exists()
+
+    assert subprocess.call(ROS_DELTA + ['diff', '-o', str(tmp_path / 'missing' / 'update.delta'), str(base_path),
+                                        str(target_path)]) == 4
@@ -0,0 +1,79 @@
+import lzma
+import os
+import struct
+import subprocess
+
+import pytest
+
+from conftest import ROS_PACK
+from ros_lib.ros_lzma_check import check_lzma_payloads
+from ros_lib.ros_manifest import scan_directory
+
+DATA = bytes(range(256)) * 1000
+
+
+def lzma_archive(declared=None) -> bytes:
+    archive = bytearray(lzma.compress(DATA, format=lzma.FORMAT_ALONE))
+    if declared is not None:
+        archive[5:13] = struct.pack('<Q', declared)
+    return bytes(archive)
+
+
+@pytest.fixture
+def source(make_payloads):
+    return make_payloads({'KERNEL': lzma_archive(len(DATA)), 'STREAM': lzma_archive(), 'ROOTFS': b'rootfs' * 100})
+
+
+def test_valid_payloads(source):
+    results = {result.name: result for result in check_lzma_payloads(scan_directory(source), workers=2)}
+    assert sorted(results) == ['KERNEL', 'STREAM']
+    assert results['KERNEL'].declared == results['KERNEL'].decoded == len(DATA)
+    assert results['STREAM'].declared is None and results['STREAM'].decoded == len(DATA)
+    assert all(result.problem is None and result.throughput > 0 for result in results.values())
+
+
+def test_broken_payloads(source):
+    (source / 'TRUNCATED').write_bytes(lzma_archive(len(DATA))[:-100])
+    (source / 'OVERSIZED').write_bytes(lzma_archive(len(DATA) + 5))
+    (source / 'UNDERSIZED').write_bytes(lzma_archive(len(DATA) - 5))
+    (source / 'RAW').write_bytes(lzma_archive(len(DATA))[:-100])
+    (source / 'TRAILING').write_bytes(lzma_archive(len(DATA)) + b'GARBAGE' * 100)
+    (source / 'PADDED').write_bytes(lzma_archive() + bytes(100))
+    sources = [entry._replace(lzma=False) if entry.name == 'RAW' else entry for entry in scan_directory(source)]
+
+    results = {result.name: result for result in check_lzma_payloads(sources)}
+    assert 'RAW' not in results
+    assert results['TRUNCATED'].problem is not None
+    assert results['OVERSIZED'].problem.startswith('corrupt LZMA stream')
+    assert results['UNDERSIZED'].problem.startswith('corrupt LZMA stream')
+    assert results['TRAILING'].problem.startswith('trailing data')
+    assert results['PADDED'].problem.startswith('trailing data')
+    assert results['KERNEL'].problem is None
+
+
+def test_results_are_cached(source, tmp_path):
+    cache = tmp_path / 'lzma.json'
+    sources = scan_directory(source)
+    assert not any(result.cached for result in check_lzma_payloads(sources, cache_path=cache))
+    assert all(result.cached for result in check_lzma_payloads(sources, cache_path=cache))
+
+    (source / 'KERNEL').write_bytes(lzma_archive(len(DATA) - 1))
+    os.utime(source / 'KERNEL', ns=(0, 0))
+    results = {result.name: result for result in check_lzma_payloads(sources, cache_path=cache)}
+    assert not results['KERNEL'].cached and results['KERNEL'].problem is not None
+    assert results['STREAM'].cached and results['STREAM'].problem is None
+
+
+def test_cli(source, tmp_path):
+    output = subprocess.check_output(ROS_PACK + ['-V', '2', '--check-lzma', '--check-cache',
+                                                 str(tmp_path / 'lzma.json'), '-o', str(tmp_path / 'checked.ros'),
+                                                 str(source)])
+    assert b'KERNEL: ' in output and b'MiB/s' in output
+    assert (tmp_path / 'checked.ros').exists()
+
+    (source / 'KERNEL').write_bytes(lzma_archive(len(DATA))[:-100])
+    assert subprocess.call(ROS_PACK + ['-V', '2', '--check-lzma', '-o', str(tmp_path / 'broken.ros'),
+                                       str(source)]) == 3
+    assert not (tmp_path / 'broken.ros').exists()
+    assert subprocess.call(ROS_PACK + ['-V', '2', '--check-cache', str(tmp_path / 'lzma.json'),
+                                       '-o', str(tmp_path / 'other.ros'), str(source)]) == 1
@@ -0,0 +1,74 @@
+import json
+from pathlib import Path
+import subprocess
+
+import pytest
+
+from conftest import LZMA_PAYLOAD, ROS_PACK
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_manifest import read_manifest, scan_directory
+from ros_lib.ros_pack import pack_ros, write_ros
+from ros_lib.ros_stream import stream_ros
+
+
+@pytest.fixture
+def build(tmp_path):
+    build = tmp_path / 'build'
+    (build / 'kernel').mkdir(parents=True)
+    (build / 'kernel' / 'image.lzma').write_bytes(LZMA_PAYLOAD)
+    (build / 'rootfs.img').write_bytes(b'rootfs' * 1000)
+    (build / 'raw.bin').write_bytes(LZMA_PAYLOAD)
+    return build
+
+
+def test_manifest_sets_names_and_order(build, tmp_path):
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(json.dumps({'entries': [
+        {'name': 'ROOTFS', 'path': 'build/rootfs.img'},
+        {'name': 'KERNEL', 'path': str(build / 'kernel' / 'image.lzma')},
+        {'name': 'RAW', 'path': 'build/raw.bin', 'lzma': False},
+    ]}))
+    sources = read_manifest(manifest)
+    assert [source.name for source in sources] == ['ROOTFS', 'KERNEL', 'RAW']
+    assert [source.size for source in sources] == [6000, len(LZMA_PAYLOAD), len(LZMA_PAYLOAD)]
+
+    assert stream_ros(None, None, False, 2, tmp_path / 'packed.ros', sources)
+    with RosContainer(tmp_path / 'packed.ros') as container:
+        assert [entry.name.rstrip(b'\x00') for entry in container.entries] == [b'ROOTFS', b'KERNEL', b'RAW']
+        assert [entry.length for entry in container.entries] == [6000, len(LZMA_PAYLOAD) + 32, len(LZMA_PAYLOAD)]
+        assert container.dir_entries == 3
+
+
+def test_manifest_matches_directory(build, tmp_path, monkeypatch, make_payloads):
+    payloads = make_payloads({'KERNEL': LZMA_PAYLOAD, 'ROOTFS': b'rootfs' * 1000})
+    monkeypatch.chdir(tmp_path)
+    write_ros(Path('reference.ros'), False, pack_ros(payloads, None, False, 2))
+
+    order = [source.name for source in scan_directory(payloads)]
+    files = {'KERNEL': 'build/kernel/image.lzma', 'ROOTFS': 'build/rootfs.img'}
+    (tmp_path / 'manifest.toml').write_text(''.join(
+        '[[entries]]\nname = "{}"\npath = "{}"\n'.format(name, files[name]) for name in order))
+
+    assert subprocess.call(ROS_PACK + ['-m', 'reference.ros', '--manifest', 'manifest.toml', '-o', 'packed.ros']) == 0
+    assert (tmp_path / 'packed.ros').read_bytes() == (tmp_path / 'reference.ros').read_bytes()
+    assert subprocess.call(ROS_PACK + ['-V', '2', '--manifest', 'manifest.toml', str(payloads)]) == 1
+
+
+@pytest.mark.parametrize('entry', [{'path': 'build/missing'}, {'path': 'build/raw.bin', 'name': 'A' * 17},
+                                   {'path': 'build/raw.bin', 'lzma': 'yes'}, {'name': 'RAW'}])
+def test_broken_manifests(build, tmp_path, entry):
+    (tmp_path / 'manifest.json').write_text(json.dumps([entry]))
+    with pytest.raises(ValueError):
+        read_manifest(tmp_path / 'manifest.json')
+
+
+def test_forced_lzma_needs_archive(build, tmp_path):
+    (tmp_path / 'manifest.json').write_text(json.dumps([{'path': 'build/rootfs.img', 'lzma': True}]))
+    with pytest.raises(ValueError):
+        stream_ros(None, None, False, 1, tmp_path / 'packed.ros', read_manifest(tmp_path / 'manifest.json'))
+    assert not (tmp_path / 'packed.ros').exists()
+
+    manifest = str(tmp_path / 'manifest.json')
+    assert subprocess.call(ROS_PACK + ['-V', '1', '--manifest', manifest, '-o', str(tmp_path / 'packed.ros')]) == 3
+    assert subprocess.call(ROS_PACK + ['-V', '1', '--manifest', manifest, '-o', '-'], stdout=subprocess.DEVNULL) == 3
+    assert not (tmp_path / 'packed.ros').exists()
@@ -5,9 +5,9 @@ from hashlib import sha3_512
 
 import pytest
 
+from conftest import ROS_PACK
 from ros_lib.ros_pack import check_ros
 
-ROS_PACK = [str(Path(__file__).parent.parent / 'ros_packer.py'), ]
 THIS_FILE = '{}'.format(Path(__file__).absolute())
 
 
@@ -0,0 +1,92 @@
+import os
+from pathlib import Path
+import subprocess
+
+import pytest
+
+from conftest import LZMA_PAYLOAD, ROS_PACK
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_pack import pack_ros, write_ros
+from ros_lib import ros_repack
+from ros_lib.ros_repack import repack_ros
+from ros_lib.ros_unpack import unpack_ros
+
+
+@pytest.fixture
+def base(tmp_path, monkeypatch, make_payloads):
+    source = make_payloads(dict({'PART{}'.format(i): bytes([i + 0x80]) * (1000 * (i + 1)) for i in range(8)},
+                                KERNEL=LZMA_PAYLOAD))
+
+    monkeypatch.chdir(tmp_path)
+    write_ros(Path('base.ros'), False, pack_ros(source, None, False, 2))
+    with RosContainer(tmp_path / 'base.ros') as container:
+        unpack_ros(container, tmp_path / 'unpacked', False)
+    return tmp_path
+
+
+def full_pack(tmp_path, name):
+    with RosContainer(tmp_path / 'base.ros') as container:
+        write_ros(Path(name), False, pack_ros(tmp_path / 'unpacked', container, False, None))
+    return (tmp_path / name).read_bytes()
+
+
+@pytest.mark.parametrize('trust_mtime', [True, False])
+def test_repack_matches_full_pack(base, trust_mtime):
+    unpacked = base / 'unpacked'
+    (unpacked / 'PART3').write_bytes(b'changed' * 700)
+    (unpacked / 'PART5').unlink()
+    (unpacked / 'KERNEL').write_bytes(LZMA_PAYLOAD + b'more')
+
+    with RosContainer(base / 'base.ros') as container:
+        assert repack_ros(container, unpacked, False, base / 'repacked.ros', trust_mtime)
+
+    assert (base / 'repacked.ros').read_bytes() == full_pack(base, 'full.ros')
+
+
+def test_repack_unchanged_is_identical(base):
+    with RosContainer(base / 'base.ros') as container:
+        assert repack_ros(container, base / 'unpacked', False, base / 'repacked.ros')
+
+    assert (base / 'repacked.ros').read_bytes() == (base / 'base.ros').read_bytes()
+
+
+def test_repack_detects_same_size_change(base):
+    part = base / 'unpacked' / 'PART0'
+    part.write_bytes(b'\x00' * 1000)
+    stat = (base / 'base.ros').stat()
+    os.utime(part, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    with RosContainer(base / 'base.ros') as container:
+        assert repack_ros(container, base / 'unpacked', False, base / 'repacked.ros')
+
+    assert (base / 'repacked.ros').read_bytes() == full_pack(base, 'full.ros')
+
+
+def test_repack_does_not_trust_older_mtimes(base):
+    part = base / 'unpacked' / 'PART0'
+    part.write_bytes(b'\x00' * 1000)
+    os.utime(part, ns=(0, 0))  # e.g. restored from an older release with cp -p
+
+    for trust_mtime in (False, True):
+        with RosContainer(base / 'base.ros') as container:
+            assert repack_ros(container, base / 'unpacked', False, base / 'repacked.ros', trust_mtime)
+        assert (base / 'repacked.ros').read_bytes() == full_pack(base, 'full.ros')
+        (base / 'repacked.ros').unlink()
+        (base / 'full.ros').unlink()
+
+
+def test_failed_repack_leaves_no_output(base, monkeypatch):
+    (base / 'unpacked' / 'PART3').write_bytes(b'changed' * 700)
+
+    def disk_full(*_):
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr(ros_repack, 'write_payload', disk_full)
+    with RosContainer(base / 'base.ros') as container:
+        with pytest.raises(OSError):
+            repack_ros(container, base / 'unpacked', False, base / 'repacked.ros')
+    assert not (base / 'repacked.ros').exists()
+
+    (base / 'unpacked' / 'BROKEN').symlink_to(base / 'missing')
+    assert subprocess.call(ROS_PACK + ['-i', '-m', 'base.ros', '-o', 'repacked.ros', 'unpacked']) == 4
+    assert not (base / 'repacked.ros').exists()
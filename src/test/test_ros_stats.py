@@ -0,0 +1,43 @@
+from pathlib import Path
+
+from conftest import TEST_DIRECTORY
+from ros_lib import ros_stats
+from ros_lib.ros_pack import pack_ros, write_ros
+from ros_lib.ros_stream import stream_ros
+
+
+def test_disabled_records_nothing():
+    assert ros_stats.get_stats() is None
+    with ros_stats.timer('write') as first, ros_stats.timer('checksum') as second:
+        assert first is second
+    ros_stats.count('entries')
+
+
+def test_pack_phases_and_counters(tmp_path, monkeypatch):
+    events = []
+    stats = ros_stats.RosStats()
+    stats.callbacks.append(lambda kind, name, value: events.append((kind, name)))
+
+    monkeypatch.chdir(tmp_path)
+    ros_stats.enable(stats)
+    try:
+        write_ros(Path('packed.ros'), False, pack_ros(TEST_DIRECTORY, None, False, 2))
+    finally:
+        assert ros_stats.disable() is stats
+
+    result = stats.as_dict()
+    for phase in ('directory_scan', 'payload_read', 'lzma_detection', 'checksum', 'header_build', 'write'):
+        assert result['timers'][phase]['calls'] > 0
+    assert result['counters'] == {'entries': 2, 'bytes_read': 96, 'bytes_written': 240}
+    assert ('counter', 'entries') in events and ('timer', 'write') in events
+    assert 'bytes_written' in stats.as_text()
+
+
+def test_stream_counts_bytes(tmp_path):
+    stats = ros_stats.enable()
+    try:
+        stream_ros(TEST_DIRECTORY, None, False, 1, tmp_path / 'streamed.ros')
+    finally:
+        ros_stats.disable()
+
+    assert stats.counters['bytes_written'] == (tmp_path / 'streamed.ros').stat().st_size
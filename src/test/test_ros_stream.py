@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import pytest
+
+from conftest import LZMA_PAYLOAD
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_pack import pack_ros, write_ros
+from ros_lib import ros_stream
+from ros_lib.ros_stream import plan_ros, stream_ros, write_planned_ros
+
+
+@pytest.mark.parametrize('version', [1, 2])
+def test_stream_matches_pack(source, tmp_path, monkeypatch, version):
+    monkeypatch.chdir(tmp_path)
+    write_ros(Path('reference.ros'), False, pack_ros(source, None, False, version))
+
+    with RosContainer(tmp_path / 'reference.ros') as mirror:
+        write_ros(Path('packed.ros'), False, pack_ros(source, mirror, False, None))
+        assert stream_ros(source, mirror, False, None, tmp_path / 'streamed.ros')
+
+    assert (tmp_path / 'streamed.ros').read_bytes() == (tmp_path / 'packed.ros').read_bytes()
+    assert (tmp_path / 'streamed.ros').read_bytes() == (tmp_path / 'reference.ros').read_bytes()
+
+
+def test_payloads_are_read_once(source, tmp_path, monkeypatch):
+    def sum_file(*_):
+        raise AssertionError('payload read twice')
+
+    monkeypatch.setattr(ros_stream, 'sum_file', sum_file)
+    assert stream_ros(source, None, False, 2, tmp_path / 'streamed.ros')
+    with RosContainer(tmp_path / 'streamed.ros') as container:
+        assert container.read(container.get_entry('CONFIG').offset, 6000) == b'config' * 1000
+
+
+def test_failed_stream_leaves_no_output(source, tmp_path):
+    plan, end_offset = plan_ros(source, None, False, 2)
+    (source / 'CONFIG').write_bytes(b'shorter')
+    with pytest.raises(ValueError):
+        write_planned_ros(plan, end_offset, source, None, False, 2, tmp_path / 'streamed.ros')
+    assert not (tmp_path / 'streamed.ros').exists()
+
+
+def test_plan_reads_sizes_only(source):
+    plan, end_offset = plan_ros(source, None, False, 2)
+    lengths = {entry.path.name: entry.length for entry in plan}
+    assert lengths == {'KERNEL': len(LZMA_PAYLOAD) + 32, 'CONFIG': 6000, 'EMPTY': 0}
+    assert end_offset == 80 + 3 * 32 + sum(lengths.values())
@@ -0,0 +1,68 @@
+from pathlib import Path
+import struct
+
+from conftest import TEST_CONTAINER
+from ros_lib.ros_header_v1 import RosHeaderV1
+from ros_lib.ros_header_v2 import RosHeaderV2
+from ros_lib.ros_lzma_subheader import RosLzmaSubheader
+from ros_lib.ros_payload_header import RosPayloadHeader
+from ros_lib.ros_struct import pack_directory
+
+
+def test_header_v2_matches_test_container():
+    binary = TEST_CONTAINER.read_bytes()
+    header = RosHeaderV2(0x110, 2, 0, 0, 0, 1, 1, 2000, 0xa0, 0x1f75)
+    header.set_timestamp(binary[40:48])
+    header.calc_checksums()
+
+    assert header.get_bytes() == binary[:80]
+    assert header.header_checksum == binary[12:16]
+    assert 4294967295 - sum(header.get_bytes()) + sum(header.header_checksum) == struct.unpack('<I', binary[12:16])[0]
+
+
+def test_header_v1_layout():
+    header = RosHeaderV1(1, 2, 3, 4, 5, 2020, 7, 0x1234, 0x5678)
+    header.set_unknown2(b'\x01' * 12)
+    assert header.get_bytes() == b'LS231.01' + struct.pack('<6Bh', 1, 2, 3, 0, 4, 5, 2020) + \
+        struct.pack('<II', 0x1234, 0x5678) + b'PACK' + b'\x00' * 4 + struct.pack('<I', 7) + b'\x01' * 12
+    assert header.length == struct.pack('<I', 0x1234)
+
+
+def test_lzma_subheader_layout():
+    subheader = RosLzmaSubheader(1, 2, 3, 4, 5, 2020, b'\x10\x00\x00\x00')
+    subheader.set_unknown1(b'UNK1')
+    assert subheader.get_bytes() == b'BL012.00' + bytes([1, 2, 3, 0, 4, 5]) + struct.pack('>h', 2020) + b'UNK1' + \
+        b'\x10\x00\x00\x00' + b'\x00' * 8
+
+
+def test_pack_directory():
+    payload_headers = [RosPayloadHeader(Path('PAYLOAD_{}'.format(i)), i * 16, 0x100 + i) for i in range(3)]
+    payload_headers[1].set_unknown(b'12345678')
+
+    table = pack_directory(payload_headers, RosHeaderV1.HEADER_SIZE)
+    assert table[:48] == bytes(48)
+    assert table[48:] == b''.join(payload_header.get_bytes() for payload_header in payload_headers)
+    assert payload_headers[2].get_bytes() == b'PAYLOAD_2'.ljust(16, b'\x00') + struct.pack('<LL', 0x102, 32) + bytes(8)
+
+
+def test_header_attributes_write_through():
+    header = RosHeaderV1(1, 2, 3, 4, 5, 2020, 7, 0x1234, 0x5678)
+    header.length = struct.pack('<I', 0x4321)
+    header.set_unknown1(b'UNK1')
+    header.set_arc_magic(b'ABCD')
+    assert header.record.length == 0x4321
+    assert (header.length, header.UNKNOWN1, header.ARC_MAGIC) == (struct.pack('<I', 0x4321), b'UNK1', b'ABCD')
+    assert header.get_bytes()[:4] == b'ABCD' and header.get_bytes()[16:20] == struct.pack('<I', 0x4321)
+    assert RosHeaderV1.UNKNOWN1 == bytes(4) and RosHeaderV1.ARC_MAGIC == b'LS23'
+
+    header_v2 = RosHeaderV2(0x110, 2, 0, 0, 0, 1, 1, 2000, 0xa0, 0x1f75)
+    header_v2.length2 = struct.pack('<I', 0xb0)
+    header_v2.set_version(b'Version'.ljust(16, b'\x00'))
+    assert header_v2.record.length2 == 0xb0 and header_v2.FIRMWARE_VERSION == b'Version'.ljust(16, b'\x00')
+
+
+def test_lzma_subheader_fields():
+    subheader = RosLzmaSubheader(1, 2, 3, 4, 5, 2020, b'\x10\x00\x00\x00')
+    subheader.size = b'\x20\x00\x00\x00'
+    assert subheader.get_bytes()[20:24] == b'\x20\x00\x00\x00'
+    assert not isinstance(subheader, RosHeaderV1) and not hasattr(subheader, 'length')
@@ -0,0 +1,103 @@
+import io
+import struct
+import subprocess
+import tarfile
+
+import pytest
+
+from conftest import LZMA_PAYLOAD, PAYLOADS, ROS_TAR
+from ros_lib.ros_api import pack_to_bytes
+from ros_lib.ros_tar import ros_to_tar, tar_to_ros
+from ros_lib.ros_verify import verify_file
+
+
+@pytest.fixture
+def source(make_payloads):
+    return make_payloads(dict(PAYLOADS, ROOTFS=b'rootfs' * 10000))
+
+
+def convert(function, data: bytes) -> bytes:
+    output = io.BytesIO()
+    function(io.BytesIO(data), output)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize('version', [1, 2])
+def test_round_trip(source, version):
+    container = pack_to_bytes(source, version=version)
+    tar = convert(ros_to_tar, container)
+
+    with tarfile.open(fileobj=io.BytesIO(tar)) as archive:
+        assert sorted(archive.getnames()) == ['CONFIG', 'EMPTY', 'KERNEL', 'ROOTFS']
+        assert archive.extractfile('ROOTFS').read() == (source / 'ROOTFS').read_bytes()
+        assert archive.extractfile('KERNEL').read()[32:] == LZMA_PAYLOAD  # the subheader stays with the payload
+
+    assert convert(tar_to_ros, tar) == container
+
+
+def test_shared_payloads_become_links(source):
+    (source / 'ROOTFS').write_bytes(PAYLOADS['CONFIG'])
+    container = bytearray(pack_to_bytes(source, version=1))
+    entries = {struct.unpack_from('<16s', container, 48 + 32 * i)[0].rstrip(b'\x00'):
+               (48 + 32 * i,) + struct.unpack_from('<LL', container, 48 + 32 * i + 16) for i in range(4)}
+
+    # let ROOTFS use the bytes of CONFIG, its own copy becomes a gap of zeros
+    position, offset, length = entries[b'ROOTFS']
+    container[offset:offset + length] = bytes(length)
+    struct.pack_into('<L', container, position + 16, entries[b'CONFIG'][1])
+    checksum = sum(container[48:48 + 32 * 4]) + sum(
+        sum(container[offset:offset + length]) for offset, length in ((entry[1], entry[2]) for entry in
+                                                                     [entries[b'KERNEL'], entries[b'CONFIG'],
+                                                                      entries[b'CONFIG'], entries[b'EMPTY']]))
+    struct.pack_into('<I', container, 20, checksum & 0xFFFFFFFF)
+
+    tar = convert(ros_to_tar, bytes(container))
+    with tarfile.open(fileobj=io.BytesIO(tar)) as archive:
+        links = [member for member in archive.getmembers() if member.islnk()]
+    assert [(link.name, link.linkname) for link in links] in ([('ROOTFS', 'CONFIG')], [('CONFIG', 'ROOTFS')])
+    assert convert(tar_to_ros, tar) == container
+
+
+def test_broken_input(source):
+    container = pack_to_bytes(source, version=2)
+    with pytest.raises(ValueError, match='ends'):
+        convert(ros_to_tar, container[:-10])
+
+    tar = io.BytesIO()
+    with tarfile.open(fileobj=tar, mode='w') as archive:
+        archive.addfile(tarfile.TarInfo('KERNEL'))
+    with pytest.raises(ValueError, match='no ros header'):
+        convert(tar_to_ros, tar.getvalue())
+
+    tar = convert(ros_to_tar, container)
+    with pytest.raises(ValueError):
+        convert(tar_to_ros, tar[:len(tar) // 2])
+
+    container = bytearray(pack_to_bytes(source, version=1))
+    struct.pack_into('<I', container, 20, 0x12345678)
+    with pytest.raises(ValueError, match='instead of 0x12345678'):  # the sum of the payloads comes first
+        convert(ros_to_tar, bytes(container))
+
+
+def test_bytes_outside_of_payloads(source):
+    container = bytearray(pack_to_bytes(source, version=1))
+    container = container + bytes(16)  # zeros behind the last payload are rebuilt by tar_to_ros
+    struct.pack_into('<I', container, 16, len(container) - 48)
+    assert convert(tar_to_ros, convert(ros_to_tar, bytes(container))) == container
+
+    container[-8:] = b'trailing'
+    with pytest.raises(ValueError, match='non-zero'):
+        convert(ros_to_tar, bytes(container))
+
+
+def test_pipeline(source, tmp_path):
+    (tmp_path / 'container.ros').write_bytes(pack_to_bytes(source, version=2))
+    subprocess.check_call('{0} to-tar container.ros | gzip | {0} to-ros -o copy.ros'.format(ROS_TAR), shell=True,
+                          cwd=str(tmp_path))
+    assert (tmp_path / 'copy.ros').read_bytes() == (tmp_path / 'container.ros').read_bytes()
+    assert verify_file(tmp_path / 'copy.ros').problems == []
+
+    assert subprocess.call('head -c 1000 container.ros | {} to-tar -o broken.tar'.format(ROS_TAR), shell=True,
+                           cwd=str(tmp_path)) == 3
+    assert not (tmp_path / 'broken.tar').exists()
+    assert subprocess.call([ROS_TAR, 'to-ros', '-o', 'copy.ros', 'container.ros'], cwd=str(tmp_path)) == 1
@@ -0,0 +1,36 @@
+from pathlib import Path
+import subprocess
+
+from conftest import LZMA_PAYLOAD, ROS_UNPACK, TEST_CONTAINER, TEST_DIRECTORY
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_pack import pack_ros, write_ros
+from ros_lib.ros_unpack import unpack_ros
+
+
+def test_unpack_test_container(tmp_path):
+    assert subprocess.call(ROS_UNPACK + ['-o', str(tmp_path / 'out'), str(TEST_CONTAINER)]) == 0
+    for payload in TEST_DIRECTORY.iterdir():
+        assert (tmp_path / 'out' / payload.name).read_bytes() == payload.read_bytes()
+
+    assert subprocess.call(ROS_UNPACK + ['-o', str(tmp_path / 'out'), str(TEST_CONTAINER)]) == 1
+    assert subprocess.call(ROS_UNPACK + ['-j', '0', '-o', str(tmp_path / 'other'), str(TEST_CONTAINER)],
+                           stderr=subprocess.DEVNULL) == 2
+
+
+def test_round_trip_strips_lzma_subheader(tmp_path, monkeypatch, make_payloads):
+    source = make_payloads({'KERNEL': LZMA_PAYLOAD, 'ROOTFS': b'rootfs' * 500})
+
+    monkeypatch.chdir(tmp_path)
+    write_ros(Path('first.ros'), False, pack_ros(source, None, False, 2))
+
+    with RosContainer(tmp_path / 'first.ros') as container:
+        unpack_ros(container, tmp_path / 'unpacked', False, workers=2)
+        assert (tmp_path / 'unpacked/KERNEL').read_bytes() == LZMA_PAYLOAD
+        assert (tmp_path / 'unpacked/ROOTFS').read_bytes() == b'rootfs' * 500
+
+        write_ros(Path('second.ros'), False, pack_ros(tmp_path / 'unpacked', container, False, None))
+
+    with RosContainer(tmp_path / 'first.ros') as first, RosContainer(tmp_path / 'second.ros') as second:
+        for entry in first.entries:
+            other = second.get_entry(entry.name)
+            assert first.read(entry.offset, entry.length) == second.read(other.offset, other.length)
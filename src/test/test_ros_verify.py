@@ -0,0 +1,64 @@
+from pathlib import Path
+import shutil
+import struct
+import subprocess
+
+import pytest
+
+from conftest import ROS_VERIFY, TEST_CONTAINER
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_pack import pack_ros, write_ros
+from ros_lib.ros_verify import verify_file, verify_files, verify_ros
+
+
+def patch(path: Path, offset: int, data: bytes) -> None:
+    with open(path, 'r+b') as file:
+        file.seek(offset)
+        file.write(data)
+
+
+@pytest.mark.parametrize('version', [1, 2])
+def test_packed_containers_verify(source, tmp_path, monkeypatch, version):
+    monkeypatch.chdir(tmp_path)
+    write_ros(Path('packed.ros'), False, pack_ros(source, None, False, version))
+    with RosContainer(tmp_path / 'packed.ros') as container:
+        assert verify_ros(container) == []
+
+
+def test_corrupted_payload(tmp_path):
+    shutil.copy(TEST_CONTAINER, tmp_path / 'broken.ros')
+    patch(tmp_path / 'broken.ros', TEST_CONTAINER.stat().st_size - 1, b'\xff')
+    problems = verify_file(tmp_path / 'broken.ros').problems
+    assert len(problems) == 1 and problems[0].startswith('payload checksum')
+
+
+def test_corrupted_header(tmp_path):
+    shutil.copy(TEST_CONTAINER, tmp_path / 'broken.ros')
+    patch(tmp_path / 'broken.ros', 48, struct.pack('<I', 0))  # length 2
+    problems = verify_file(tmp_path / 'broken.ros').problems
+    assert problems[0].startswith('length 2') and any(p.startswith('checksum 1') for p in problems)
+
+
+def test_overlapping_and_out_of_bounds_entries(tmp_path):
+    shutil.copy(TEST_CONTAINER, tmp_path / 'broken.ros')
+    with RosContainer(TEST_CONTAINER) as container:
+        first, second = container.entries
+    patch(tmp_path / 'broken.ros', 80 + 32 + 16, struct.pack('<L', first.offset + 1))
+    assert 'payload 1 overlaps payload 0' in verify_file(tmp_path / 'broken.ros').problems
+
+    patch(tmp_path / 'broken.ros', 80 + 32 + 16, struct.pack('<L', TEST_CONTAINER.stat().st_size))
+    assert any('behind the container' in p for p in verify_file(tmp_path / 'broken.ros').problems)
+
+
+def test_verify_many(tmp_path):
+    (tmp_path / 'empty.ros').write_bytes(b'')
+    paths = [TEST_CONTAINER] * 20 + [tmp_path / 'empty.ros']
+    results = list(verify_files(paths, workers=2))
+    assert [result.path for result in results] == paths
+    assert all(result.problems == [] for result in results[:20])
+    assert results[20].problems == ['empty.ros is empty']
+
+    assert subprocess.call(ROS_VERIFY + [str(TEST_CONTAINER)]) == 0
+    assert subprocess.call(ROS_VERIFY + [str(TEST_CONTAINER), str(tmp_path / 'empty.ros')]) == 3
+    assert subprocess.call(ROS_VERIFY + [str(tmp_path / 'missing.ros')]) == 1
+    assert subprocess.call(ROS_VERIFY + ['-j', '0', str(TEST_CONTAINER)], stderr=subprocess.DEVNULL) == 2
@@ -0,0 +1,53 @@
+from pathlib import Path
+import subprocess
+
+import pytest
+
+from conftest import LZMA_PAYLOAD, ROS_PACK
+from ros_lib.ros_container import RosContainer
+from ros_lib.ros_pack import pack_ros, write_ros
+from ros_lib.ros_stream import plan_ros
+from ros_lib.ros_writer import parallel_ros, write_parallel_ros
+
+
+@pytest.fixture
+def source(make_payloads):
+    return make_payloads(dict({'PART{}'.format(i): bytes([i]) * (1000 * i) for i in range(8)}, KERNEL=LZMA_PAYLOAD))
+
+
+@pytest.mark.parametrize('version', [1, 2])
+def test_parallel_matches_pack(source, tmp_path, monkeypatch, version):
+    monkeypatch.chdir(tmp_path)
+    write_ros(Path('reference.ros'), False, pack_ros(source, None, False, version))
+
+    with RosContainer(tmp_path / 'reference.ros') as mirror:
+        assert parallel_ros(source, mirror, False, None, tmp_path / 'parallel.ros', workers=4, fsync=True)
+
+    assert (tmp_path / 'parallel.ros').read_bytes() == (tmp_path / 'reference.ros').read_bytes()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['parallel.ros', 'payloads', 'reference.ros']
+
+
+def test_failed_write_publishes_nothing(source, tmp_path):
+    plan, end_offset = plan_ros(source, None, False, 2)
+    (source / 'PART3').write_bytes(b'shorter')
+    with pytest.raises(ValueError):
+        write_parallel_ros(plan, end_offset, source, None, False, 2, tmp_path / 'parallel.ros')
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['payloads']
+
+
+def test_existing_output_is_kept(source, tmp_path):
+    (tmp_path / 'parallel.ros').write_bytes(b'keep')
+    with pytest.raises(FileExistsError):
+        parallel_ros(source, None, False, 2, tmp_path / 'parallel.ros')
+    assert (tmp_path / 'parallel.ros').read_bytes() == b'keep'
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['parallel.ros', 'payloads']
+
+    assert subprocess.call(ROS_PACK + ['-V', '1', '--fsync', '-o', str(tmp_path / 'other.ros'), str(source)]) == 1
+    assert subprocess.call(ROS_PACK + ['-V', '1', '-p', '-j', '2', '--fsync', '-o', str(tmp_path / 'other.ros'),
+                                       str(source)]) == 0
+
+
+def test_cli_reports_errors(source, tmp_path):
+    (source / 'BROKEN').symlink_to(tmp_path / 'missing')
+    assert subprocess.call(ROS_PACK + ['-V', '1', '-p', '-o', str(tmp_path / 'parallel.ros'), str(source)]) == 4
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['payloads']